@@ -0,0 +1,87 @@
+"""
+Persistence of audit sufficient statistics.
+Each audit stores its raw per-group count tables and configuration so that new
+rows can later be merged in without rescanning the full dataset. Tables of
+audits left without updates for FAIRNESS_STATS_RETENTION_DAYS are collected.
+"""
+
+import os
+import json
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from config import logger, FAIRNESS_STATS_DIR, FAIRNESS_STATS_RETENTION_DAYS
+from fairness_engine import GroupCounts
+from utils import to_json_safe
+
+os.makedirs(FAIRNESS_STATS_DIR, exist_ok=True)
+
+
+def _stats_path(audit_id) -> str:
+    safe_id = "".join(c for c in str(audit_id) if c.isalnum() or c in "-_")
+    return os.path.join(FAIRNESS_STATS_DIR, f"{safe_id}.json")
+
+
+def save_audit_stats(audit_id, audit_config: Dict[str, Any], tables: Dict[str, GroupCounts]) -> None:
+    """Persist the count tables of an audit (atomic write)."""
+    payload = {
+        "audit_id": str(audit_id),
+        "config": to_json_safe(audit_config),
+        "updated_at": datetime.now().isoformat(),
+        "tables": {
+            key: {"labels": to_json_safe(table.labels), "counts": table.counts.tolist()}
+            for key, table in tables.items()
+        },
+    }
+
+    path = _stats_path(audit_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved count tables for audit {audit_id} ({len(tables)} tables)")
+
+
+def load_audit_stats(audit_id) -> Optional[Tuple[Dict[str, Any], Dict[str, GroupCounts]]]:
+    """Stored (config, tables) of an audit, or None if the audit has no statistics."""
+    path = _stats_path(audit_id)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+
+    tables = {
+        key: GroupCounts(
+            labels=table["labels"],
+            counts=np.asarray(table["counts"], dtype=np.int64).reshape(-1, 4),
+        )
+        for key, table in payload["tables"].items()
+    }
+    return payload["config"], tables
+
+
+def collect_audit_stats(retention_days: float = FAIRNESS_STATS_RETENTION_DAYS) -> int:
+    """Delete the count tables of audits not updated for `retention_days`. Returns how many were removed."""
+    if retention_days <= 0:
+        return 0
+    cutoff = time.time() - retention_days * 24 * 3600
+    removed = 0
+    try:
+        entries = list(os.scandir(FAIRNESS_STATS_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.endswith((".json", ".tmp")):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"Audit store: removed count tables of {removed} audit(s) older than {retention_days} days")
+    return removed
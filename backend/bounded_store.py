@@ -0,0 +1,193 @@
+"""
+Memory-bounded store for datasets and models.
+A dict-like mapping that accounts for the memory of each entry and, once over
+budget, evicts the least recently used unpinned entries to their on-disk copy.
+Evicted entries stay visible: `key in store` and `store[key]` transparently
+restore them from disk. When the on-disk copy is shared with other processes,
+a resident entry that another process has replaced is dropped and read back.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import logger
+
+
+class BoundedStore(MutableMapping):
+    """LRU mapping with a memory budget (0 = unbounded).
+
+    - sizer(entry) -> bytes held by an entry
+    - spill(key, entry) -> True once the entry can be restored from disk
+    - restore(key) -> entry read back from disk, or None
+    - exists(key) -> whether a restorable on-disk copy exists
+    - validate(key, entry) -> False once the resident entry is outdated by the on-disk copy
+    """
+
+    def __init__(
+        self,
+        name: str,
+        budget_bytes: int,
+        sizer: Callable[[Any], int],
+        spill: Optional[Callable[[str, Any], bool]] = None,
+        restore: Optional[Callable[[str], Any]] = None,
+        exists: Optional[Callable[[str], bool]] = None,
+        validate: Optional[Callable[[str, Any], bool]] = None,
+    ):
+        self.name = name
+        self.budget_bytes = budget_bytes
+        self._sizer = sizer
+        self._spill = spill
+        self._restore = restore
+        self._exists = exists
+        self._validate = validate
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.restores = 0
+        self.evictions = 0
+        self.spill_failures = 0
+        self.stale_reloads = 0
+
+    # --- Mapping interface (resident entries, restored on demand) ---
+
+    def __getitem__(self, key):
+        key = str(key)
+        with self._lock:
+            if self._resident_current(key):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        entry = self._restore(key) if self._restore else None
+        if entry is None:
+            raise KeyError(key)
+        with self._lock:
+            if key in self._entries:  # restored concurrently
+                return self._entries[key]
+            self.restores += 1
+            self._insert(key, entry)
+        logger.info(f"{self.name} store: restored {key} from disk")
+        return entry
+
+    def __setitem__(self, key, entry):
+        with self._lock:
+            self._insert(str(key), entry)
+
+    def __delitem__(self, key):
+        key = str(key)
+        with self._lock:
+            del self._entries[key]
+            self.resident_bytes -= self._sizes.pop(key)
+
+    def discard(self, key) -> bool:
+        """Drop the resident copy of an entry, if any (the on-disk copy is left alone)."""
+        key = str(key)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            del self._entries[key]
+            self.resident_bytes -= self._sizes.pop(key)
+            return True
+
+    def __contains__(self, key):
+        key = str(key)
+        with self._lock:
+            if self._resident_current(key):
+                return True
+        return bool(self._exists and self._exists(key))
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --- Accounting and eviction ---
+
+    def is_resident(self, key) -> bool:
+        return str(key) in self._entries
+
+    def resident_items(self) -> List[Tuple[str, Any]]:
+        """Snapshot of the resident entries, without touching their recency."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def _resident_current(self, key) -> bool:
+        """Whether `key` is resident and up to date; an outdated entry is dropped."""
+        if key not in self._entries:
+            return False
+        if self._validate is None or self._validate(key, self._entries[key]):
+            return True
+        del self._entries[key]
+        self.resident_bytes -= self._sizes.pop(key)
+        self.stale_reloads += 1
+        logger.info(f"{self.name} store: {key} was replaced on disk, dropping the resident copy")
+        return False
+
+    def _insert(self, key, entry):
+        if key in self._entries:
+            self.resident_bytes -= self._sizes[key]
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._sizes[key] = int(self._sizer(entry))
+        self.resident_bytes += self._sizes[key]
+        self._evict(keep=key)
+
+    def resize(self, key) -> None:
+        """Re-measure an entry that was changed in place (e.g. a replaced dataframe)."""
+        key = str(key)
+        with self._lock:
+            if key in self._entries:
+                self._insert(key, self._entries[key])
+
+    def _evict(self, keep: Optional[str] = None):
+        if not self.budget_bytes:
+            return
+        for key in list(self._entries):
+            if self.resident_bytes <= self.budget_bytes:
+                break
+            if key == keep or self._pins.get(key):
+                continue
+            if self._spill is None or not self._spill(key, self._entries[key]):
+                # No restorable copy: keeping it beats losing it
+                self.spill_failures += 1
+                continue
+            del self._entries[key]
+            self.resident_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+            logger.info(f"{self.name} store: evicted {key} ({self.resident_bytes} / {self.budget_bytes} bytes)")
+
+    @contextmanager
+    def pinned(self, key):
+        """Keep an entry resident while it is in active use."""
+        key = str(key)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+                self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "resident_bytes": self.resident_bytes,
+                "budget_bytes": self.budget_bytes,
+                "pinned": len(self._pins),
+                "hits": self.hits,
+                "restores": self.restores,
+                "evictions": self.evictions,
+                "spill_failures": self.spill_failures,
+                "stale_reloads": self.stale_reloads,
+            }
@@ -0,0 +1,65 @@
+"""
+Lossless dtype compaction of ingested datasets.
+Integers are downcast to the smallest signed type holding their range and
+low-cardinality string columns become categoricals. Floats stay float64: a
+float32 column stores the same values, but means, deviations and model inputs
+computed from it would be float32 too. The chosen schema is returned so it can
+be stored with the dataset.
+"""
+
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import logger, COMPACT_CATEGORY_MAX_RATIO, COMPACT_CATEGORY_MAX_UNIQUE
+
+_INT_TYPES = (np.int8, np.int16, np.int32)
+
+
+def _compact_int(series: pd.Series) -> pd.Series:
+    if series.empty:
+        return series
+    low, high = series.min(), series.max()
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return series.astype(dtype)
+    return series
+
+
+def _compact_object(series: pd.Series) -> pd.Series:
+    if pd.api.types.infer_dtype(series, skipna=True) != "string":
+        return series
+    non_null = series.count()
+    n_unique = series.nunique()
+    if non_null and n_unique <= COMPACT_CATEGORY_MAX_UNIQUE and n_unique <= COMPACT_CATEGORY_MAX_RATIO * non_null:
+        return series.astype("category")
+    return series
+
+
+def compact_dtypes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Compacted frame and the schema record {columns: {col: {original, dtype}}, bytes_before, bytes_after}."""
+    bytes_before = int(df.memory_usage(deep=True).sum())
+    if df.columns.has_duplicates:
+        return df, {"columns": {}, "bytes_before": bytes_before, "bytes_after": bytes_before}
+
+    compacted = {}
+    columns: Dict[str, Dict[str, str]] = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_bool_dtype(series):
+            new = series
+        elif pd.api.types.is_integer_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+            new = _compact_int(series)
+        elif series.dtype == object:
+            new = _compact_object(series)
+        else:
+            new = series
+        compacted[col] = new
+        columns[str(col)] = {"original": str(series.dtype), "dtype": str(new.dtype)}
+
+    result = pd.DataFrame(compacted, index=df.index)
+    bytes_after = int(result.memory_usage(deep=True).sum())
+    logger.info(f"Dtype compaction: {bytes_before} -> {bytes_after} bytes ({len(df.columns)} columns)")
+    return result, {"columns": columns, "bytes_before": bytes_before, "bytes_after": bytes_after}
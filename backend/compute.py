@@ -0,0 +1,131 @@
+"""
+Compute executor for CPU-bound request work.
+Heavy pandas/sklearn work is dispatched from async handlers to a shared thread
+pool (or process pool for picklable pure functions) so the event loop stays free
+for cheap requests. Each endpoint has its own concurrency limit and queue metrics.
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from config import logger, COMPUTE_THREAD_WORKERS, COMPUTE_PROCESS_WORKERS, COMPUTE_LIMITS, COMPUTE_DEFAULT_LIMIT
+
+
+class _EndpointStats:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.wait_seconds / finished * 1000, 2) if finished else 0.0,
+            "avg_run_ms": round(self.run_seconds / finished * 1000, 2) if finished else 0.0,
+        }
+
+
+class ComputeExecutor:
+    """Thread and process pools behind per-endpoint concurrency limits."""
+
+    def __init__(
+        self,
+        thread_workers: int = COMPUTE_THREAD_WORKERS,
+        process_workers: int = COMPUTE_PROCESS_WORKERS,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = COMPUTE_DEFAULT_LIMIT,
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.limits = dict(COMPUTE_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, _EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="compute"
+                )
+            return self._thread_pool
+
+    @property
+    def process_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            return self._process_pool
+
+    def _endpoint(self, name: str):
+        if name not in self._stats:
+            limit = self.limits.get(name, self.default_limit)
+            self._stats[name] = _EndpointStats(limit)
+            self._semaphores[name] = asyncio.Semaphore(limit)
+        return self._semaphores[name], self._stats[name]
+
+    async def run(self, name: str, func: Callable, *args, process: bool = False, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in the thread (or process) pool under `name`'s limit.
+
+        Calls beyond the endpoint limit wait on the event loop without holding a
+        worker, so one busy endpoint cannot starve the others.
+        """
+        semaphore, stats = self._endpoint(name)
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        queued_at = time.perf_counter()
+
+        async with semaphore:
+            stats.queued -= 1
+            stats.running += 1
+            started_at = time.perf_counter()
+            stats.wait_seconds += started_at - queued_at
+            try:
+                pool = self.process_pool if process else self.thread_pool
+                result = await asyncio.get_running_loop().run_in_executor(pool, partial(func, *args, **kwargs))
+                stats.completed += 1
+                return result
+            except BaseException:
+                stats.failed += 1
+                raise
+            finally:
+                stats.running -= 1
+                stats.run_seconds += time.perf_counter() - started_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "thread_workers": self.thread_workers,
+            "process_workers": self.process_workers,
+            "endpoints": {name: s.as_dict() for name, s in sorted(self._stats.items())},
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+            self._process_pool = None
+        logger.info("Compute executor shut down")
+
+
+compute_executor = ComputeExecutor()
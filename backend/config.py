@@ -29,9 +29,43 @@ GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
 # --- Upload ---
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+# Enforced on the request body as it is received (see UploadSizeLimitMiddleware)
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "10"))
 MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
 ALLOWED_FILE_EXTENSIONS = {".csv", ".xlsx", ".xls", ".json"}
+# Content-addressed copies of the uploads, hard-linked from UPLOAD_DIR (same filesystem)
+UPLOAD_BLOB_DIR = os.getenv("UPLOAD_BLOB_DIR", os.path.join(UPLOAD_DIR, "blobs"))
+
+# --- Ingestion ---
+# Parsing engine: arrow (multithreaded), arrow_stream (bounded memory) or pandas
+INGEST_ENGINE = os.getenv("INGEST_ENGINE", "arrow")
+INGEST_USE_THREADS = os.getenv("INGEST_USE_THREADS", "true").lower() == "true"
+# CSV/JSON files are parsed in blocks of this size; column types are inferred from the first sample
+INGEST_CSV_BLOCK_MB = int(os.getenv("INGEST_CSV_BLOCK_MB", "16"))
+INGEST_SAMPLE_MB = int(os.getenv("INGEST_SAMPLE_MB", "1"))
+# Columns where more than this fraction of rows do not fit the sampled type are kept as text
+INGEST_MAX_REJECTED_RATIO = float(os.getenv("INGEST_MAX_REJECTED_RATIO", "0.01"))
+INGEST_REPORT_MAX_ROWS = int(os.getenv("INGEST_REPORT_MAX_ROWS", "100"))
+# Spreadsheet ingestion reports progress every this many rows
+INGEST_EXCEL_PROGRESS_ROWS = int(os.getenv("INGEST_EXCEL_PROGRESS_ROWS", "10000"))
+
+# --- Dtype Compaction ---
+COMPACT_DTYPES = os.getenv("COMPACT_DTYPES", "true").lower() == "true"
+# String columns become categoricals below this distinct/non-null ratio and count
+COMPACT_CATEGORY_MAX_RATIO = float(os.getenv("COMPACT_CATEGORY_MAX_RATIO", "0.5"))
+COMPACT_CATEGORY_MAX_UNIQUE = int(os.getenv("COMPACT_CATEGORY_MAX_UNIQUE", "10000"))
+
+# --- Columnar Dataset Cache ---
+# Shared by every worker process: must be on a local filesystem visible to all of them
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", os.path.join(UPLOAD_DIR, "columnar"))
+
+# --- In-Memory Stores ---
+# Least recently used entries are evicted to disk beyond these budgets (0 = unbounded)
+DATASET_STORE_BUDGET_MB = int(os.getenv("DATASET_STORE_BUDGET_MB", "4096"))
+MODEL_STORE_BUDGET_MB = int(os.getenv("MODEL_STORE_BUDGET_MB", "512"))
+MODEL_STORE_DIR = os.getenv("MODEL_STORE_DIR", os.path.join(UPLOAD_DIR, "models"))
 
 # --- Rate Limiting ---
 RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "100/minute")
@@ -42,6 +76,8 @@ RATE_LIMIT_UPLOAD = os.getenv("RATE_LIMIT_UPLOAD", "20/minute")
 ML_RANDOM_STATE = 42
 ML_DEFAULT_TEST_SIZE = 0.2
 ML_MAX_ESTIMATORS = 100
+SCORING_CHUNK_SIZE = int(os.getenv("SCORING_CHUNK_SIZE", "100000"))
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", str(os.cpu_count() or 1)))
 
 # --- Fairness Thresholds ---
 FAIRNESS_SPD_THRESHOLD = 0.1
@@ -52,6 +88,62 @@ FAIRNESS_EO_THRESHOLD = 0.1
 FAIRNESS_RISK_HIGH = 75
 FAIRNESS_RISK_MEDIUM = 90
 
+# --- Fairness Significance ---
+FAIRNESS_BOOTSTRAP_CHUNK = int(os.getenv("FAIRNESS_BOOTSTRAP_CHUNK", "500"))
+FAIRNESS_BOOTSTRAP_SEED = ML_RANDOM_STATE
+
+# --- Compute Executor ---
+# Thread pool for request handlers, process pool for picklable CPU-bound jobs
+COMPUTE_THREAD_WORKERS = int(os.getenv("COMPUTE_THREAD_WORKERS", str(min(32, (os.cpu_count() or 1) + 4))))
+COMPUTE_PROCESS_WORKERS = int(os.getenv("COMPUTE_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+# Concurrent jobs per endpoint, e.g. COMPUTE_LIMITS='{"train_model": 1}'
+COMPUTE_LIMITS = {
+    "fairness": 4,
+    "bias_analysis": 4,
+    "ds_eda": 2,
+    "train_model": 2,
+    "mitigation": 1,
+    "dataset_upload": 2,
+    **json.loads(os.getenv("COMPUTE_LIMITS", "{}")),
+}
+COMPUTE_DEFAULT_LIMIT = int(os.getenv("COMPUTE_DEFAULT_LIMIT", "4"))
+
+# --- Proxy Detection ---
+PROXY_WORKERS = int(os.getenv("PROXY_WORKERS", str(os.cpu_count() or 1)))
+PROXY_BLOCK_COLUMNS = int(os.getenv("PROXY_BLOCK_COLUMNS", "128"))
+PROXY_MAX_CATEGORIES = int(os.getenv("PROXY_MAX_CATEGORIES", "1000"))
+
+# --- Result Cache ---
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+PREDICTION_CACHE_MAX_ENTRIES = int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "32"))
+
+# --- Incremental Audits ---
+FAIRNESS_STATS_DIR = os.getenv("FAIRNESS_STATS_DIR", os.path.join(UPLOAD_DIR, "audit_stats"))
+# Count tables of audits not updated for this many days are deleted at startup (0: kept forever)
+FAIRNESS_STATS_RETENTION_DAYS = float(os.getenv("FAIRNESS_STATS_RETENTION_DAYS", "30"))
+
+# --- Persistence ---
+# "supabase" or "sqlite" (in-process stand-in for local runs and load tests)
+PERSISTENCE_BACKEND = os.getenv("PERSISTENCE_BACKEND", "supabase" if SUPABASE_URL else "sqlite")
+PERSISTENCE_SQLITE_PATH = os.getenv("PERSISTENCE_SQLITE_PATH", os.path.join(UPLOAD_DIR, "records.sqlite3"))
+# Updates not yet acknowledged by the backend
+PERSISTENCE_OUTBOX_PATH = os.getenv("PERSISTENCE_OUTBOX_PATH", os.path.join(UPLOAD_DIR, "outbox.sqlite3"))
+PERSISTENCE_FLUSH_SECONDS = float(os.getenv("PERSISTENCE_FLUSH_SECONDS", "0.5"))
+PERSISTENCE_BATCH_SIZE = int(os.getenv("PERSISTENCE_BATCH_SIZE", "100"))
+PERSISTENCE_RETRY_SECONDS = float(os.getenv("PERSISTENCE_RETRY_SECONDS", "2"))
+PERSISTENCE_MAX_RETRY_SECONDS = float(os.getenv("PERSISTENCE_MAX_RETRY_SECONDS", "300"))
+
+# --- Background Jobs ---
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(UPLOAD_DIR, "jobs.sqlite3"))
+# Worker processes started with the app, by one uvicorn worker (0 = run workers separately: python job_worker.py)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+# Running jobs without a heartbeat for this long are considered orphaned and requeued
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+
 
 # --- Logging ---
 class JSONFormatter(logging.Formatter):
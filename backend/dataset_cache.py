@@ -0,0 +1,169 @@
+"""
+Columnar on-disk dataset cache.
+Uploads are converted once to an uncompressed Arrow IPC (Feather v2) file that
+keeps the pandas schema, including categorical encodings, plus the dataset's
+store metadata. Loads memory-map the file and only materialize the requested
+columns, instead of re-parsing CSV/Excel after every restart.
+
+The files also act as the dataset registry shared by every worker process.
+Each file holds a single record batch, so numeric columns without nulls are
+attached as zero-copy views of the mapping: workers share the page cache
+instead of each holding a private copy. Files are replaced atomically, and
+their version (inode and mtime) tells a worker when its copy is outdated.
+
+Datasets uploaded from identical files share one file through hard links; a
+small JSON sidecar holds what differs between them (name, upload time...).
+"""
+
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import logger, DATASET_CACHE_DIR
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Schema metadata key holding the dataset's store entry (name, profiling, fingerprint...)
+_META_KEY = b"auditiq"
+
+
+def cache_path(dataset_id) -> str:
+    return os.path.join(DATASET_CACHE_DIR, f"{dataset_id}.arrow")
+
+
+def _alias_path(dataset_id) -> str:
+    return os.path.join(DATASET_CACHE_DIR, f"{dataset_id}.alias.json")
+
+
+def _source_is_newer(path: str, source_path: Optional[str]) -> bool:
+    return bool(source_path) and os.path.exists(source_path) and os.path.getmtime(source_path) > os.path.getmtime(path)
+
+
+def columnar_version(dataset_id) -> Optional[str]:
+    """Version of the cached file (changes whenever it is rewritten), or None if absent."""
+    try:
+        stat = os.stat(cache_path(dataset_id))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_ino}-{stat.st_mtime_ns}"
+
+
+def has_columnar(dataset_id, source_path: Optional[str] = None) -> bool:
+    """Whether a usable cache exists (and is not older than the source file, if given)."""
+    path = cache_path(dataset_id)
+    return PYARROW_AVAILABLE and os.path.exists(path) and not _source_is_newer(path, source_path)
+
+
+def save_columnar(dataset_id, df: pd.DataFrame, metadata: Optional[Dict[str, Any]] = None) -> bool:
+    """Write a dataset to the columnar cache. Returns False if it cannot be represented in Arrow."""
+    if not PYARROW_AVAILABLE:
+        return False
+    path = cache_path(dataset_id)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        # One record batch: contiguous columns can be mapped without copying
+        table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+        schema_meta = dict(table.schema.metadata or {})
+        schema_meta[_META_KEY] = json.dumps(metadata or {}, default=str).encode("utf-8")
+        table = table.replace_schema_metadata(schema_meta)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        _remove(_alias_path(dataset_id))
+        return True
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        # Mixed-type object columns etc.: the raw file stays the source of truth
+        logger.warning(f"Columnar cache skipped for dataset {dataset_id}: {e}")
+        for stale in (tmp_path, path):
+            if os.path.exists(stale):
+                os.remove(stale)
+        return False
+
+
+def _open(dataset_id):
+    return pa.ipc.open_file(pa.memory_map(cache_path(dataset_id), "r"))
+
+
+def columnar_metadata(dataset_id) -> Dict[str, Any]:
+    """Store metadata saved with the dataset, read from the file footer only."""
+    meta = _open(dataset_id).schema.metadata or {}
+    metadata = json.loads(meta[_META_KEY]) if _META_KEY in meta else {}
+    try:
+        with open(_alias_path(dataset_id), encoding="utf-8") as f:
+            metadata.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    return metadata
+
+
+def link_columnar(source_id, dataset_id, metadata: Dict[str, Any]) -> bool:
+    """Give `dataset_id` the cached file of `source_id` (same content), with its own `metadata`.
+
+    Returns False if the file cannot be shared (no cache, or no hard links).
+    """
+    source, path = cache_path(source_id), cache_path(dataset_id)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(_alias_path(dataset_id), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, default=str)
+        os.link(source, tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logger.warning(f"Columnar cache of {source_id} not shared with {dataset_id}: {e}")
+        _remove(_alias_path(dataset_id))
+        return False
+
+
+def columnar_columns(dataset_id) -> List[str]:
+    return list(_open(dataset_id).schema.names)
+
+
+def load_columnar(dataset_id, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Memory-mapped load; only `columns` (all when None) are materialized.
+
+    Numeric columns without nulls stay read-only views of the mapped file.
+    """
+    table = _open(dataset_id).read_all()
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table_to_frame(table)
+
+
+def table_to_frame(table, self_destruct: bool = False) -> pd.DataFrame:
+    """pandas frame of an Arrow table, with missing values as pd.read_csv represents them.
+
+    With self_destruct, each Arrow column is released once converted (the table
+    must not be used afterwards), which halves the peak memory of in-memory tables.
+    """
+    # Arrow nulls come back as None in string and boolean columns; pd.read_csv gives NaN
+    with_none = [
+        field.name for field, column in zip(table.schema, table.columns)
+        if column.null_count and (
+            pa.types.is_string(field.type) or pa.types.is_large_string(field.type) or pa.types.is_boolean(field.type)
+        )
+    ]
+    # split_blocks avoids consolidating the columns into freshly allocated 2D blocks
+    df = table.to_pandas(split_blocks=True, self_destruct=self_destruct)
+    for name in with_none:
+        df[name] = df[name].fillna(np.nan)
+    return df
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def remove_columnar(dataset_id) -> None:
+    _remove(cache_path(dataset_id))
+    _remove(_alias_path(dataset_id))
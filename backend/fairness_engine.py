@@ -0,0 +1,641 @@
+"""
+Vectorized fairness engine.
+Sensitive attributes are factorized once and every group metric is derived from a
+per-group confusion count table (TP, FP, FN, TN) built with a single bincount pass.
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, List, Any, Optional
+
+from config import (
+    logger,
+    FAIRNESS_SPD_THRESHOLD, FAIRNESS_DI_LOW, FAIRNESS_DI_HIGH,
+    FAIRNESS_EOD_THRESHOLD, FAIRNESS_EO_THRESHOLD,
+    FAIRNESS_RISK_HIGH, FAIRNESS_RISK_MEDIUM,
+)
+from schemas import FairnessMetric
+
+# Column layout of count tables
+TP, FP, FN, TN = 0, 1, 2, 3
+N_CELLS = 4
+
+# Metrics derived from count tables
+METRIC_KEYS = ("spd", "di", "eod", "eo")
+
+# Intersectional groups
+INTERSECTION_SEPARATOR = "|"
+POOLED_GROUP_LABEL = "autres"
+
+
+@dataclass
+class GroupCounts:
+    """Confusion counts for every group of one sensitive attribute."""
+
+    labels: List[Any]
+    counts: np.ndarray  # shape (n_groups, 4), columns TP, FP, FN, TN
+
+    @property
+    def sizes(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+    def merge(self, other: "GroupCounts") -> "GroupCounts":
+        """Sum two tables group by group; groups keep their first-seen order."""
+        index = {label: i for i, label in enumerate(self.labels)}
+        labels = list(self.labels)
+        for label in other.labels:
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+
+        counts = np.zeros((len(labels), N_CELLS), dtype=np.int64)
+        counts[:len(self.labels)] = self.counts
+        np.add.at(counts, [index[label] for label in other.labels], other.counts)
+        return GroupCounts(labels=labels, counts=counts)
+
+
+def favorable_mask(values, favorable_outcome) -> np.ndarray:
+    """Boolean mask of values equal to the favorable outcome.
+
+    Values are compared as strings (so 1, "1" and np.int64(1) all match), but the
+    conversion is done once per distinct value instead of once per row.
+    Missing values never match.
+    """
+    codes, uniques = pd.factorize(values)
+    return _mask_from_codes(codes, uniques, favorable_outcome)
+
+
+def _mask_from_codes(codes: np.ndarray, uniques, favorable_outcome) -> np.ndarray:
+    fav_str = str(favorable_outcome)
+    matches = np.fromiter((str(u) == fav_str for u in uniques), dtype=bool, count=len(uniques))
+    # Code -1 (missing) indexes the trailing False
+    return np.append(matches, False)[codes]
+
+
+class EncodedFrame:
+    """Factorized columns and favorable-outcome masks of a dataframe.
+
+    Each column is factorized at most once, so several audits of the same data
+    (different targets, outcomes or attribute sets) share the encoding work.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._codes: Dict[str, Any] = {}
+        self._masks: Dict[Any, np.ndarray] = {}
+
+    def codes(self, column: str):
+        """(codes, uniques) of a column, as returned by pd.factorize."""
+        if column not in self._codes:
+            self._codes[column] = pd.factorize(self.df[column])
+        return self._codes[column]
+
+    def mask(self, column: str, favorable_outcome) -> np.ndarray:
+        """Favorable-outcome mask of a column (see favorable_mask)."""
+        key = (column, str(favorable_outcome))
+        if key not in self._masks:
+            codes, uniques = self.codes(column)
+            self._masks[key] = _mask_from_codes(codes, uniques, favorable_outcome)
+        return self._masks[key]
+
+
+def confusion_counts(codes: np.ndarray, n_groups: int, pred_mask: np.ndarray, actual_mask: np.ndarray) -> np.ndarray:
+    """Per-group TP/FP/FN/TN counts in one bincount over integer group codes."""
+    cell = (~actual_mask).astype(np.int64) + 2 * (~pred_mask).astype(np.int64)
+    valid = codes >= 0
+    flat = codes[valid].astype(np.int64) * N_CELLS + cell[valid]
+    return np.bincount(flat, minlength=n_groups * N_CELLS).reshape(n_groups, N_CELLS)
+
+
+def count_table(groups, pred_mask: np.ndarray, actual_mask: np.ndarray) -> GroupCounts:
+    """Factorize a sensitive attribute and build its group count table."""
+    codes, uniques = pd.factorize(groups)
+    return count_table_from_codes(codes, uniques, pred_mask, actual_mask)
+
+
+def count_table_from_codes(codes: np.ndarray, uniques, pred_mask: np.ndarray, actual_mask: np.ndarray) -> GroupCounts:
+    """Group count table of an already factorized sensitive attribute."""
+    return GroupCounts(
+        labels=list(uniques),
+        counts=confusion_counts(codes, len(uniques), pred_mask, actual_mask),
+    )
+
+
+def group_outcome_counts(groups, success_mask: Optional[np.ndarray] = None):
+    """Group sizes and favorable-outcome counts in one pass, largest group first.
+
+    Groups are ordered like `value_counts()` (missing values excluded). Returns
+    (labels, sizes, successes); successes is None when no mask is given.
+    """
+    codes, uniques = pd.factorize(groups)
+    valid = codes >= 0
+    sizes = np.bincount(codes[valid], minlength=len(uniques))
+    successes = None
+    if success_mask is not None:
+        successes = np.bincount(
+            codes[valid], weights=np.asarray(success_mask)[valid], minlength=len(uniques)
+        ).astype(np.int64)
+
+    order = np.argsort(-sizes, kind="stable")
+    labels = [uniques[i] for i in order]
+    return labels, sizes[order], successes[order] if successes is not None else None
+
+
+def apply_min_support(table: GroupCounts, min_support: int, strategy: str) -> GroupCounts:
+    """Pool groups smaller than min_support into one group, or drop them."""
+    small = table.sizes < min_support
+    if not small.any():
+        return table
+
+    keep = ~small
+    labels = [label for label, k in zip(table.labels, keep) if k]
+    counts = table.counts[keep]
+    if strategy == "pool":
+        labels.append(POOLED_GROUP_LABEL)
+        counts = np.vstack([counts, table.counts[small].sum(axis=0)])
+    return GroupCounts(labels=labels, counts=counts)
+
+
+def intersection_count_tables(
+    df: pd.DataFrame,
+    attributes: List[str],
+    pred_mask: np.ndarray,
+    actual_mask: np.ndarray,
+    max_size: Optional[int] = None,
+    min_support: int = 1,
+    small_group_strategy: str = "pool",
+    encoded: Optional[EncodedFrame] = None,
+) -> Dict[str, GroupCounts]:
+    """Count tables for every combination of 2+ sensitive attributes.
+
+    Rows are scanned once: the attribute codes are hashed into a joint key whose
+    observed values form a sparse crosstab. Each combination is then a marginal of
+    that crosstab, computed over cells instead of rows.
+    """
+    attributes = [a for a in attributes if a in df.columns]
+    if len(attributes) < 2:
+        return {}
+
+    encoded = encoded or EncodedFrame(df)
+    codes, uniques = [], []
+    for attr in attributes:
+        attr_codes, attr_uniques = encoded.codes(attr)
+        codes.append(attr_codes)
+        uniques.append(list(attr_uniques))
+
+    # Rows with a missing value in any attribute are left out of intersections
+    valid = np.logical_and.reduce([c >= 0 for c in codes])
+    joint = np.zeros(int(valid.sum()), dtype=np.int64)
+    radix = 1
+    for attr_codes, attr_uniques in zip(codes, uniques):
+        k = max(len(attr_uniques), 1)
+        if radix * k >= 2 ** 62:
+            # Compact the key before it overflows int64
+            _, joint = np.unique(joint, return_inverse=True)
+            radix = int(joint.max()) + 1 if len(joint) else 1
+        joint = joint * k + attr_codes[valid]
+        radix *= k
+
+    _, first_row, cell_of_row = np.unique(joint, return_index=True, return_inverse=True)
+    # Order cells by first appearance, like pd.factorize does for single attributes
+    order = np.argsort(first_row, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    cell_counts = confusion_counts(rank[cell_of_row], len(order), pred_mask[valid], actual_mask[valid])
+    cell_codes = np.stack([c[valid][first_row[order]] for c in codes], axis=1)
+
+    max_size = min(max_size or len(attributes), len(attributes))
+    tables = {}
+    for size in range(2, max_size + 1):
+        for subset in combinations(range(len(attributes)), size):
+            sub_codes, first_cell, cell_group = np.unique(
+                cell_codes[:, subset], axis=0, return_index=True, return_inverse=True
+            )
+            cell_group = cell_group.reshape(-1)
+            counts = np.zeros((len(sub_codes), N_CELLS), dtype=np.int64)
+            np.add.at(counts, cell_group, cell_counts)
+
+            group_order = np.argsort(first_cell, kind="stable")
+            labels = [
+                INTERSECTION_SEPARATOR.join(str(uniques[a][c]) for a, c in zip(subset, sub_codes[g]))
+                for g in group_order
+            ]
+            table = GroupCounts(labels=labels, counts=counts[group_order])
+
+            key = INTERSECTION_SEPARATOR.join(attributes[a] for a in subset)
+            tables[key] = apply_min_support(table, min_support, small_group_strategy)
+
+    return tables
+
+
+def build_count_tables(
+    df: pd.DataFrame,
+    target_column: str,
+    sensitive_attributes: List[str],
+    favorable_outcome: Any = 1,
+    predictions=None,
+    intersectional: bool = False,
+    max_intersection_size: Optional[int] = None,
+    min_group_support: int = 1,
+    small_group_strategy: str = "pool",
+) -> Dict[str, GroupCounts]:
+    """Count tables for each sensitive attribute (and their intersections) present in the dataframe."""
+    encoded = EncodedFrame(df)
+    actual_mask = encoded.mask(target_column, favorable_outcome)
+    pred_mask = actual_mask if predictions is None else favorable_mask(predictions, favorable_outcome)
+
+    tables = {}
+    for attr in sensitive_attributes:
+        if attr not in df.columns:
+            logger.warning(f"Attribute {attr} not found in columns: {df.columns.tolist()}")
+            continue
+        tables[attr] = count_table_from_codes(*encoded.codes(attr), pred_mask, actual_mask)
+
+    if intersectional:
+        tables.update(
+            intersection_count_tables(
+                df, sensitive_attributes, pred_mask, actual_mask,
+                max_size=max_intersection_size,
+                min_support=min_group_support,
+                small_group_strategy=small_group_strategy,
+                encoded=encoded,
+            )
+        )
+    return tables
+
+
+class SharedCountTables:
+    """Count tables of one dataframe, shared across several audit configurations.
+
+    Columns are encoded once (EncodedFrame) and every table is keyed by what it
+    depends on (target, favorable outcome, prediction source, attributes), so specs
+    that overlap reuse each other's tables.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.encoded = EncodedFrame(df)
+        self._tables: Dict[Any, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, compute):
+        if key in self._tables:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._tables[key] = compute()
+        return self._tables[key]
+
+    def build(
+        self,
+        target_column: str,
+        sensitive_attributes: List[str],
+        favorable_outcome: Any = 1,
+        prediction_key: Optional[str] = None,
+        pred_mask: Optional[np.ndarray] = None,
+        intersectional: bool = False,
+        max_intersection_size: Optional[int] = None,
+        min_group_support: int = 1,
+        small_group_strategy: str = "pool",
+    ) -> Dict[str, GroupCounts]:
+        """Same tables as build_count_tables; `prediction_key` identifies `pred_mask`."""
+        base_key = (target_column, str(favorable_outcome), prediction_key)
+        actual_mask = self.encoded.mask(target_column, favorable_outcome)
+        if pred_mask is None:
+            pred_mask = actual_mask
+
+        tables = {}
+        for attr in sensitive_attributes:
+            if attr not in self.df.columns:
+                logger.warning(f"Attribute {attr} not found in columns: {self.df.columns.tolist()}")
+                continue
+            tables[attr] = self._cached(
+                (base_key, attr),
+                lambda attr=attr: count_table_from_codes(*self.encoded.codes(attr), pred_mask, actual_mask),
+            )
+
+        if intersectional:
+            options = (tuple(sensitive_attributes), max_intersection_size, min_group_support, small_group_strategy)
+            tables.update(self._cached(
+                (base_key, options),
+                lambda: intersection_count_tables(
+                    self.df, sensitive_attributes, pred_mask, actual_mask,
+                    max_size=max_intersection_size,
+                    min_support=min_group_support,
+                    small_group_strategy=small_group_strategy,
+                    encoded=self.encoded,
+                ),
+            ))
+        return tables
+
+
+def merge_count_tables(total: Dict[str, GroupCounts], delta: Dict[str, GroupCounts]) -> Dict[str, GroupCounts]:
+    """Merge the count tables of two disjoint sets of rows."""
+    merged = dict(total)
+    for key, table in delta.items():
+        merged[key] = merged[key].merge(table) if key in merged else table
+    return merged
+
+
+def group_label(value) -> str:
+    """Text form of a group label: 25, 25.0 and "25" are the same group."""
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def text_labelled(tables: Dict[str, GroupCounts]) -> Dict[str, GroupCounts]:
+    """Count tables keyed by text group labels (groups whose labels coincide are merged).
+
+    Streamed CSV audits read every value as text: tables merged with them must
+    use the same labels.
+    """
+    empty = GroupCounts(labels=[], counts=np.zeros((0, N_CELLS), dtype=np.int64))
+    return {
+        key: empty.merge(GroupCounts(labels=[group_label(label) for label in table.labels], counts=table.counts))
+        for key, table in tables.items()
+    }
+
+
+def stream_count_tables(
+    chunks,
+    target_column: str,
+    sensitive_attributes: List[str],
+    favorable_outcome: Any = 1,
+    prediction_column: Optional[str] = None,
+    intersectional: bool = False,
+    max_intersection_size: Optional[int] = None,
+    min_group_support: int = 1,
+    small_group_strategy: str = "pool",
+) -> Dict[str, GroupCounts]:
+    """Accumulate count tables over an iterable of dataframe chunks.
+
+    Only the per-group counts are kept between chunks, so memory is bounded by the
+    chunk size plus the number of groups. Minimum support is applied once all
+    chunks are merged (pass 1 to keep the raw, mergeable tables).
+    """
+    tables: Dict[str, GroupCounts] = {}
+    for chunk in chunks:
+        predictions = chunk[prediction_column] if prediction_column else None
+        delta = build_count_tables(
+            chunk, target_column, sensitive_attributes, favorable_outcome, predictions,
+            intersectional=intersectional, max_intersection_size=max_intersection_size,
+        )
+        tables = merge_count_tables(tables, delta)
+
+    return pool_small_groups(tables, sensitive_attributes, min_group_support, small_group_strategy)
+
+
+def pool_small_groups(
+    tables: Dict[str, GroupCounts],
+    sensitive_attributes: List[str],
+    min_support: int,
+    strategy: str = "pool",
+) -> Dict[str, GroupCounts]:
+    """Apply the minimum support to intersection tables (single attributes are left intact)."""
+    return {
+        key: (
+            apply_min_support(table, min_support, strategy)
+            if INTERSECTION_SEPARATOR in key and key not in sensitive_attributes
+            else table
+        )
+        for key, table in tables.items()
+    }
+
+
+def group_rates(counts: np.ndarray) -> Dict[str, np.ndarray]:
+    """Selection rate, TPR and FPR of each group (0 when the denominator is empty)."""
+    counts = np.asarray(counts, dtype=np.int64)
+    tp, fp, fn, tn = counts[..., TP], counts[..., FP], counts[..., FN], counts[..., TN]
+    n = tp + fp + fn + tn
+    positives = tp + fn
+    negatives = fp + tn
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positive_rate = np.where(n > 0, (tp + fp) / n, 0.0)
+        tpr = np.where(positives > 0, tp / positives, 0.0)
+        fpr = np.where(negatives > 0, fp / negatives, 0.0)
+
+    return {"positive_rate": positive_rate, "tpr": tpr, "fpr": fpr, "count": n}
+
+
+def metric_values(counts: np.ndarray, ref: int) -> Dict[str, np.ndarray]:
+    """SPD, DI, EOD and EO of every group against the reference group.
+
+    `counts` has shape (..., n_groups, 4); leading axes (e.g. bootstrap draws) are kept.
+    """
+    rates = group_rates(counts)
+    ref_rate = rates["positive_rate"][..., ref:ref + 1]
+    eod = rates["tpr"] - rates["tpr"][..., ref:ref + 1]
+    fpr_diff = rates["fpr"] - rates["fpr"][..., ref:ref + 1]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        di = np.where(ref_rate > 0, rates["positive_rate"] / ref_rate, 1.0)
+
+    return {
+        "spd": rates["positive_rate"] - ref_rate,
+        "di": di,
+        "eod": eod,
+        "eo": (np.abs(eod) + np.abs(fpr_diff)) / 2,
+    }
+
+
+def sweep_thresholds(scores, resolution: int) -> np.ndarray:
+    """Ascending thresholds: every distinct score, or score quantiles beyond `resolution`."""
+    scores = np.asarray(scores, dtype=float)
+    scores = scores[~np.isnan(scores)]
+    distinct = np.unique(scores)
+    if len(distinct) <= resolution:
+        return distinct
+    return np.unique(np.quantile(scores, np.linspace(0, 1, resolution)))
+
+
+def threshold_count_tensor(scores, groups, actual_mask: np.ndarray, thresholds: np.ndarray):
+    """Confusion counts of every group at every threshold ("positive" means score >= t).
+
+    Scores are sorted once per group; counts at all thresholds come from cumulative
+    sums of positives and negatives, located by binary search, so no threshold is
+    ever re-applied to the rows. Returns (labels, sizes, counts of shape (T, G, 4)).
+    """
+    scores = np.asarray(scores, dtype=float)
+    codes, uniques = pd.factorize(groups)
+    valid = (codes >= 0) & ~np.isnan(scores)
+    codes, scores, actual = codes[valid], scores[valid], np.asarray(actual_mask)[valid]
+
+    order = np.lexsort((-scores, codes))
+    codes, scores, actual = codes[order], scores[order], actual[order]
+    sizes = np.bincount(codes, minlength=len(uniques))
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+
+    thresholds = np.asarray(thresholds, dtype=float)
+    counts = np.zeros((len(thresholds), len(uniques), N_CELLS), dtype=np.int64)
+    for g in range(len(uniques)):
+        seg = slice(bounds[g], bounds[g + 1])
+        cum_tp = np.concatenate([[0], np.cumsum(actual[seg])])
+        cum_fp = np.concatenate([[0], np.cumsum(~actual[seg])])
+        # Number of rows with score >= t in a descending segment
+        k = np.searchsorted(-scores[seg], -thresholds, side="right")
+        tp, fp = cum_tp[k], cum_fp[k]
+        counts[:, g, TP] = tp
+        counts[:, g, FP] = fp
+        counts[:, g, FN] = cum_tp[-1] - tp
+        counts[:, g, TN] = cum_fp[-1] - fp
+
+    return list(uniques), sizes, counts
+
+
+def reference_index(table: GroupCounts) -> int:
+    """Index of the reference group: the largest one (first on ties)."""
+    return int(np.argmax(table.sizes))
+
+
+def _difference_status(value: float, threshold: float) -> str:
+    return "pass" if abs(value) < threshold else ("warning" if abs(value) < 0.2 else "fail")
+
+
+def _di_status(di: float) -> str:
+    return "pass" if FAIRNESS_DI_LOW <= di <= FAIRNESS_DI_HIGH else ("warning" if 0.6 <= di <= 1.5 else "fail")
+
+
+def _closest_to_parity(low: float, high: float, parity: float) -> float:
+    """Value of the interval [low, high] closest to the parity value."""
+    return min(max(parity, low), high)
+
+
+def _metric(name, value, description, threshold, status, significance=None, key=None, index=None):
+    """FairnessMetric, with interval, p-value and interval-based status when available."""
+    extra = {}
+    if significance is not None and key in significance:
+        sig = significance[key]
+        low, high = float(sig["ci_low"][index]), float(sig["ci_high"][index])
+        extra = {
+            "ci_low": round(low, 4),
+            "ci_high": round(high, 4),
+            "p_value": float(sig["p_value"][index]),
+        }
+        # The metric only fails if even the fairest value of its interval fails
+        if key == "di":
+            status = _di_status(_closest_to_parity(low, high, 1.0))
+        else:
+            status = _difference_status(_closest_to_parity(low, high, 0.0), threshold)
+
+    return FairnessMetric(
+        name=name, value=value, description=description, threshold=threshold, status=status, **extra
+    )
+
+
+def _attribute_metrics(table: GroupCounts, significance=None):
+    """Build the SPD/DI/EOD/EO metrics of every group against the largest group."""
+    rates = group_rates(table.counts)
+    ref = reference_index(table)
+    ref_group = table.labels[ref]
+    ref_rate = float(rates["positive_rate"][ref])
+    ref_tpr = float(rates["tpr"][ref])
+    ref_fpr = float(rates["fpr"][ref])
+
+    attr_metrics = []
+    scores = []
+    for i, group in enumerate(table.labels):
+        if i == ref:
+            continue
+
+        positive_rate = float(rates["positive_rate"][i])
+        tpr = float(rates["tpr"][i])
+        fpr = float(rates["fpr"][i])
+
+        # 1. Statistical Parity Difference
+        spd = positive_rate - ref_rate
+        attr_metrics.append(
+            _metric(
+                name="Parite Statistique (SPD)",
+                value=round(spd, 4),
+                description=f"Difference de taux de selection entre {group} et {ref_group}",
+                threshold=FAIRNESS_SPD_THRESHOLD,
+                status=_difference_status(spd, FAIRNESS_SPD_THRESHOLD),
+                significance=significance, key="spd", index=i,
+            )
+        )
+        scores.append(1 - min(abs(spd), 1))
+
+        # 2. Disparate Impact Ratio
+        di = positive_rate / ref_rate if ref_rate > 0 else 1.0
+        attr_metrics.append(
+            _metric(
+                name="Impact Disparate (DI)",
+                value=round(di, 4),
+                description=f"Ratio de selection entre {group} et {ref_group}",
+                threshold=FAIRNESS_DI_LOW,
+                status=_di_status(di),
+                significance=significance, key="di", index=i,
+            )
+        )
+        scores.append(min(di, 1 / di) if di > 0 else 0)
+
+        # 3. Equal Opportunity Difference
+        eod = tpr - ref_tpr
+        attr_metrics.append(
+            _metric(
+                name="Egalite des Chances (EOD)",
+                value=round(eod, 4),
+                description=f"Difference de taux de vrais positifs entre {group} et {ref_group}",
+                threshold=FAIRNESS_EOD_THRESHOLD,
+                status=_difference_status(eod, FAIRNESS_EOD_THRESHOLD),
+                significance=significance, key="eod", index=i,
+            )
+        )
+        scores.append(1 - min(abs(eod), 1))
+
+        # 4. Equalized Odds Difference
+        fpr_diff = fpr - ref_fpr
+        avg_odds = (abs(eod) + abs(fpr_diff)) / 2
+        attr_metrics.append(
+            _metric(
+                name="Odds Egalises (EO)",
+                value=round(avg_odds, 4),
+                description=f"Moyenne des differences TPR et FPR entre {group} et {ref_group}",
+                threshold=FAIRNESS_EO_THRESHOLD,
+                status=_difference_status(avg_odds, FAIRNESS_EO_THRESHOLD),
+                significance=significance, key="eo", index=i,
+            )
+        )
+        scores.append(1 - min(avg_odds, 1))
+
+    return attr_metrics, scores
+
+
+def fairness_from_tables(tables: Dict[str, GroupCounts], significance: Optional[Dict] = None) -> Dict[str, Any]:
+    """Fairness metrics, overall score and risk level from group count tables.
+
+    `significance` optionally maps attributes to per-metric intervals and p-values
+    (see fairness_stats.significance_for_tables).
+    """
+    metrics_by_attribute = {}
+    all_scores = []
+
+    for attr, table in tables.items():
+        if len(table.labels) < 2:
+            logger.warning(f"Not enough groups for {attr} (needed 2+, found {len(table.labels)})")
+            continue
+
+        attr_metrics, scores = _attribute_metrics(table, (significance or {}).get(attr))
+        metrics_by_attribute[attr] = attr_metrics
+        all_scores.extend(scores)
+
+    overall_score = np.mean(all_scores) * 100 if all_scores else 100
+
+    if overall_score >= FAIRNESS_RISK_MEDIUM:
+        risk_level = "faible"
+    elif overall_score >= FAIRNESS_RISK_HIGH:
+        risk_level = "moyen"
+    else:
+        risk_level = "eleve"
+
+    return {
+        "overall_score": round(overall_score, 2),
+        "risk_level": risk_level,
+        "metrics_by_attribute": metrics_by_attribute,
+        "bias_detected": any(m.status == "fail" for attr in metrics_by_attribute.values() for m in attr),
+    }
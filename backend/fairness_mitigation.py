@@ -0,0 +1,260 @@
+"""
+Fairness mitigation.
+Post-processing: per-group decision thresholds chosen from a vectorized ROC sweep
+of every group, under a demographic-parity or equalized-odds constraint.
+Pre-processing: reweighing and group-aware resampling of the training set, with
+candidate models trained in parallel and compared on a fairness/accuracy frontier.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from config import logger, ML_RANDOM_STATE
+from compute import compute_executor
+from fairness_engine import (
+    TP, TN, count_table, group_label, group_rates, metric_values, reference_index,
+    sweep_thresholds, threshold_count_tensor,
+)
+from training import build_classifier
+
+try:
+    from imblearn.over_sampling import RandomOverSampler
+    from imblearn.under_sampling import RandomUnderSampler
+    IMBLEARN_AVAILABLE = True
+except ImportError:
+    IMBLEARN_AVAILABLE = False
+
+MITIGATION_CONSTRAINTS = ("demographic_parity", "equalized_odds")
+
+# Decision rule of an unmitigated probabilistic classifier
+DEFAULT_THRESHOLD = 0.5
+
+
+def _violation(rates: Dict[str, np.ndarray], constraint: str) -> np.ndarray:
+    """Largest between-group gap of the constrained rates (last axis = groups)."""
+    def spread(values):
+        return values.max(axis=-1) - values.min(axis=-1)
+
+    if constraint == "demographic_parity":
+        return spread(rates["positive_rate"])
+    return np.maximum(spread(rates["tpr"]), spread(rates["fpr"]))
+
+
+def _nearest_thresholds(rates: Dict[str, np.ndarray], targets: Dict[str, np.ndarray]) -> np.ndarray:
+    """(targets, groups) index of the threshold whose rates are closest to each target (largest deviation)."""
+    distance = None
+    for key, target in targets.items():
+        deviation = np.abs(rates[key][None] - target[:, None, None])
+        distance = deviation if distance is None else np.maximum(distance, deviation)
+    return distance.argmin(axis=1)
+
+
+def fit_group_thresholds(
+    scores,
+    groups,
+    actual_mask: np.ndarray,
+    constraint: str = "demographic_parity",
+    tolerance: float = 0.05,
+    resolution: int = 101,
+    grid_size: int = 41,
+) -> Dict[str, Any]:
+    """Per-group thresholds maximizing accuracy under a fairness constraint.
+
+    Every group's confusion counts are computed at all candidate thresholds in one
+    sweep. The search then walks a grid of target operating points (a selection
+    rate, or a (TPR, FPR) pair for equalized odds): each group takes the threshold
+    closest to the target, and the most accurate point whose gap stays within
+    `tolerance` wins. When no point is feasible, the smallest gap is returned.
+    """
+    if constraint not in MITIGATION_CONSTRAINTS:
+        raise ValueError(f"Unknown constraint '{constraint}'")
+
+    scores = np.asarray(scores, dtype=float)
+    thresholds = sweep_thresholds(scores, resolution)
+    if len(thresholds) == 0:
+        raise ValueError("No valid scores")
+    # One threshold above every score, so that "select nobody" is reachable
+    thresholds = np.append(thresholds, np.nextafter(thresholds[-1], np.inf))
+
+    labels, sizes, counts = threshold_count_tensor(scores, groups, actual_mask, thresholds)
+    if len(labels) < 2:
+        raise ValueError("At least two groups are required")
+    rates = group_rates(counts)
+    correct = counts[..., TP] + counts[..., TN]
+
+    axis = np.linspace(0, 1, grid_size)
+    if constraint == "demographic_parity":
+        targets = {"positive_rate": axis}
+    else:
+        tpr_target, fpr_target = (a.ravel() for a in np.meshgrid(axis, axis, indexing="ij"))
+        targets = {"tpr": tpr_target, "fpr": fpr_target}
+
+    # (targets, groups) index of the threshold each group uses for each target,
+    # grid_size targets at a time: the (targets, thresholds, groups) distances of
+    # the whole equalized-odds grid would be grid_size times larger
+    n_targets = len(next(iter(targets.values())))
+    choice = np.concatenate([
+        _nearest_thresholds(rates, {key: values[start:start + grid_size] for key, values in targets.items()})
+        for start in range(0, n_targets, grid_size)
+    ])
+    group_idx = np.arange(len(labels))
+    chosen_rates = {key: values[choice, group_idx] for key, values in rates.items()}
+    violation = _violation(chosen_rates, constraint)
+    accuracy = correct[choice, group_idx].sum(axis=1) / sizes.sum()
+
+    feasible = violation <= tolerance
+    if feasible.any():
+        best = int(np.argmax(np.where(feasible, accuracy, -np.inf)))
+    else:
+        best = int(np.argmin(violation))
+
+    _, _, raw_counts = threshold_count_tensor(scores, groups, actual_mask, [DEFAULT_THRESHOLD])
+    raw_rates = group_rates(raw_counts[0])
+
+    return {
+        "labels": labels,
+        "thresholds": {group_label(label): float(thresholds[choice[best, g]]) for g, label in enumerate(labels)},
+        "accuracy": float(accuracy[best]),
+        "violation": float(violation[best]),
+        "feasible": bool(feasible[best]),
+        "baseline": {
+            "accuracy": float((raw_counts[0][:, TP] + raw_counts[0][:, TN]).sum() / sizes.sum()),
+            "violation": float(_violation(raw_rates, constraint)),
+        },
+    }
+
+
+# --- Pre-processing ---
+
+PREPROCESSING_STRATEGIES = ("baseline", "reweighing", "oversample", "undersample")
+
+
+def reweighing_weights(groups, actual_mask: np.ndarray) -> np.ndarray:
+    """Reweighing sample weights w(g, y) = P(g) P(y) / P(g, y), from group/label counts.
+
+    Weighted, every group has the same favorable rate as the whole dataset
+    (Kamiran & Calders). Rows with a missing group keep a weight of 1.
+    """
+    codes, uniques = pd.factorize(groups)
+    actual = np.asarray(actual_mask, dtype=bool)
+    valid = codes >= 0
+    n_groups = len(uniques)
+
+    cells = codes[valid] * 2 + actual[valid]
+    cell_counts = np.bincount(cells, minlength=2 * n_groups).reshape(n_groups, 2)
+    n = cell_counts.sum()
+    expected = np.outer(cell_counts.sum(axis=1), cell_counts.sum(axis=0)) / max(n, 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cell_weights = np.where(cell_counts > 0, expected / cell_counts, 0.0)
+
+    weights = np.ones(len(codes))
+    weights[valid] = cell_weights.ravel()[cells]
+    return weights
+
+
+def group_aware_sample(groups, actual_mask: np.ndarray, strategy: str, seed: int = ML_RANDOM_STATE) -> np.ndarray:
+    """Row indices of a resampled training set where every (group, label) cell has the same size.
+
+    `oversample` duplicates rows of the small cells, `undersample` drops rows of the
+    large ones. Rows with a missing group are kept as they are.
+    """
+    if not IMBLEARN_AVAILABLE:
+        raise ValueError("imbalanced-learn n'est pas installe")
+
+    codes, _ = pd.factorize(groups)
+    actual = np.asarray(actual_mask, dtype=bool)
+    valid = np.flatnonzero(codes >= 0)
+    strata = codes[valid] * 2 + actual[valid]
+
+    sampler_cls = RandomOverSampler if strategy == "oversample" else RandomUnderSampler
+    sampler = sampler_cls(sampling_strategy="all", random_state=seed)
+    sampler.fit_resample(valid.reshape(-1, 1), strata)
+    return np.concatenate([valid[sampler.sample_indices_], np.flatnonzero(codes < 0)])
+
+
+def _evaluate_candidate(
+    name: str,
+    algorithm: str,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    sample_weight: Optional[np.ndarray],
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    groups_test: np.ndarray,
+    favorable_code,
+) -> Dict[str, Any]:
+    """Train one candidate model and measure its accuracy and fairness on the test split."""
+    model = build_classifier(algorithm)
+    model.fit(X_train, y_train, sample_weight=sample_weight)
+    y_pred = model.predict(X_test)
+
+    table = count_table(groups_test, y_pred == favorable_code, y_test == favorable_code)
+    values = metric_values(table.counts, reference_index(table))
+    return {
+        "strategy": name,
+        "model": model,
+        "accuracy": float(np.mean(y_pred == y_test)),
+        "max_abs_spd": float(np.max(np.abs(values["spd"]))),
+        "min_di": float(np.min(values["di"])),
+        "max_abs_eod": float(np.max(np.abs(values["eod"]))),
+        "train_rows": int(len(y_train)),
+    }
+
+
+def pareto_front(candidates: List[Dict[str, Any]], fairness_key: str = "max_abs_spd") -> List[bool]:
+    """Whether each candidate is undominated (higher accuracy, lower fairness gap)."""
+    flags = []
+    for c in candidates:
+        dominated = any(
+            o["accuracy"] >= c["accuracy"] and o[fairness_key] <= c[fairness_key]
+            and (o["accuracy"] > c["accuracy"] or o[fairness_key] < c[fairness_key])
+            for o in candidates
+        )
+        flags.append(not dominated)
+    return flags
+
+
+def evaluate_preprocessing_candidates(
+    algorithm: str,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    groups_train,
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    groups_test,
+    favorable_code,
+    strategies=PREPROCESSING_STRATEGIES,
+) -> List[Dict[str, Any]]:
+    """Train one model per pre-processing strategy and return the fairness/accuracy frontier.
+
+    Candidates are trained in parallel in the compute executor's process pool;
+    each result carries its fitted model and a `pareto` flag.
+    """
+    actual_train = y_train == favorable_code
+    groups_test = np.asarray(pd.Series(groups_test).astype(object))
+
+    jobs = []
+    for name in strategies:
+        if name == "baseline":
+            jobs.append((name, X_train, y_train, None))
+        elif name == "reweighing":
+            jobs.append((name, X_train, y_train, reweighing_weights(groups_train, actual_train)))
+        elif name in ("oversample", "undersample"):
+            if not IMBLEARN_AVAILABLE:
+                logger.warning(f"Skipping {name} candidate: imbalanced-learn is not installed")
+                continue
+            idx = group_aware_sample(groups_train, actual_train, name)
+            jobs.append((name, X_train[idx], y_train[idx], None))
+
+    args = [(name, algorithm, X, y, w, X_test, y_test, groups_test, favorable_code) for name, X, y, w in jobs]
+    if len(args) > 1 and compute_executor.process_workers > 1:
+        pool = compute_executor.process_pool
+        candidates = list(pool.map(_evaluate_candidate, *zip(*args)))
+    else:
+        candidates = [_evaluate_candidate(*a) for a in args]
+
+    for candidate, on_front in zip(candidates, pareto_front(candidates)):
+        candidate["pareto"] = on_front
+    logger.info(f"Evaluated {len(candidates)} pre-processing candidates ({algorithm})")
+    return candidates
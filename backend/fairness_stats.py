@@ -0,0 +1,142 @@
+"""
+Statistical significance of fairness metrics.
+Bootstrap confidence intervals are drawn from the group count tables (multinomial
+resampling of each group's confusion cells) instead of resampling rows, and are
+paired with analytic z / chi-square tests corrected for multiple testing.
+"""
+
+import numpy as np
+from typing import Dict
+
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+from config import logger, FAIRNESS_BOOTSTRAP_CHUNK, FAIRNESS_BOOTSTRAP_SEED
+from compute import compute_executor
+from fairness_engine import GroupCounts, METRIC_KEYS, metric_values, reference_index, TP, FP, FN, TN
+
+
+def _bootstrap_chunk(counts: np.ndarray, ref: int, n_resamples: int, seed) -> Dict[str, np.ndarray]:
+    """Metric draws for one chunk of multinomial resamples of the count table."""
+    rng = np.random.default_rng(seed)
+    sizes = counts.sum(axis=1)
+    probs = counts / np.maximum(sizes, 1)[:, None]
+    draws = rng.multinomial(sizes, probs, size=(n_resamples, len(sizes)))
+    return metric_values(draws, ref)
+
+
+def bootstrap_intervals(
+    table: GroupCounts,
+    n_resamples: int = 1000,
+    confidence_level: float = 0.95,
+    seed: int = FAIRNESS_BOOTSTRAP_SEED,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """Percentile bootstrap intervals of each metric, per group.
+
+    Resamples are split into chunks with independent seeds; large jobs are spread
+    across the compute executor's process pool.
+    """
+    counts = np.asarray(table.counts, dtype=np.int64)
+    ref = reference_index(table)
+
+    n_chunks = max(1, -(-n_resamples // FAIRNESS_BOOTSTRAP_CHUNK))
+    chunk_sizes = [n_resamples // n_chunks + (i < n_resamples % n_chunks) for i in range(n_chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    if n_chunks > 1 and compute_executor.process_workers > 1:
+        pool = compute_executor.process_pool
+        parts = list(pool.map(_bootstrap_chunk, [counts] * n_chunks, [ref] * n_chunks, chunk_sizes, seeds))
+    else:
+        parts = [_bootstrap_chunk(counts, ref, size, s) for size, s in zip(chunk_sizes, seeds)]
+
+    alpha = 1 - confidence_level
+    intervals = {}
+    for key in METRIC_KEYS:
+        draws = np.concatenate([p[key] for p in parts], axis=0)
+        low, high = np.quantile(draws, [alpha / 2, 1 - alpha / 2], axis=0)
+        intervals[key] = {"ci_low": low, "ci_high": high}
+    return intervals
+
+
+def _two_proportion_z(successes: np.ndarray, totals: np.ndarray, ref: int) -> np.ndarray:
+    """z statistic of each group's proportion against the reference group (pooled variance)."""
+    successes = successes.astype(float)
+    totals = totals.astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p = successes / totals
+        pooled = (successes + successes[ref]) / (totals + totals[ref])
+        se = np.sqrt(pooled * (1 - pooled) * (1 / totals + 1 / totals[ref]))
+        z = (p - p[ref]) / se
+    return np.where(np.isfinite(z), z, 0.0)
+
+
+def analytic_p_values(table: GroupCounts) -> Dict[str, np.ndarray]:
+    """Two-sided p-values of each metric, per group.
+
+    SPD and DI share the z-test on selection rates, EOD uses the z-test on true
+    positive rates and EO a 2-df chi-square test combining TPR and FPR.
+    """
+    counts = np.asarray(table.counts, dtype=np.int64)
+    ref = reference_index(table)
+    tp, fp, fn, tn = counts[:, TP], counts[:, FP], counts[:, FN], counts[:, TN]
+
+    z_rate = _two_proportion_z(tp + fp, counts.sum(axis=1), ref)
+    z_tpr = _two_proportion_z(tp, tp + fn, ref)
+    z_fpr = _two_proportion_z(fp, fp + tn, ref)
+
+    p_rate = 2 * stats.norm.sf(np.abs(z_rate))
+    return {
+        "spd": p_rate,
+        "di": p_rate,
+        "eod": 2 * stats.norm.sf(np.abs(z_tpr)),
+        "eo": stats.chi2.sf(z_tpr ** 2 + z_fpr ** 2, df=2),
+    }
+
+
+# Metrics whose p-value comes from another metric's test (see analytic_p_values)
+_SHARED_TESTS = {"di": "spd"}
+
+
+def significance_for_tables(
+    tables: Dict[str, GroupCounts],
+    n_resamples: int = 1000,
+    confidence_level: float = 0.95,
+    correction: str = "holm",
+    seed: int = FAIRNESS_BOOTSTRAP_SEED,
+) -> Dict[str, Dict[str, Dict[str, np.ndarray]]]:
+    """Intervals and corrected p-values for every attribute, metric and group.
+
+    Returns {attr: {metric: {"ci_low", "ci_high", "p_value"}}} with per-group arrays.
+    The p-value correction is applied jointly across all attributes, to the tests
+    actually made: the reference group is not tested (its p-value stays 1) and
+    the selection-rate test shared by SPD and DI counts once.
+    """
+    results = {}
+    tested = []
+    for attr, table in tables.items():
+        if len(table.labels) < 2:
+            continue
+        intervals = bootstrap_intervals(table, n_resamples, confidence_level, seed)
+        p_values = analytic_p_values(table)
+        compared = np.arange(len(table.labels)) != reference_index(table)
+        for key in METRIC_KEYS:
+            intervals[key]["p_value"] = p_values[key]
+            if key not in _SHARED_TESTS:
+                tested.append((attr, key, compared))
+        results[attr] = intervals
+
+    if tested and correction != "none":
+        flat = np.concatenate([results[attr][key]["p_value"][compared] for attr, key, compared in tested])
+        _, corrected, _, _ = multipletests(flat, method=correction)
+        offset = 0
+        for attr, key, compared in tested:
+            adjusted = np.ones(len(compared))
+            adjusted[compared] = corrected[offset:offset + compared.sum()]
+            offset += compared.sum()
+            results[attr][key]["p_value"] = adjusted
+            for shared, source in _SHARED_TESTS.items():
+                if source == key:
+                    results[attr][shared]["p_value"] = adjusted
+
+    logger.info(f"Computed significance for {len(results)} attributes ({n_resamples} resamples)")
+    return results
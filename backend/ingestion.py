@@ -0,0 +1,447 @@
+"""
+Dataset ingestion from files on disk, through pluggable parsing engines.
+
+- "arrow": multithreaded pyarrow reader, CSV blocks are parsed in parallel on
+  every core (JSON Lines too). The Arrow table is released column by column
+  while the dataframe is built.
+- "arrow_stream": pyarrow streaming reader into a memory-mapped staging file;
+  slower, but the Arrow table is never held in memory.
+- "pandas": pd.read_csv / pd.read_json, also the fallback when pyarrow is
+  missing or cannot read a file.
+
+Spreadsheets do not go through the engines: .xlsx sheets are streamed row by
+row with openpyxl in read-only mode, without building the workbook object
+model (pd.read_excel for .xls or without openpyxl).
+
+Arrow engines infer column types from a sample at the start of the file and
+apply the caller's per-column type overrides on top. Rows that do not fit the
+resulting schema are dropped and described in the ingestion report, unless a
+column has too many misfits to be a few bad values (the sample was not
+representative): that column is then kept as text instead.
+"""
+
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    logger, INGEST_ENGINE, INGEST_CSV_BLOCK_MB, INGEST_SAMPLE_MB, INGEST_USE_THREADS,
+    INGEST_MAX_REJECTED_RATIO, INGEST_REPORT_MAX_ROWS, INGEST_EXCEL_PROGRESS_ROWS,
+)
+from dataset_cache import PYARROW_AVAILABLE, table_to_frame
+
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+    from pyarrow import json as pa_json
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+_MB = 1024 * 1024
+
+# Accepted column type overrides -> canonical type name
+COLUMN_TYPES = {
+    "string": "string", "str": "string", "text": "string",
+    "int64": "int64", "int": "int64", "integer": "int64",
+    "float64": "float64", "float": "float64",
+    "bool": "bool", "boolean": "bool",
+    "datetime": "datetime", "date": "datetime", "timestamp": "datetime",
+}
+_BOOLEANS = {"true": True, "1": True, "false": False, "0": False}
+# Workbook formats openpyxl can stream
+_STREAMED_EXCEL = (".xlsx", ".xlsm")
+
+
+class ColumnTypeError(ValueError):
+    """Invalid column type override (unknown type or column, or no row fits it)."""
+
+
+class SheetError(ValueError):
+    """Requested worksheet does not exist."""
+
+
+def normalize_column_types(column_types) -> Dict[str, str]:
+    """Canonical {column: type} overrides."""
+    normalized = {}
+    for column, type_name in (column_types or {}).items():
+        key = str(type_name).strip().lower()
+        if key not in COLUMN_TYPES:
+            raise ColumnTypeError(
+                f"Type inconnu '{type_name}' pour la colonne '{column}' "
+                f"(types acceptes: {', '.join(sorted(set(COLUMN_TYPES.values())))})"
+            )
+        normalized[str(column)] = COLUMN_TYPES[key]
+    return normalized
+
+
+def _check_columns(overrides: Dict[str, str], columns: Iterable) -> None:
+    unknown = set(overrides) - {str(c) for c in columns}
+    if unknown:
+        raise ColumnTypeError(f"Colonnes inconnues dans column_types: {', '.join(sorted(unknown))}")
+
+
+def _new_report(engine: str) -> Dict[str, Any]:
+    return {"engine": engine, "rows_rejected": 0, "malformed_rows": 0, "widened_columns": [], "rejected": []}
+
+
+# --- Type conversion of parsed columns (pandas side) ---
+
+def _coerce(values: pd.Series, type_name: str) -> Tuple[pd.Series, np.ndarray]:
+    """Values converted to `type_name` (missing where impossible) and the mask of values that did not fit."""
+    present = values.notna().to_numpy()
+    if type_name == "string":
+        return values.map(str, na_action="ignore"), np.zeros(len(values), dtype=bool)
+    if type_name in ("int64", "float64"):
+        converted = pd.to_numeric(values, errors="coerce")
+        misfit = converted.isna().to_numpy()
+        if type_name == "int64":
+            misfit = misfit | (converted % 1 != 0).to_numpy()
+    elif type_name == "bool":
+        converted = values.map(lambda v: _BOOLEANS.get(str(v).strip().lower()), na_action="ignore")
+        misfit = converted.isna().to_numpy()
+    else:
+        converted = pd.to_datetime(values, errors="coerce")
+        misfit = converted.isna().to_numpy()
+    bad = present & misfit
+    return converted.where(~bad), bad
+
+
+def _finalize(values: pd.Series, type_name: str) -> pd.Series:
+    """Narrowest dtype once rejected rows are gone (integers/booleans with missing values stay float/object)."""
+    if values.isna().any():
+        return values
+    if type_name == "int64":
+        return values.astype("int64")
+    if type_name == "bool":
+        return values.astype(bool)
+    return values
+
+
+def _report_rejects(report: Dict[str, Any], values: pd.Series, bad: np.ndarray, column: str, type_name: str):
+    room = INGEST_REPORT_MAX_ROWS - len(report["rejected"])
+    for row in np.flatnonzero(bad)[:max(room, 0)]:
+        report["rejected"].append({
+            "row": int(row), "column": column, "value": str(values.iloc[row]), "expected": type_name,
+        })
+
+
+def _apply_schema(df: pd.DataFrame, types: Dict[str, str], overrides: Dict[str, str], report: Dict[str, Any]):
+    """Convert columns to their target types, dropping (and reporting) the rows that do not fit.
+
+    `row` in the report is the 0-based data row of the parsed file.
+    """
+    rejected = np.zeros(len(df), dtype=bool)
+    converted = {}
+    for column, type_name in types.items():
+        values, bad = _coerce(df[column], type_name)
+        if bad.any() and column not in overrides:
+            if type_name == "int64":
+                as_float, float_bad = _coerce(df[column], "float64")
+                if not float_bad.any():
+                    values, bad, type_name = as_float, float_bad, "float64"
+            if bad.sum() > INGEST_MAX_REJECTED_RATIO * len(df):
+                report["widened_columns"].append(column)
+                continue
+        if bad.any():
+            _report_rejects(report, df[column], bad, column, type_name)
+            rejected = rejected | bad
+        converted[column] = (values, type_name)
+
+    df = df.copy(deep=False)
+    for column, (values, _) in converted.items():
+        df[column] = values
+    if rejected.any():
+        df = df[~rejected].reset_index(drop=True)
+        report["rows_rejected"] += int(rejected.sum())
+    for column, (_, type_name) in converted.items():
+        df[column] = _finalize(df[column], type_name)
+    return df
+
+
+# --- Engines ---
+
+def _file_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return {".csv": "csv", ".json": "json"}.get(ext, "excel")
+
+
+def is_spreadsheet(path: str) -> bool:
+    return _file_format(path) == "excel"
+
+
+def _is_json_array(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(4096).lstrip()
+    return head.startswith(b"[")
+
+
+def _read_pandas(path: str, fmt: str, overrides: Dict[str, str]):
+    report = _new_report("pandas")
+    if fmt == "csv":
+        # Text overrides are read as text, so "007" stays "007"
+        as_text = {c: str for c, t in overrides.items() if t == "string"}
+        df = pd.read_csv(path, dtype=as_text or None)
+    else:
+        df = pd.read_json(path, lines=not _is_json_array(path))
+    _check_columns(overrides, df.columns)
+    return _apply_schema(df, overrides, overrides, report), report
+
+
+def _arrow_type(type_name: str):
+    if type_name == "datetime":
+        return pa.timestamp("ns")
+    return {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_()}[type_name]
+
+
+def _type_name(arrow_type) -> str:
+    if pa.types.is_integer(arrow_type):
+        return "int64"
+    if pa.types.is_floating(arrow_type):
+        return "float64"
+    if pa.types.is_boolean(arrow_type):
+        return "bool"
+    if pa.types.is_temporal(arrow_type):
+        return "datetime"
+    return "string"
+
+
+def _csv_options(report: Dict[str, Any], block_mb: int, column_types=None):
+    def skip_malformed(row):
+        # Rows with the wrong number of fields
+        report["malformed_rows"] += 1
+        if len(report["rejected"]) < INGEST_REPORT_MAX_ROWS:
+            report["rejected"].append({"line": row.number, "text": (row.text or "")[:200], "expected": "csv row"})
+        return "skip"
+
+    return dict(
+        read_options=pa_csv.ReadOptions(block_size=block_mb * _MB, use_threads=INGEST_USE_THREADS),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=skip_malformed),
+        # Same missing-value markers as pd.read_csv, in string columns too
+        convert_options=pa_csv.ConvertOptions(column_types=column_types or {}, strings_can_be_null=True),
+    )
+
+
+def _sample_schema(path: str, overrides: Dict[str, str]) -> Dict[str, Any]:
+    """Column types inferred from the first INGEST_SAMPLE_MB of the file, with the overrides applied."""
+    reader = pa_csv.open_csv(path, **_csv_options(_new_report("sample"), INGEST_SAMPLE_MB))
+    names = reader.schema.names
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate column names")
+    _check_columns(overrides, names)
+    types = {}
+    for field in reader.schema:
+        # pd.read_csv keeps dates as strings; so do we unless asked otherwise
+        types[field.name] = pa.string() if pa.types.is_temporal(field.type) else field.type
+    types.update({column: _arrow_type(type_name) for column, type_name in overrides.items()})
+    return types
+
+
+def _stream_csv(path: str, types: Dict[str, Any], report: Dict[str, Any]) -> pd.DataFrame:
+    reader = pa_csv.open_csv(path, **_csv_options(report, INGEST_CSV_BLOCK_MB, types))
+    staging = f"{path}.ingest-{os.getpid()}.arrow"
+    try:
+        with pa.OSFile(staging, "wb") as sink:
+            with pa.ipc.new_file(sink, reader.schema) as writer:
+                for batch in reader:
+                    writer.write_batch(batch)
+        return table_to_frame(pa.ipc.open_file(pa.memory_map(staging, "r")).read_all())
+    finally:
+        try:
+            os.remove(staging)  # an open mapping stays valid after unlink
+        except OSError:
+            pass
+
+
+def _read_csv_arrow(path: str, overrides: Dict[str, str], stream: bool):
+    engine = "arrow_stream" if stream else "arrow"
+    try:
+        types = _sample_schema(path, overrides)
+    except ValueError as e:
+        if isinstance(e, ColumnTypeError):
+            raise
+        logger.info(f"{engine} cannot read {os.path.basename(path)} ({e}), using pandas")
+        return _read_pandas(path, "csv", overrides)
+
+    report = _new_report(engine)
+    try:
+        if stream:
+            return _stream_csv(path, types, report), report
+        table = pa_csv.read_csv(path, **_csv_options(report, INGEST_CSV_BLOCK_MB, types))
+        return table_to_frame(table, self_destruct=True), report
+    except pa.ArrowInvalid as e:
+        # A value beyond the sample does not fit its column type: read text, convert column by column
+        logger.info(f"Sampled schema rejected values of {os.path.basename(path)}, converting per column: {e}")
+
+    report = _new_report(engine)
+    as_text = {column: pa.string() for column in types}
+    table = pa_csv.read_csv(path, **_csv_options(report, INGEST_CSV_BLOCK_MB, as_text))
+    df = table_to_frame(table, self_destruct=True)
+    typed = {column: _type_name(t) for column, t in types.items() if _type_name(t) != "string"}
+    return _apply_schema(df, typed, overrides, report), report
+
+
+def _read_arrow(path: str, fmt: str, overrides: Dict[str, str], stream: bool = False):
+    if fmt == "csv":
+        return _read_csv_arrow(path, overrides, stream)
+    if fmt == "json" and not _is_json_array(path):
+        report = _new_report("arrow")
+        table = pa_json.read_json(
+            path, read_options=pa_json.ReadOptions(use_threads=INGEST_USE_THREADS, block_size=INGEST_CSV_BLOCK_MB * _MB)
+        )
+        df = table_to_frame(table, self_destruct=True)
+        _check_columns(overrides, df.columns)
+        return _apply_schema(df, overrides, overrides, report), report
+    # JSON arrays
+    return _read_pandas(path, fmt, overrides)
+
+
+# --- Spreadsheets ---
+
+def list_sheets(path: str) -> List[str]:
+    """Worksheet names of a workbook, without loading any of them."""
+    if OPENPYXL_AVAILABLE and path.lower().endswith(_STREAMED_EXCEL):
+        workbook = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    with pd.ExcelFile(path) as workbook:
+        return list(workbook.sheet_names)
+
+
+def resolve_sheet(sheets: List[str], sheet=None) -> str:
+    """Name of the requested worksheet, given by name or position (the first one by default)."""
+    if sheet is None or str(sheet) == "":
+        if not sheets:
+            raise SheetError("Le classeur ne contient aucune feuille")
+        return sheets[0]
+    if str(sheet) in sheets:
+        return str(sheet)
+    if str(sheet).isdigit() and int(sheet) < len(sheets):
+        return sheets[int(sheet)]
+    raise SheetError(f"Feuille '{sheet}' introuvable (feuilles: {', '.join(sheets)})")
+
+
+def _column_names(header) -> List[str]:
+    """Header cells named as pd.read_excel does: blanks become 'Unnamed: i', repeats get '.1', '.2'..."""
+    names, seen = [], {}
+    for i, cell in enumerate(header):
+        name = f"Unnamed: {i}" if cell is None else str(cell)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _excel_column(values: list) -> pd.Series:
+    series = pd.Series(values)  # same dtype inference as pd.read_excel (ints, floats, dates, booleans)
+    if series.dtype == object:
+        series = series.where(series.notna(), np.nan)
+    return series
+
+
+def _stream_sheet(path: str, sheet: str, progress: Optional[Callable[[float, int], None]]) -> pd.DataFrame:
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet]
+        total = worksheet.max_row  # from the sheet's dimension record, when the writer set one
+        rows = worksheet.iter_rows(values_only=True)
+        names = _column_names(next(rows, ()))
+        columns = [[] for _ in names]
+        for n, row in enumerate(rows, 1):
+            if all(value is None for value in row):
+                continue  # blank lines, as pd.read_excel skips them
+            for i, values in enumerate(columns):
+                values.append(row[i] if i < len(row) else None)
+            if progress and n % INGEST_EXCEL_PROGRESS_ROWS == 0:
+                progress(min(n / total, 1.0) if total else 0.0, n)
+    finally:
+        workbook.close()
+    return pd.DataFrame({name: _excel_column(values) for name, values in zip(names, columns)})
+
+
+def _read_spreadsheet(path: str, overrides: Dict[str, str], sheet=None, progress=None):
+    sheet = resolve_sheet(list_sheets(path), sheet)
+    if OPENPYXL_AVAILABLE and path.lower().endswith(_STREAMED_EXCEL):
+        report = _new_report("openpyxl")
+        df = _stream_sheet(path, sheet, progress)
+    else:
+        report = _new_report("pandas")
+        df = pd.read_excel(path, sheet_name=sheet)
+    report["sheet"] = sheet
+    _check_columns(overrides, df.columns)
+    return _apply_schema(df, overrides, overrides, report), report
+
+
+Reader = Callable[[str, str, Dict[str, str]], Tuple[pd.DataFrame, Dict[str, Any]]]
+_ENGINES: Dict[str, Reader] = {}
+
+
+def register_engine(name: str, reader: Reader) -> None:
+    """Register reader(path, format, column_types) -> (df, report) under `name`."""
+    _ENGINES[name] = reader
+
+
+register_engine("pandas", _read_pandas)
+register_engine("arrow", _read_arrow)
+register_engine("arrow_stream", lambda path, fmt, overrides: _read_arrow(path, fmt, overrides, stream=True))
+
+
+def ingest_file(
+    path: str,
+    column_types=None,
+    engine: str = None,
+    sheet=None,
+    progress: Optional[Callable[[float, int], None]] = None,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Parse a dataset file. Returns (df, report of rejected/malformed rows and widened columns).
+
+    For spreadsheets, `sheet` picks the worksheet (name or position) and
+    progress(fraction, rows_read) is called while rows are streamed. Raises
+    ColumnTypeError when the overrides reject every row of the file.
+    """
+    overrides = normalize_column_types(column_types)
+    fmt = _file_format(path)
+    name = engine or INGEST_ENGINE
+    if name not in _ENGINES:
+        raise ValueError(f"Moteur d'ingestion inconnu '{name}'")
+    if name.startswith("arrow") and not PYARROW_AVAILABLE:
+        name = "pandas"
+
+    try:
+        if fmt == "excel":
+            df, report = _read_spreadsheet(path, overrides, sheet, progress)
+        else:
+            df, report = _ENGINES[name](path, fmt, overrides)
+    except Exception as e:
+        if fmt == "excel" or name == "pandas" or not (PYARROW_AVAILABLE and isinstance(e, pa.ArrowException)):
+            raise
+        logger.warning(f"{name} engine failed on {os.path.basename(path)}, using pandas: {e}")
+        df, report = _read_pandas(path, fmt, overrides)
+
+    if overrides and report["rows_rejected"] and len(df) == 0:
+        columns = sorted({r["column"] for r in report["rejected"] if r.get("column") in overrides} or set(overrides))
+        raise ColumnTypeError(
+            f"column_types ne peut pas etre applique: aucune ligne ne correspond au type demande "
+            f"({', '.join(f'{c}: {overrides[c]}' for c in columns)})"
+        )
+    if report["rows_rejected"] or report["malformed_rows"] or report["widened_columns"]:
+        logger.warning(
+            f"Ingestion of {os.path.basename(path)}: {report['rows_rejected']} rows rejected, "
+            f"{report['malformed_rows']} malformed, text columns kept: {report['widened_columns']}"
+        )
+    return df, report
+
+
+def read_dataset_file(path: str) -> pd.DataFrame:
+    """Parse an uploaded dataset file with the default engine."""
+    return ingest_file(path)[0]
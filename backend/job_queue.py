@@ -0,0 +1,392 @@
+"""
+Durable background job queue backed by SQLite.
+Jobs survive restarts: workers claim them atomically, report progress and a
+heartbeat, failed jobs are retried with backoff, and jobs whose worker stopped
+heart-beating (crash, deploy) are put back in the queue.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from config import (
+    logger, JOBS_DB_PATH, JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF_SECONDS,
+    JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS, JOB_POLL_SECONDS,
+)
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    run_after REAL NOT NULL,
+    heartbeat_at REAL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_run_after ON jobs (status, run_after);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Job kind -> handler(payload, context) returning a JSON-serializable result
+_handlers: Dict[str, Callable[[Dict[str, Any], "JobContext"], Any]] = {}
+
+
+def register_handler(kind: str, handler: Callable[[Dict[str, Any], "JobContext"], Any]) -> None:
+    _handlers[kind] = handler
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler when its job was cancelled."""
+
+
+class JobQueue:
+    """SQLite job table with atomic claims. Safe to share across threads and processes."""
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS,
+                job_id: Optional[str] = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), max_attempts, time.time(), now, now),
+            )
+        logger.info(f"Enqueued job {job_id} ({kind})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            return self._row(conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        query, params = "SELECT * FROM jobs", []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        with self._connect() as conn:
+            return [self._row(r) for r in conn.execute(query, params).fetchall()]
+
+    def counts(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in JOB_STATUSES}
+        counts.update({r["status"]: r["n"] for r in rows})
+        return counts
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest runnable queued job to `running` for this worker."""
+        now = time.time()
+        query = "SELECT id FROM jobs WHERE status = 'queued' AND run_after <= ?"
+        params: List[Any] = [now]
+        if kinds is not None:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        query += " ORDER BY created_at LIMIT 1"
+
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(query, params).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                stamp = datetime.now().isoformat()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                    "heartbeat_at = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                    (worker, now, stamp, stamp, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            return self.get(row["id"])
+
+    def heartbeat(self, job_id: str, progress: Optional[float] = None, message: Optional[str] = None,
+                  worker: Optional[str] = None) -> bool:
+        """Record liveness (and progress); returns True if the job should stop.
+
+        That is when cancellation was requested, or, given `worker`, when the
+        job was requeued and no longer belongs to it.
+        """
+        sets, params = ["heartbeat_at = ?", "updated_at = ?"], [time.time(), datetime.now().isoformat()]
+        if progress is not None:
+            sets.append("progress = ?")
+            params.append(float(min(max(progress, 0.0), 1.0)))
+        if message is not None:
+            sets.append("message = ?")
+            params.append(message)
+        query, owner = f"UPDATE jobs SET {', '.join(sets)} WHERE id = ? AND status = 'running'", ()
+        if worker is not None:
+            query, owner = query + " AND worker = ?", (worker,)
+        with self._connect() as conn:
+            conn.execute(query, (*params, job_id, *owner))
+            row = conn.execute("SELECT cancel_requested, status, worker FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or row["cancel_requested"]:
+            return True
+        return worker is not None and (row["status"] != "running" or row["worker"] != worker)
+
+    def _finish(self, job_id: str, worker: str, status: str, **fields) -> bool:
+        """Record the outcome of `worker`'s run; False (nothing written) if the job is no longer its own.
+
+        A worker that lost its job (requeued by requeue_stale, maybe already
+        claimed by another worker) must not overwrite the new owner's run.
+        """
+        stamp = datetime.now().isoformat()
+        fields.update({"status": status, "updated_at": stamp, "finished_at": stamp})
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND status = 'running' AND worker = ?",
+                (*fields.values(), job_id, worker),
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f"Job {job_id} no longer belongs to worker {worker}, its {status} outcome is dropped")
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: str, worker: str, result: Any = None) -> bool:
+        return self._finish(job_id, worker, "completed", progress=1.0, result=json.dumps(result))
+
+    def fail(self, job_id: str, worker: str, error: str) -> bool:
+        """Record a failed attempt of `worker`; returns True if the job will be retried."""
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if job["attempts"] < job["max_attempts"] and not job["cancel_requested"]:
+            delay = JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+            with self._connect() as conn:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, worker = NULL, run_after = ?, updated_at = ? "
+                    "WHERE id = ? AND status = 'running' AND worker = ?",
+                    (error, time.time() + delay, datetime.now().isoformat(), job_id, worker),
+                )
+            if cursor.rowcount == 0:
+                logger.warning(f"Job {job_id} no longer belongs to worker {worker}, its failure is dropped")
+                return False
+            logger.warning(f"Job {job_id} failed (attempt {job['attempts']}), retrying in {delay:.0f}s: {error}")
+            return True
+        if self._finish(job_id, worker, "failed", error=error):
+            logger.error(f"Job {job_id} failed after {job['attempts']} attempts: {error}")
+        return False
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job now, or ask a running job to stop at its next progress report."""
+        stamp = datetime.now().isoformat()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, updated_at = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (stamp, stamp, job_id),
+            )
+            conn.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = 'running'",
+                (stamp, job_id),
+            )
+        return self.get(job_id)
+
+    def mark_cancelled(self, job_id: str, worker: str) -> bool:
+        return self._finish(job_id, worker, "cancelled")
+
+    def release_worker(self, worker: str) -> int:
+        """Requeue a stopping worker's running jobs without counting the interrupted attempt."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, attempts = MAX(attempts - 1, 0), "
+                "run_after = ?, updated_at = ? WHERE status = 'running' AND worker = ?",
+                (time.time(), datetime.now().isoformat(), worker),
+            )
+        return cursor.rowcount
+
+    def requeue_stale(self, stale_seconds: float = JOB_STALE_SECONDS) -> int:
+        """Put back running jobs whose worker stopped heart-beating (crash, restart).
+
+        A lost worker counts as a failed attempt: jobs that already used all
+        their attempts (e.g. one that keeps killing its worker) are marked
+        failed, the others are retried with the same backoff as fail().
+        Returns the number of requeued jobs.
+        """
+        now = time.time()
+        stamp = datetime.now().isoformat()
+        requeued, failed = 0, 0
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = conn.execute(
+                    "SELECT id, attempts, max_attempts, cancel_requested FROM jobs "
+                    "WHERE status = 'running' AND heartbeat_at < ?",
+                    (now - stale_seconds,),
+                ).fetchall()
+                for job in stale:
+                    if job["cancel_requested"]:
+                        conn.execute(
+                            "UPDATE jobs SET status = 'cancelled', worker = NULL, updated_at = ?, finished_at = ? "
+                            "WHERE id = ?",
+                            (stamp, stamp, job["id"]),
+                        )
+                    elif job["attempts"] >= job["max_attempts"]:
+                        conn.execute(
+                            "UPDATE jobs SET status = 'failed', worker = NULL, error = ?, updated_at = ?, "
+                            "finished_at = ? WHERE id = ?",
+                            (f"Worker lost (no heartbeat) after {job['attempts']} attempts", stamp, stamp, job["id"]),
+                        )
+                        failed += 1
+                    else:
+                        delay = JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+                        conn.execute(
+                            "UPDATE jobs SET status = 'queued', worker = NULL, error = ?, run_after = ?, "
+                            "updated_at = ? WHERE id = ?",
+                            ("Worker lost (no heartbeat)", now + delay, stamp, job["id"]),
+                        )
+                        requeued += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if requeued:
+            logger.warning(f"Requeued {requeued} stale jobs")
+        if failed:
+            logger.error(f"{failed} stale jobs failed: worker lost on their last attempt")
+        return requeued
+
+    def acquire_lease(self, name: str, holder: str, ttl: float) -> bool:
+        """Take or renew the named lease for `holder` for `ttl` seconds.
+
+        Returns False while another holder's lease has not expired.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE leases.holder = excluded.holder OR leases.expires_at < ?",
+                (name, holder, now + ttl, now),
+            )
+        return cursor.rowcount > 0
+
+    def release_lease(self, name: str, holder: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+
+
+class JobContext:
+    """Handed to job handlers to report progress and observe cancellation."""
+
+    def __init__(self, queue: JobQueue, job: Dict[str, Any]):
+        self.queue = queue
+        self.job = job
+        self.job_id = job["id"]
+        self.worker = job["worker"]
+        self.attempt = job["attempts"]
+
+    @property
+    def final_attempt(self) -> bool:
+        return self.attempt >= self.job["max_attempts"]
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        if self.queue.heartbeat(self.job_id, fraction, message, worker=self.worker):
+            raise JobCancelled(self.job_id)
+
+
+class JobWorker:
+    """Claims and runs jobs; a heartbeat thread keeps long jobs from looking stale."""
+
+    def __init__(self, queue: JobQueue, name: Optional[str] = None, kinds: Optional[List[str]] = None):
+        self.queue = queue
+        self.name = name or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.kinds = kinds
+        self._stop = threading.Event()
+
+    def run_once(self) -> Optional[str]:
+        """Run one job if any is runnable; returns its id."""
+        job = self.queue.claim(self.name, self.kinds)
+        if job is None:
+            return None
+
+        handler = _handlers.get(job["kind"])
+        if handler is None:
+            self.queue.fail(job["id"], self.name, f"No handler for job kind '{job['kind']}'")
+            return job["id"]
+
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(JOB_HEARTBEAT_SECONDS):
+                self.queue.heartbeat(job["id"], worker=self.name)
+
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        try:
+            result = handler(job["payload"], JobContext(self.queue, job))
+            if self.queue.complete(job["id"], self.name, result):
+                logger.info(f"Job {job['id']} ({job['kind']}) completed")
+        except JobCancelled:
+            if self.queue.mark_cancelled(job["id"], self.name):
+                logger.info(f"Job {job['id']} cancelled")
+        except Exception as e:
+            logger.error(f"Job {job['id']} ({job['kind']}) error: {e}", exc_info=True)
+            self.queue.fail(job["id"], self.name, str(e))
+        finally:
+            done.set()
+            beater.join()
+        return job["id"]
+
+    def run_forever(self) -> None:
+        logger.info(f"Job worker {self.name} started")
+        while not self._stop.is_set():
+            self.queue.requeue_stale()
+            if self.run_once() is None:
+                self._stop.wait(JOB_POLL_SECONDS)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+job_queue = JobQueue()
@@ -0,0 +1,116 @@
+"""
+Job worker processes.
+Run durable background jobs (enhanced audits) outside the API process. Workers
+are started with the app (JOB_WORKERS) or standalone with `python job_worker.py`.
+"""
+
+import os
+import uuid
+import signal
+import threading
+import multiprocessing
+from typing import List
+
+from config import logger, JOB_HEARTBEAT_SECONDS, JOB_STALE_SECONDS
+from job_queue import job_queue, JobQueue, JobWorker
+
+# Lease, in the queue DB, of the API process that runs the app's worker processes
+WORKERS_LEASE = "job-workers"
+
+
+def _init_worker():
+    """Register job handlers and the LLM analyzer in this process."""
+    from routers.fairness import set_llm_analyzer  # noqa: E402  (importing registers the handlers)
+    import routers.datasets  # noqa: E402,F401
+
+    try:
+        from llm_service import LLMAnalyzer  # noqa: E402
+        set_llm_analyzer(LLMAnalyzer())
+    except Exception as e:
+        logger.warning(f"LLM Analyzer init warning in job worker: {e}")
+
+
+def run_worker():
+    _init_worker()
+    worker = JobWorker(job_queue)
+
+    def handle_stop(signum, frame):
+        # Deploys stop workers mid-job: hand running jobs back to the queue right away
+        released = job_queue.release_worker(worker.name)
+        logger.info(f"Job worker {worker.name} stopping, {released} job(s) requeued")
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    worker.run_forever()
+
+
+def start_workers(count: int) -> List[multiprocessing.Process]:
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(count):
+        process = context.Process(target=run_worker, name=f"job-worker-{i}", daemon=True)
+        process.start()
+        processes.append(process)
+    logger.info(f"Started {count} job worker process(es)")
+    return processes
+
+
+def stop_workers(processes: List[multiprocessing.Process], timeout: float = 10.0):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout)
+
+
+class WorkerSupervisor:
+    """Starts the app's job worker processes in one API process only.
+
+    Each uvicorn worker runs the app startup: the one holding the
+    WORKERS_LEASE starts `count` processes and keeps renewing the lease, the
+    others keep trying to take it, so workers come back if that process dies.
+    """
+
+    def __init__(self, count: int, queue: JobQueue = job_queue):
+        self.count = count
+        self.queue = queue
+        self.name = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.processes: List[multiprocessing.Process] = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self) -> None:
+        """Take or renew the lease, and start or stop the worker processes to match."""
+        if self.queue.acquire_lease(WORKERS_LEASE, self.name, JOB_STALE_SECONDS):
+            if not self.processes:
+                self.processes = start_workers(self.count)
+        elif self.processes:
+            logger.warning("Job workers lease lost, stopping this process' workers")
+            stop_workers(self.processes)
+            self.processes = []
+
+    def alive(self) -> int:
+        return sum(1 for p in self.processes if p.is_alive())
+
+    def start(self) -> None:
+        def run():
+            while True:
+                self.check()
+                if self._stop.wait(JOB_HEARTBEAT_SECONDS):
+                    return
+
+        self._thread = threading.Thread(target=run, name="job-worker-supervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        stop_workers(self.processes)
+        self.processes = []
+        self.queue.release_lease(WORKERS_LEASE, self.name)
+
+
+if __name__ == "__main__":
+    run_worker()
@@ -11,8 +11,15 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from datetime import datetime
 
-from config import logger, ALLOWED_ORIGINS
-from middleware import RequestLoggingMiddleware
+from config import logger, ALLOWED_ORIGINS, JOB_WORKERS
+from middleware import RequestLoggingMiddleware, UploadSizeLimitMiddleware
+from result_cache import result_cache
+from compute import compute_executor
+from job_queue import job_queue
+from persistence import persistence
+from utils import datasets_store, models_store
+from upload_store import adopt_uploads, collect_garbage
+from audit_store import collect_audit_stats
 
 # --- Rate Limiter ---
 limiter = Limiter(key_func=get_remote_address)
@@ -33,6 +40,11 @@ app = FastAPI(
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
+# Upload size limit, enforced while the body is received. Added first so it
+# wraps the app directly: its 413 must reach the route before another
+# middleware's receive wrapper turns it into an error of its own.
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # CORS - restricted origins
 app.add_middleware(
     CORSMiddleware,
@@ -66,12 +78,13 @@ def _register_routers():
     from routers.fairness import router as fairness_router  # noqa: E402
     from routers.reports import router as reports_router  # noqa: E402
     from routers.datascience import router as ds_router  # noqa: E402
+    from routers.jobs import router as jobs_router  # noqa: E402
     from routers.fairness import set_llm_analyzer as set_fairness_llm  # noqa: E402
     from routers.datascience import set_llm_analyzer as set_ds_llm  # noqa: E402
 
     return (
         datasets_router, ml_router, fairness_router,
-        reports_router, ds_router,
+        reports_router, ds_router, jobs_router,
         set_fairness_llm, set_ds_llm,
     )
 
@@ -80,7 +93,7 @@ llm_analyzer = _init_llm()
 
 (
     datasets_router, ml_router, fairness_router,
-    reports_router, ds_router,
+    reports_router, ds_router, jobs_router,
     set_fairness_llm, set_ds_llm,
 ) = _register_routers()
 
@@ -92,6 +105,10 @@ app.include_router(ml_router)
 app.include_router(fairness_router)
 app.include_router(reports_router)
 app.include_router(ds_router)
+app.include_router(jobs_router)
+
+# Starts the job worker processes on startup, in one uvicorn worker only
+job_supervisor = None
 
 
 # --- Health Check ---
@@ -106,6 +123,19 @@ async def health_check():
             "llm": "available" if llm_analyzer else "unavailable",
             "api": "running",
         },
+        "caches": {
+            "results": result_cache.stats(),
+        },
+        "stores": {
+            "datasets": datasets_store.stats(),
+            "models": models_store.stats(),
+        },
+        "compute": compute_executor.stats(),
+        "persistence": persistence.stats(),
+        "jobs": {
+            "workers": job_supervisor.alive() if job_supervisor else 0,
+            **job_queue.counts(),
+        },
     }
 
 
@@ -128,14 +158,30 @@ async def global_exception_handler(request: Request, exc: Exception):
 # --- Startup / Shutdown ---
 @app.on_event("startup")
 async def startup_event():
+    global job_supervisor
     logger.info("AuditIQ Backend v2.0.0 starting up")
     logger.info(f"CORS origins: {ALLOWED_ORIGINS}")
     logger.info(f"LLM status: {'enabled' if llm_analyzer else 'disabled'}")
+    persistence.start()
+    try:
+        adopt_uploads()
+        collect_garbage()
+        collect_audit_stats()
+    except OSError as e:
+        logger.warning(f"Storage maintenance failed: {e}")
+    if JOB_WORKERS > 0:
+        from job_worker import WorkerSupervisor  # noqa: E402
+        job_supervisor = WorkerSupervisor(JOB_WORKERS)
+        job_supervisor.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("AuditIQ Backend shutting down")
+    compute_executor.shutdown()
+    await persistence.stop()
+    if job_supervisor:
+        job_supervisor.stop()
 
 
 if __name__ == "__main__":
@@ -2,11 +2,15 @@
 FastAPI middleware for request logging, timing, and error handling.
 """
 
+import json
 import time
 import uuid
-from fastapi import Request, Response
+from fastapi import Request, Response, HTTPException
 from starlette.middleware.base import BaseHTTPMiddleware
-from config import logger
+from config import logger, MAX_UPLOAD_SIZE_BYTES
+
+# Room for multipart boundaries, part headers and the other form fields of an upload
+UPLOAD_FORM_OVERHEAD_BYTES = 1024 * 1024
 
 
 class RequestLoggingMiddleware(BaseHTTPMiddleware):
@@ -46,3 +50,48 @@ class RequestLoggingMiddleware(BaseHTTPMiddleware):
                 exc_info=True,
             )
             raise
+
+
+class UploadSizeLimitMiddleware:
+    """Reject upload bodies over the size limit before they are stored.
+
+    A declared Content-Length over the limit is refused without reading the
+    body, and bodies without one are counted as they arrive, so an oversized
+    upload is cut off while the endpoint is still receiving it.
+    """
+
+    def __init__(self, app, paths=("/api/datasets/upload",)):
+        self.app = app
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        limit = MAX_UPLOAD_SIZE_BYTES + UPLOAD_FORM_OVERHEAD_BYTES
+        detail = f"File too large. Maximum size: {MAX_UPLOAD_SIZE_BYTES // (1024*1024)}MB"
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            logger.warning(f"Upload refused: Content-Length {int(declared)} over {limit} bytes")
+            body = json.dumps({"detail": detail}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised while the endpoint reads the body: answered as a 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,359 @@
+"""
+Persistence layer for audit and project records.
+Row updates are buffered and coalesced (several updates of one row become one
+write), delivered in batches off the event loop, and kept in a local SQLite
+outbox until the backend acknowledges them, so an unreachable backend delays
+writes instead of losing them. Backends: Supabase, or an in-process SQLite
+stand-in for running and load-testing without Supabase.
+"""
+
+import os
+import abc
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import threading
+from datetime import datetime
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    logger, SUPABASE_URL, SUPABASE_SERVICE_KEY, PERSISTENCE_BACKEND, PERSISTENCE_SQLITE_PATH,
+    PERSISTENCE_OUTBOX_PATH, PERSISTENCE_FLUSH_SECONDS, PERSISTENCE_BATCH_SIZE,
+    PERSISTENCE_RETRY_SECONDS, PERSISTENCE_MAX_RETRY_SECONDS,
+)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class PersistenceBackend(abc.ABC):
+    """Blocking record store. Subclasses implement update and insert."""
+
+    name = "base"
+
+    @abc.abstractmethod
+    def update(self, table: str, row_id: str, data: Dict[str, Any]) -> None:
+        ...
+
+    @abc.abstractmethod
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    def update_many(self, items: List[Tuple[str, str, Dict[str, Any]]]) -> Tuple[int, Optional[Exception]]:
+        """Apply updates in order; returns how many succeeded and the error that stopped the batch."""
+        for i, (table, row_id, data) in enumerate(items):
+            try:
+                self.update(table, row_id, data)
+            except Exception as e:
+                return i, e
+        return len(items), None
+
+
+class SupabaseBackend(PersistenceBackend):
+    name = "supabase"
+
+    def __init__(self, client=None):
+        if client is None:
+            from supabase import create_client  # noqa: E402
+            client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        self.client = client
+
+    def update(self, table, row_id, data):
+        self.client.table(table).update(data).eq("id", row_id).execute()
+
+    def update_many(self, items):
+        """Send the batch as upserts on "id", one request per run of rows with the same table and columns.
+
+        A bulk upsert writes the same columns for every row (missing ones would
+        be reset), hence the runs; a flush of one kind of update is one request.
+        """
+        done = 0
+        for (table, _), run in groupby(items, key=lambda item: (item[0], sorted(item[2]))):
+            run = list(run)
+            try:
+                self.client.table(table).upsert(
+                    [{**data, "id": row_id} for _, row_id, data in run], on_conflict="id", default_to_null=False,
+                ).execute()
+            except Exception as e:
+                return done, e
+            done += len(run)
+        return done, None
+
+    def insert(self, table, row):
+        res = self.client.table(table).insert(row).execute()
+        return res.data[0] if getattr(res, "data", None) else {}
+
+
+class SQLiteBackend(PersistenceBackend):
+    """Local stand-in: rows are JSON documents keyed by (table, id).
+
+    Updates of unknown rows create them, so results written for records created
+    elsewhere (e.g. audits created by the frontend) can still be inspected.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = PERSISTENCE_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "table_name TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, updated_at TEXT NOT NULL, "
+            "PRIMARY KEY (table_name, id))"
+        )
+
+    def _merge(self, table, row_id, data):
+        row = self._conn.execute(
+            "SELECT data FROM records WHERE table_name = ? AND id = ?", (table, row_id)
+        ).fetchone()
+        merged = {**(json.loads(row["data"]) if row else {"id": row_id}), **data}
+        self._conn.execute(
+            "INSERT OR REPLACE INTO records (table_name, id, data, updated_at) VALUES (?, ?, ?, ?)",
+            (table, row_id, json.dumps(merged, default=str), datetime.now().isoformat()),
+        )
+
+    def update(self, table, row_id, data):
+        self.update_many([(table, row_id, data)])
+
+    def update_many(self, items):
+        # One transaction per batch
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for table, row_id, data in items:
+                    self._merge(table, str(row_id), data)
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                self._conn.execute("ROLLBACK")
+                return 0, e
+        return len(items), None
+
+    def insert(self, table, row):
+        row = {"id": str(uuid.uuid4()), "created_at": datetime.now().isoformat(), **row}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO records (table_name, id, data, updated_at) VALUES (?, ?, ?, ?)",
+                (table, str(row["id"]), json.dumps(row, default=str), row["created_at"]),
+            )
+        return row
+
+    def get(self, table: str, row_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM records WHERE table_name = ? AND id = ?", (table, str(row_id))
+            ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+
+class Outbox:
+    """Durable pending updates, one coalesced entry per (table, row id)."""
+
+    def __init__(self, path: str = PERSISTENCE_OUTBOX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = _connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "table_name TEXT NOT NULL, row_id TEXT NOT NULL, data TEXT NOT NULL, "
+            "version INTEGER NOT NULL DEFAULT 1, attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_attempt_at REAL NOT NULL, last_error TEXT, "
+            "PRIMARY KEY (table_name, row_id))"
+        )
+
+    def put(self, table: str, row_id: str, data: Dict[str, Any]) -> None:
+        """Merge an update into the row's pending entry (later fields win) and make it due now."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM outbox WHERE table_name = ? AND row_id = ?", (table, row_id)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO outbox (table_name, row_id, data, next_attempt_at) VALUES (?, ?, ?, ?)",
+                        (table, row_id, json.dumps(data, default=str), time.time()),
+                    )
+                else:
+                    merged = {**json.loads(row["data"]), **data}
+                    self._conn.execute(
+                        "UPDATE outbox SET data = ?, version = version + 1, next_attempt_at = ? "
+                        "WHERE table_name = ? AND row_id = ?",
+                        (json.dumps(merged, default=str), time.time(), table, row_id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def due(self, limit: int, keys: Optional[List[Tuple[str, str]]] = None) -> List[Dict[str, Any]]:
+        """Entries whose next attempt is due, or the entries of the given keys."""
+        with self._lock:
+            if keys is None:
+                rows = self._conn.execute(
+                    "SELECT * FROM outbox WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                    (time.time(), limit),
+                ).fetchall()
+            else:
+                rows = [
+                    row for key in keys for row in self._conn.execute(
+                        "SELECT * FROM outbox WHERE table_name = ? AND row_id = ?", key
+                    ).fetchall()
+                ]
+        return [{**dict(r), "data": json.loads(r["data"])} for r in rows]
+
+    def delivered(self, entry: Dict[str, Any]) -> None:
+        # A newer merged version stays queued
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE table_name = ? AND row_id = ? AND version = ?",
+                (entry["table_name"], entry["row_id"], entry["version"]),
+            )
+
+    def retry_later(self, entry: Dict[str, Any], error: Exception) -> None:
+        delay = min(PERSISTENCE_RETRY_SECONDS * 2 ** entry["attempts"], PERSISTENCE_MAX_RETRY_SECONDS)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE table_name = ? AND row_id = ?",
+                (time.time() + delay, str(error), entry["table_name"], entry["row_id"]),
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+
+class PersistenceStore:
+    """Async facade: buffered, coalesced updates delivered through the outbox."""
+
+    def __init__(self, backend: PersistenceBackend, outbox: Outbox,
+                 flush_seconds: float = PERSISTENCE_FLUSH_SECONDS, batch_size: int = PERSISTENCE_BATCH_SIZE):
+        self.backend = backend
+        self.outbox = outbox
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self._pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.updates = 0
+        self.coalesced = 0
+        self.delivered = 0
+        self.failures = 0
+
+    async def update(self, table: str, row_id: str, data: Dict[str, Any]) -> None:
+        """Queue a partial row update. Returns without waiting for the backend."""
+        key = (table, str(row_id))
+        self.updates += 1
+        if key in self._pending:
+            self.coalesced += 1
+            self._pending[key].update(data)
+        else:
+            self._pending[key] = dict(data)
+
+        if self._flusher is None:
+            # No background flusher (scripts, tests): write through
+            await self.flush()
+        elif len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a row and return it as stored (inserts need the generated id, so they are not deferred)."""
+        return await asyncio.to_thread(self.backend.insert, table, row)
+
+    def update_sync(self, table: str, row_id: str, data: Dict[str, Any]) -> None:
+        """Blocking variant for worker threads and job processes: outbox, then one delivery attempt."""
+        key = (table, str(row_id))
+        self.updates += 1
+        self.outbox.put(*key, data)
+        self.deliver([key])
+
+    def deliver(self, keys: Optional[List[Tuple[str, str]]] = None) -> int:
+        """Send due outbox entries to the backend in one batch; failures are retried with backoff."""
+        entries = self.outbox.due(self.batch_size, keys)
+        if not entries:
+            return 0
+        done, error = self.backend.update_many([(e["table_name"], e["row_id"], e["data"]) for e in entries])
+        for entry in entries[:done]:
+            self.outbox.delivered(entry)
+        self.delivered += done
+        if error is not None:
+            # The backend is likely unreachable: back off the failed entry, retry the rest next flush
+            self.failures += 1
+            self.outbox.retry_later(entries[done], error)
+            logger.warning(
+                f"Persistence: {len(entries) - done} update(s) kept in outbox "
+                f"({entries[done]['table_name']}/{entries[done]['row_id']}): {error}"
+            )
+        return done
+
+    async def flush(self) -> int:
+        pending = self._pending
+        self._pending = {}
+        if pending:
+            await asyncio.to_thread(self._put_all, pending)
+        return await asyncio.to_thread(self.deliver)
+
+    def _put_all(self, pending: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        for (table, row_id), data in pending.items():
+            self.outbox.put(table, row_id, data)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Persistence flush error: {e}", exc_info=True)
+
+    def start(self) -> None:
+        """Start the background flusher on the running event loop."""
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._run())
+            logger.info(f"Persistence started ({self.backend.name} backend, {self.outbox.size()} in outbox)")
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out what is buffered; undelivered updates stay in the outbox."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "buffered": len(self._pending),
+            "outbox": self.outbox.size(),
+            "updates": self.updates,
+            "coalesced": self.coalesced,
+            "delivered": self.delivered,
+            "failures": self.failures,
+        }
+
+
+def create_backend(name: str = PERSISTENCE_BACKEND) -> PersistenceBackend:
+    if name == "sqlite":
+        return SQLiteBackend()
+    if name == "supabase":
+        return SupabaseBackend()
+    raise ValueError(f"Unknown persistence backend: {name}")
+
+
+persistence = PersistenceStore(create_backend(), Outbox())
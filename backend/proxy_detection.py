@@ -0,0 +1,205 @@
+"""
+Proxy-variable detection.
+Associations between every feature and every sensitive attribute are computed
+column-block by column-block: Pearson correlations as one standardized matrix
+product, Cramér's V and mutual information from contingency tables built with a
+single bincount per block. Blocks are spread across a thread pool.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from config import logger, PROXY_WORKERS, PROXY_BLOCK_COLUMNS, PROXY_MAX_CATEGORIES
+
+# Minimum |association| reported as a potential proxy
+PROXY_MIN_ASSOCIATION = 0.1
+# Continuous attributes are binned into quantiles for contingency tables
+ATTRIBUTE_BINS = 10
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=PROXY_WORKERS, thread_name_prefix="proxy")
+    return _thread_pool
+
+
+def _blocks(columns: List[str]) -> List[List[str]]:
+    return [columns[i:i + PROXY_BLOCK_COLUMNS] for i in range(0, len(columns), PROXY_BLOCK_COLUMNS)]
+
+
+def _map_blocks(func, blocks: List[Any]) -> List[Any]:
+    if len(blocks) > 1 and PROXY_WORKERS > 1:
+        return list(_get_thread_pool().map(func, blocks))
+    return [func(block) for block in blocks]
+
+
+def encode_attribute(series: pd.Series) -> np.ndarray:
+    """Numeric encoding of a sensitive attribute for correlations.
+
+    Categorical or low-cardinality attributes are label-encoded on their string
+    form; continuous numeric attributes are used as they are.
+    """
+    if not pd.api.types.is_numeric_dtype(series) or series.nunique() < 20:
+        _, codes = np.unique(series.astype(str).to_numpy(), return_inverse=True)
+        return codes.astype(float)
+    return series.to_numpy(dtype=float)
+
+
+def attribute_codes(series: pd.Series) -> np.ndarray:
+    """Category codes of an attribute for contingency tables (-1 when missing).
+
+    Continuous numeric attributes are cut into quantile bins.
+    """
+    if pd.api.types.is_numeric_dtype(series) and series.nunique() >= 20:
+        codes, _ = pd.factorize(pd.qcut(series, ATTRIBUTE_BINS, duplicates="drop"), sort=True)
+        return codes
+    codes, _ = pd.factorize(series)
+    return codes
+
+
+def pearson_matrix(features: pd.DataFrame, attributes: np.ndarray) -> np.ndarray:
+    """Pearson correlation of every feature (median-filled) with every attribute column.
+
+    `attributes` has shape (n_rows, n_attributes); returns (n_features, n_attributes),
+    NaN where a feature or attribute is constant or an attribute has missing values.
+    """
+    X = features.to_numpy(dtype=float, na_value=np.nan, copy=True)
+    missing = np.isnan(X)
+    filled = missing.any(axis=0)
+    if filled.any():
+        medians = np.nanmedian(X[:, filled], axis=0)
+        X[:, filled] = np.where(missing[:, filled], medians, X[:, filled])
+    X = X - X.mean(axis=0)
+    A = attributes - attributes.mean(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        norms = np.sqrt((X ** 2).sum(axis=0))[:, None] * np.sqrt((A ** 2).sum(axis=0))[None, :]
+        corr = (X.T @ A) / norms
+    corr[~np.isfinite(corr)] = np.nan
+    return corr
+
+
+def contingency_tables(feature_codes: np.ndarray, n_categories: np.ndarray, attr_codes: np.ndarray,
+                       n_attr: int) -> List[np.ndarray]:
+    """Feature x attribute contingency tables of a column block, from one bincount.
+
+    `feature_codes` is (n_rows, n_features) with codes in [0, n_categories); rows
+    with a missing attribute (code -1) are ignored.
+    """
+    valid = attr_codes >= 0
+    sizes = n_categories * n_attr
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    cells = (feature_codes[valid] * n_attr + attr_codes[valid, None] + offsets[:-1]).ravel()
+    flat = np.bincount(cells, minlength=offsets[-1])
+    return [flat[offsets[j]:offsets[j + 1]].reshape(n_categories[j], n_attr) for j in range(len(sizes))]
+
+
+def cramers_v_and_mi(table: np.ndarray) -> Dict[str, float]:
+    """Cramér's V and mutual information (nats) of a contingency table."""
+    table = table[table.sum(axis=1) > 0][:, table.sum(axis=0) > 0]
+    n = table.sum()
+    if n == 0 or min(table.shape) < 2:
+        return {"cramers_v": 0.0, "mutual_information": 0.0}
+
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0)) / n
+    chi2 = ((table - expected) ** 2 / expected).sum()
+    cramers_v = np.sqrt(chi2 / (n * (min(table.shape) - 1)))
+
+    nonzero = table > 0
+    mutual_information = (table[nonzero] / n * np.log(table[nonzero] / expected[nonzero])).sum()
+    return {"cramers_v": float(cramers_v), "mutual_information": float(max(mutual_information, 0.0))}
+
+
+def detect_proxies(
+    df: pd.DataFrame,
+    attributes: List[str],
+    exclude: Optional[List[str]] = None,
+    top_k: int = 10,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Features most associated with each sensitive attribute.
+
+    Numeric features are scored with Pearson correlation, categorical features with
+    Cramér's V (mutual information is reported alongside). Associations below
+    PROXY_MIN_ASSOCIATION are dropped; the top_k strongest are kept per attribute.
+    """
+    attributes = [a for a in attributes if a in df.columns]
+    if not attributes:
+        return {}
+    excluded = set(exclude or [])
+
+    numeric_cols = [
+        c for c in df.select_dtypes(include=[np.number]).columns if c not in excluded
+    ]
+    categorical_cols = [
+        c for c in df.select_dtypes(include=["object", "category", "bool"]).columns
+        if c not in excluded and df[c].nunique() <= PROXY_MAX_CATEGORIES
+    ]
+
+    results: Dict[str, List[Dict[str, Any]]] = {attr: [] for attr in attributes}
+
+    # Pearson: one matrix product per column block against all attributes at once
+    if numeric_cols:
+        encoded = np.column_stack([encode_attribute(df[attr]) for attr in attributes])
+
+        def pearson_block(cols):
+            return cols, pearson_matrix(df[cols], encoded)
+
+        for cols, corr in _map_blocks(pearson_block, _blocks(numeric_cols)):
+            for j, attr in enumerate(attributes):
+                for col, value in zip(cols, corr[:, j]):
+                    if col == attr or not np.isfinite(value) or abs(value) <= PROXY_MIN_ASSOCIATION:
+                        continue
+                    results[attr].append({
+                        "feature": col,
+                        "method": "pearson",
+                        "correlation": round(float(value), 4),
+                        "abs_correlation": abs(float(value)),
+                    })
+
+    # Cramér's V / mutual information from contingency tables
+    if categorical_cols:
+        codes_by_col = {}
+        for col in categorical_cols:
+            codes, uniques = pd.factorize(df[col])
+            # Missing values form their own category
+            codes_by_col[col] = (np.where(codes < 0, len(uniques), codes), len(uniques) + 1)
+
+        for attr in attributes:
+            attr_codes = attribute_codes(df[attr])
+            n_attr = int(attr_codes.max()) + 1 if len(attr_codes) else 0
+            if n_attr < 2:
+                continue
+            cols = [c for c in categorical_cols if c != attr]
+
+            def categorical_block(block, attr_codes=attr_codes, n_attr=n_attr):
+                feature_codes = np.column_stack([codes_by_col[c][0] for c in block])
+                n_categories = np.array([codes_by_col[c][1] for c in block])
+                tables = contingency_tables(feature_codes, n_categories, attr_codes, n_attr)
+                return [(c, cramers_v_and_mi(t)) for c, t in zip(block, tables)]
+
+            for block in _map_blocks(categorical_block, _blocks(cols)):
+                for col, assoc in block:
+                    if assoc["cramers_v"] <= PROXY_MIN_ASSOCIATION:
+                        continue
+                    results[attr].append({
+                        "feature": col,
+                        "method": "cramers_v",
+                        "correlation": round(assoc["cramers_v"], 4),
+                        "abs_correlation": assoc["cramers_v"],
+                        "mutual_information": round(assoc["mutual_information"], 4),
+                    })
+
+    for attr in attributes:
+        results[attr].sort(key=lambda x: x["abs_correlation"], reverse=True)
+        results[attr] = results[attr][:top_k]
+
+    logger.info(
+        f"Proxy detection: {len(numeric_cols)} numeric and {len(categorical_cols)} categorical "
+        f"features against {len(attributes)} attributes"
+    )
+    return results
@@ -0,0 +1,101 @@
+"""
+Content-addressed result cache.
+Results are keyed by dataset content fingerprints plus normalized request
+parameters, bounded with LRU eviction and invalidated when a dataset changes.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from config import RESULT_CACHE_MAX_ENTRIES, PREDICTION_CACHE_MAX_ENTRIES
+
+
+def make_cache_key(namespace: str, fingerprints: Iterable[str], params: Dict[str, Any]) -> str:
+    """Stable key from an endpoint namespace, dataset fingerprints and request parameters."""
+    normalized = json.dumps(params, sort_keys=True, default=str)
+    raw = "|".join([namespace, *fingerprints, normalized])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU cache with hit/miss counters and per-dataset invalidation."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._datasets: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key: str, value: Any, dataset_ids: Iterable[Any] = ()) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._link(key, dataset_ids)
+
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                for keys in self._datasets.values():
+                    keys.discard(old_key)
+
+    def link(self, key: str, dataset_ids: Iterable[Any]) -> None:
+        """Record that a cached result is also served for these datasets (same content)."""
+        with self._lock:
+            if key in self._entries:
+                self._link(key, dataset_ids)
+
+    def _link(self, key: str, dataset_ids: Iterable[Any]) -> None:
+        for dataset_id in dataset_ids:
+            self._datasets.setdefault(str(dataset_id), set()).add(key)
+
+    def invalidate_dataset(self, dataset_id: Any) -> int:
+        """Drop every cached result computed from a dataset."""
+        with self._lock:
+            keys = self._datasets.pop(str(dataset_id), set())
+            removed = 0
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+            self.invalidations += removed
+            return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._datasets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Fairness and bias-analysis results
+result_cache = ResultCache()
+
+# Model prediction vectors, keyed by (model, dataset version)
+prediction_cache = ResultCache(max_entries=PREDICTION_CACHE_MAX_ENTRIES)
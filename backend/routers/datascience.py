@@ -12,14 +12,10 @@ from schemas import (
     DSFeatureEngRequest, DSModelingRequest, DSIntelligenceRequest,
     DSInterpretRequest, DSProjectCreateRequest, TrainRequest,
 )
-from utils import to_json_safe, datasets_store, models_store
+from utils import to_json_safe, datasets_store, models_store, update_dataset_df, dataset_view
 from ds_engine import SeniorDataScientistEngine
-
-# Supabase client for project persistence
-from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_SERVICE_KEY
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+from compute import compute_executor
+from persistence import persistence
 
 router = APIRouter(prefix="/api", tags=["Data Science"])
 
@@ -33,12 +29,12 @@ def set_llm_analyzer(analyzer):
 
 
 async def _update_ds_project(project_id: str, update_data: Dict[str, Any]):
-    """Helper to update a Data Science project in Supabase."""
+    """Queue an update of a Data Science project (coalesced with other pending updates of it)."""
     try:
         if not project_id or project_id == "undefined":
             return
-        supabase.table("ds_projects").update(update_data).eq("id", project_id).execute()
-        logger.info(f"Updated DS Project {project_id}")
+        await persistence.update("ds_projects", project_id, to_json_safe(update_data))
+        logger.info(f"Queued update of DS Project {project_id}")
     except Exception as e:
         logger.warning(f"Failed to update DS Project {project_id}: {e}")
 
@@ -116,6 +112,19 @@ async def ds_intelligence(request: DSIntelligenceRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _eda_computations(df, target_column, n_components):
+    """CPU-bound part of the EDA (run in the compute executor)."""
+    target_dist = None
+    if target_column:
+        target_dist = SeniorDataScientistEngine.get_target_distributions(df, target_column)
+
+    dim_reduction = SeniorDataScientistEngine.get_dimensionality_reduction(df, n_components)
+    correlations = SeniorDataScientistEngine.get_correlation_matrix(df)
+    outliers = SeniorDataScientistEngine.get_outlier_analysis(df)
+    detailed_stats = SeniorDataScientistEngine.get_detailed_stats(df)
+    return target_dist, dim_reduction, correlations, outliers, detailed_stats
+
+
 @router.post("/ds/eda")
 async def ds_eda(request: DSEdaRequest):
     """Exploratory Data Analysis with expert insights."""
@@ -125,14 +134,9 @@ async def ds_eda(request: DSEdaRequest):
 
         df = datasets_store[request.dataset_id]["df"]
 
-        target_dist = None
-        if request.target_column:
-            target_dist = SeniorDataScientistEngine.get_target_distributions(df, request.target_column)
-
-        dim_reduction = SeniorDataScientistEngine.get_dimensionality_reduction(df, request.n_components)
-        correlations = SeniorDataScientistEngine.get_correlation_matrix(df)
-        outliers = SeniorDataScientistEngine.get_outlier_analysis(df)
-        detailed_stats = SeniorDataScientistEngine.get_detailed_stats(df)
+        target_dist, dim_reduction, correlations, outliers, detailed_stats = await compute_executor.run(
+            "ds_eda", _eda_computations, df, request.target_column, request.n_components
+        )
 
         expert_insights = None
         if llm_analyzer:
@@ -173,7 +177,7 @@ async def ds_feature_engineering(request: DSFeatureEngRequest):
         if request.dataset_id not in datasets_store:
             raise HTTPException(status_code=404, detail=f"Dataset '{request.dataset_id}' non trouve")
 
-        df = datasets_store[request.dataset_id]["df"].copy()
+        df = dataset_view(request.dataset_id)
 
         new_features = []
         if request.date_column:
@@ -182,7 +186,7 @@ async def ds_feature_engineering(request: DSFeatureEngRequest):
             )
             new_features.extend(ts_features)
 
-        datasets_store[request.dataset_id]["df"] = df
+        update_dataset_df(request.dataset_id, df)
 
         if request.project_id:
             await _update_ds_project(request.project_id, {
@@ -312,9 +316,9 @@ async def create_ds_project(request: DSProjectCreateRequest):
         if request.dataset_id:
             payload["dataset_id"] = request.dataset_id
 
-        res = supabase.table("ds_projects").insert(payload).execute()
-        if hasattr(res, "data") and len(res.data) > 0:
-            return {"status": "success", "project": res.data[0]}
+        project = await persistence.insert("ds_projects", payload)
+        if project:
+            return {"status": "success", "project": project}
         return {"status": "error", "message": "Failed to create project"}
 
     except Exception as e:
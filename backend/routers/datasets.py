@@ -2,141 +2,454 @@
 Dataset upload, retrieval, and EDA endpoints.
 """
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+from multipart.exceptions import MultipartParseError
 from datetime import datetime
 import pandas as pd
 import numpy as np
-import io
 import os
+import glob
+import json
 import uuid
+import hashlib
+from typing import Any, Dict
 
-from config import logger, UPLOAD_DIR, MAX_UPLOAD_SIZE_BYTES, ALLOWED_FILE_EXTENSIONS
+from config import logger, UPLOAD_DIR, MAX_UPLOAD_SIZE_BYTES, UPLOAD_CHUNK_BYTES, ALLOWED_FILE_EXTENSIONS
 from schemas import DSAnalyzeRequest, DSEdaRequest
-from utils import to_json_safe, datasets_store, load_dataset
+from utils import (
+    to_json_safe, datasets_store, invalidate_dataset_caches, save_dataset_columnar, compact_dataset,
+    find_dataset_file, delete_dataset,
+)
+from ingestion import (
+    ingest_file, normalize_column_types, is_spreadsheet, list_sheets, resolve_sheet, ColumnTypeError, SheetError,
+)
+from dataset_cache import has_columnar, columnar_metadata, link_columnar, remove_columnar
+from upload_store import store_upload, aliases, collect_garbage, save_ingest_options, remove_ingest_options
+from compute import compute_executor
+from job_queue import job_queue, register_handler, JobContext
 
 router = APIRouter(prefix="/api", tags=["Datasets"])
 
+SPREADSHEET_INGEST_JOB = "dataset_ingest"
 
-@router.post("/datasets/upload")
-async def upload_dataset(
-    file: UploadFile = File(...),
-    dataset_name: str = Form(None),
-    dataset_id: str = Form(None),
-):
-    """Upload a dataset file (CSV, Excel, JSON)."""
-    logger.info(f"Upload request for dataset_id={dataset_id}, file={file.filename}")
-
-    # Validate file extension
-    ext = os.path.splitext(file.filename or "")[1].lower()
-    if ext not in ALLOWED_FILE_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type '{ext}' not supported. Allowed: {', '.join(ALLOWED_FILE_EXTENSIONS)}",
-        )
 
-    try:
-        active_id = dataset_id if dataset_id else str(uuid.uuid4())
-        content = await file.read()
+class _StagedUpload:
+    """File part of an upload, written to a staging file in UPLOAD_DIR as it arrives.
+
+    The content is hashed and the file size limit enforced on the way.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.size = 0
+        self.partial = os.path.join(UPLOAD_DIR, f".upload-{uuid.uuid4().hex}.part")
+        self._digest = hashlib.sha256()
+        self._out = open(self.partial, "wb")
 
-        # Validate file size
-        if len(content) > MAX_UPLOAD_SIZE_BYTES:
+    @property
+    def sha256(self) -> str:
+        return self._digest.hexdigest()
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > MAX_UPLOAD_SIZE_BYTES:
             raise HTTPException(
                 status_code=413,
                 detail=f"File too large. Maximum size: {MAX_UPLOAD_SIZE_BYTES // (1024*1024)}MB",
             )
+        self._digest.update(chunk)
+        self._out.write(chunk)
 
-        # Save to disk
-        file_ext = ".csv" if file.filename.lower().endswith(".csv") else ".xlsx"
-        save_path = os.path.join(UPLOAD_DIR, f"{active_id}{file_ext}")
-        with open(save_path, "wb") as f:
-            f.write(content)
-
-        # Parse file
-        filename = file.filename.lower()
-        if filename.endswith(".csv"):
-            df = pd.read_csv(io.BytesIO(content))
-        elif filename.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(io.BytesIO(content))
-        elif filename.endswith(".json"):
-            df = pd.read_json(io.BytesIO(content))
-        else:
-            raise HTTPException(status_code=400, detail="Format de fichier non supporte.")
-
-        # Detect column types
-        columns_info = []
-        for col in df.columns:
-            dtype = df[col].dtype
-            if pd.api.types.is_numeric_dtype(dtype):
-                col_type = "numerical"
-            elif pd.api.types.is_datetime64_any_dtype(dtype):
-                col_type = "datetime"
-            elif isinstance(dtype, pd.CategoricalDtype) or (
-                not pd.api.types.is_numeric_dtype(dtype) and df[col].nunique() < 20
-            ):
-                col_type = "categorical"
-            else:
-                col_type = "text"
-            columns_info.append({"name": col, "type": col_type})
-
-        # File size formatting
-        file_size_bytes = len(content)
-        if file_size_bytes < 1024:
-            size_str = f"{file_size_bytes} B"
-        elif file_size_bytes < 1024 * 1024:
-            size_str = f"{file_size_bytes / 1024:.2f} KB"
-        else:
-            size_str = f"{file_size_bytes / (1024 * 1024):.2f} MB"
-
-        # Data profiling
-        profiling = {
-            "missing_values": df.isnull().sum().to_dict(),
-            "data_types": {col: str(dtype) for col, dtype in df.dtypes.items()},
-            "summary_stats": (
-                df.describe(include=[np.number]).to_dict()
-                if not df.select_dtypes(include=[np.number]).empty
-                else {}
-            ),
-        }
+    def close(self) -> None:
+        self._out.close()
+
+    def discard(self) -> None:
+        self._out.close()
+        if os.path.exists(self.partial):
+            os.remove(self.partial)
+
+
+async def _receive_upload(request: Request):
+    """Parse a multipart upload from the request body as it is received.
+
+    Form fields are kept in memory; the "file" part goes straight to a staging
+    file, so the body is written to disk once (no spooled copy) and memory use
+    stays at one chunk. Returns (fields, staged file or None).
+    """
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    if b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Requete multipart/form-data attendue")
+
+    fields: Dict[str, str] = {}
+    staged = None
+    part = {}
+    pending = []
+
+    def on_part_begin():
+        part.update(header=b"", value=b"", disposition=b"", name="", data=b"", file=False)
+
+    def on_header_field(data, start, end):
+        part["header"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["value"] += data[start:end]
+
+    def on_header_end():
+        if part["header"].lower() == b"content-disposition":
+            part["disposition"] = part["value"]
+        part["header"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        nonlocal staged
+        _, options = parse_options_header(part["disposition"])
+        part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            return
+        if part["name"] != "file" or staged is not None:
+            part["file"] = None  # other file parts are skipped
+            return
+        filename = options[b"filename"].decode("utf-8", "replace")
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in ALLOWED_FILE_EXTENSIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type '{ext}' not supported. Allowed: {', '.join(ALLOWED_FILE_EXTENSIONS)}",
+            )
+        staged = _StagedUpload(filename)
+        part["file"] = True
+
+    def on_part_data(data, start, end):
+        if part["file"]:
+            pending.append(data[start:end])
+        elif part["file"] is False:
+            part["data"] += data[start:end]
+
+    def on_part_end():
+        if part["file"] is False:
+            fields[part["name"]] = part["data"].decode("utf-8", "replace")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin, "on_header_field": on_header_field, "on_header_value": on_header_value,
+        "on_header_end": on_header_end, "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data, "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            # File data is written off the event loop, a chunk at a time
+            if sum(map(len, pending)) >= UPLOAD_CHUNK_BYTES:
+                data = b"".join(pending)
+                pending.clear()
+                await run_in_threadpool(staged.write, data)
+        parser.finalize()
+        if staged is not None:
+            await run_in_threadpool(staged.write, b"".join(pending))
+            staged.close()
+    except BaseException as e:
+        if staged is not None:
+            staged.discard()
+        if isinstance(e, MultipartParseError):
+            raise HTTPException(status_code=400, detail=f"Corps multipart invalide: {e}")
+        raise
+    return fields, staged
+
+
+def _ingest_options(column_types, sheet=None) -> Dict[str, Any]:
+    """Parsing options recorded with a dataset: identical files only share a parse made with the same ones."""
+    return {"column_types": column_types or {}, "sheet": sheet}
+
+
+def _reuse_parsed_upload(save_path, active_id, filename, dataset_name, options, sha256):
+    """Register an upload whose content was already parsed under another dataset id.
 
-        total_missing = sum(profiling["missing_values"].values())
-        total_cells = len(df) * len(df.columns)
-        quality_score = max(0, 100 - (total_missing / total_cells * 100)) if total_cells > 0 else 100
-
-        # Store in memory
-        datasets_store[active_id] = {
-            "df": df,
-            "filename": filename,
-            "name": dataset_name if dataset_name else filename,
-            "uploaded_at": datetime.now().isoformat(),
-            "rows": len(df),
-            "columns": len(df.columns),
-            "columns_info": columns_info,
-            "profiling": profiling,
-            "quality_score": round(quality_score, 2),
+    The new id shares the earlier dataset's columnar file (and its resident
+    frame, if any). Returns the stored profile, or None if there is nothing to reuse.
+    """
+    for source_id in aliases(save_path):
+        if not has_columnar(source_id, save_path):
+            continue
+        metadata = columnar_metadata(source_id)
+        if metadata.get("sha256") != sha256 or metadata.get("ingest_options") != options or "modified_at" in metadata:
+            continue  # parsed from other content (e.g. this id before the re-upload) or with other options
+        if source_id != active_id:
+            # Whatever this id held before must not outlive the link
+            datasets_store.discard(active_id)
+            remove_columnar(active_id)
+            invalidate_dataset_caches(active_id)
+            alias = {"filename": filename, "name": dataset_name or filename, "uploaded_at": datetime.now().isoformat()}
+            if not link_columnar(source_id, active_id, alias):
+                return None
+            metadata.update(alias)
+        logger.info(f"Dataset {active_id}: same content as {source_id}, parse reused")
+        reused = {
+            "rows": metadata["rows"],
+            "columns": metadata["columns"],
+            "columns_info": metadata.get("columns_info", []),
+            "stats": {"rows": metadata["rows"], "cols": metadata["columns"]},
+            "profiling": metadata.get("profiling"),
+            "quality_score": metadata.get("quality_score"),
+            "schema": metadata.get("schema"),
+            "ingestion": metadata.get("ingestion"),
+            "sha256": metadata.get("sha256"),
         }
+        if source_id != active_id:
+            reused["duplicate_of"] = source_id
+        return reused
+    return None
+
+
+def _ingest_upload(save_path, active_id, filename, dataset_name, file_size_bytes, column_types,
+                   sheet=None, progress=None, sha256=None):
+    """Parse a stored upload, profile it and register it (run in the compute executor or a job worker)."""
+    df, ingestion = ingest_file(save_path, column_types, sheet=sheet, progress=progress)
+
+    # Detect column types
+    columns_info = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_numeric_dtype(dtype):
+            col_type = "numerical"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            col_type = "datetime"
+        elif isinstance(dtype, pd.CategoricalDtype) or (
+            not pd.api.types.is_numeric_dtype(dtype) and df[col].nunique() < 20
+        ):
+            col_type = "categorical"
+        else:
+            col_type = "text"
+        columns_info.append({"name": col, "type": col_type})
+
+    # File size formatting
+    if file_size_bytes < 1024:
+        size_str = f"{file_size_bytes} B"
+    elif file_size_bytes < 1024 * 1024:
+        size_str = f"{file_size_bytes / 1024:.2f} KB"
+    else:
+        size_str = f"{file_size_bytes / (1024 * 1024):.2f} MB"
+
+    # Data profiling
+    profiling = {
+        "missing_values": df.isnull().sum().to_dict(),
+        "data_types": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "summary_stats": (
+            df.describe(include=[np.number]).to_dict()
+            if not df.select_dtypes(include=[np.number]).empty
+            else {}
+        ),
+    }
+
+    total_missing = sum(profiling["missing_values"].values())
+    total_cells = len(df) * len(df.columns)
+    quality_score = max(0, 100 - (total_missing / total_cells * 100)) if total_cells > 0 else 100
+
+    # Compact dtypes (lossless downcasts, low-cardinality strings as categories)
+    df, schema = compact_dataset(df)
 
-        logger.info(f"Dataset {active_id} uploaded: {len(df)} rows, quality={quality_score:.1f}%")
+    # Store in memory
+    datasets_store[active_id] = {
+        "df": df,
+        "schema": schema,
+        "filename": filename,
+        "name": dataset_name if dataset_name else filename,
+        "uploaded_at": datetime.now().isoformat(),
+        "rows": len(df),
+        "columns": len(df.columns),
+        "columns_info": columns_info,
+        "profiling": profiling,
+        "quality_score": round(quality_score, 2),
+        "ingestion": ingestion,
+        "ingest_options": _ingest_options(column_types, sheet),
+        "sha256": sha256,
+    }
+
+    invalidate_dataset_caches(active_id)
+    save_dataset_columnar(active_id)
+
+    logger.info(f"Dataset {active_id} uploaded ({size_str}): {len(df)} rows, quality={quality_score:.1f}%")
+
+    return {
+        "rows": len(df),
+        "columns": len(df.columns),
+        "columns_info": columns_info,
+        "stats": {"rows": len(df), "cols": len(df.columns)},
+        "profiling": profiling,
+        "quality_score": round(quality_score, 2),
+        "schema": schema,
+        "ingestion": ingestion,
+        "sha256": sha256,
+    }
+
+
+def _ingest_spreadsheet_background(payload: Dict[str, Any], job: JobContext):
+    """Job handler: parse an uploaded workbook sheet into the columnar cache.
+
+    The API process picks the dataset up from the columnar cache, so the entry
+    does not stay resident in the worker.
+    """
+    dataset_id = payload["dataset_id"]
+    job.progress(0.0, "Lecture de la feuille")
+    result = _ingest_upload(
+        payload["path"], dataset_id, payload["filename"], payload["dataset_name"],
+        payload["file_size_bytes"], payload["column_types"], sheet=payload["sheet"],
+        progress=lambda fraction, rows: job.progress(0.9 * fraction, f"{rows} lignes lues"),
+        sha256=payload.get("sha256"),
+    )
+    if has_columnar(dataset_id):
+        datasets_store.discard(dataset_id)
+    return to_json_safe({"dataset_id": dataset_id, "rows": result["rows"], "columns": result["columns"],
+                         "quality_score": result["quality_score"], "ingestion": result["ingestion"]})
+
+
+register_handler(SPREADSHEET_INGEST_JOB, _ingest_spreadsheet_background)
+
+
+# Form of /datasets/upload, read by _receive_upload rather than by FastAPI
+_UPLOAD_FORM = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+    "type": "object",
+    "required": ["file"],
+    "properties": {
+        "file": {"type": "string", "format": "binary"},
+        **{name: {"type": "string"} for name in ("dataset_name", "dataset_id", "column_types", "sheet")},
+    },
+}}}}}
+
+
+@router.post("/datasets/upload", openapi_extra=_UPLOAD_FORM)
+async def upload_dataset(request: Request):
+    """Upload a dataset file (CSV, Excel, JSON).
+
+    The file is written to disk as the request body arrives and parsed from
+    there, so memory use does not grow with the size of the upload. Form
+    fields: file, dataset_name, dataset_id, column_types, sheet. `column_types` is an
+    optional JSON object of per-column type overrides (string, int64, float64,
+    bool, datetime); rows that do not fit are listed in the "ingestion" report,
+    and the upload is refused (400) when no row fits them.
+
+    Excel workbooks are parsed by a background job: the response carries a
+    job_id to follow on /api/jobs/{job_id}, and requests for the dataset answer
+    409 until the job is done. `sheet` picks the worksheet by name
+    or position (the first one by default, see /api/datasets/{id}/sheets).
+
+    Uploads are stored by content hash: a file already parsed with the same
+    options is not parsed again, and the response (with "duplicate_of") comes
+    straight from the earlier dataset's profile.
+    """
+    # Extension and size limit checked while the body is received
+    fields, file = await _receive_upload(request)
+    try:
+        if file is None:
+            raise HTTPException(status_code=422, detail="Champ 'file' manquant")
+        dataset_name, dataset_id, sheet = fields.get("dataset_name"), fields.get("dataset_id"), fields.get("sheet")
+        column_types = fields.get("column_types")
+        logger.info(f"Upload request for dataset_id={dataset_id}, file={file.filename}")
+
+        try:
+            overrides = normalize_column_types(json.loads(column_types) if column_types else None)
+        except (ValueError, AttributeError) as e:
+            raise HTTPException(status_code=400, detail=f"column_types invalide: {e}")
 
-        return to_json_safe(
-            {
+        active_id = dataset_id if dataset_id else str(uuid.uuid4())
+        ext = os.path.splitext(file.filename)[1].lower()
+        save_path = os.path.join(UPLOAD_DIR, f"{active_id}{ext}")
+        file_size_bytes, sha256 = file.size, file.sha256
+        known = store_upload(file.partial, sha256, save_path)
+    finally:
+        if file is not None:
+            file.discard()
+
+    try:
+        for stale in glob.glob(os.path.join(UPLOAD_DIR, f"{active_id}.*")):
+            if stale != save_path and os.path.splitext(stale)[1] in ALLOWED_FILE_EXTENSIONS:
+                os.remove(stale)
+        collect_garbage()  # the content this id replaced may no longer be used
+
+        if is_spreadsheet(save_path):
+            try:
+                sheet_name = resolve_sheet(await compute_executor.run("dataset_upload", list_sheets, save_path), sheet)
+            except SheetError:
+                os.remove(save_path)
+                remove_ingest_options(active_id)
+                raise
+            options = _ingest_options(overrides, sheet_name)
+            save_ingest_options(active_id, options)
+            if known:
+                reused = await compute_executor.run(
+                    "dataset_upload", _reuse_parsed_upload,
+                    save_path, active_id, file.filename.lower(), dataset_name, options, sha256,
+                )
+                if reused is not None:
+                    return to_json_safe({"dataset_id": active_id, "filename": file.filename, **reused})
+            datasets_store.discard(active_id)
+            invalidate_dataset_caches(active_id)
+            job_id = job_queue.enqueue(SPREADSHEET_INGEST_JOB, {
+                "path": save_path,
+                "dataset_id": active_id,
+                "filename": file.filename.lower(),
+                "dataset_name": dataset_name,
+                "file_size_bytes": file_size_bytes,
+                "column_types": overrides,
+                "sheet": sheet_name,
+                "sha256": sha256,
+            })
+            # Until the job is done, API requests for this id answer 409 instead of parsing the workbook
+            save_ingest_options(active_id, {**options, "job_id": job_id})
+            return {
                 "dataset_id": active_id,
                 "filename": file.filename,
-                "rows": len(df),
-                "columns": len(df.columns),
-                "columns_info": columns_info,
-                "stats": {"rows": len(df), "cols": len(df.columns)},
-                "profiling": profiling,
-                "quality_score": round(quality_score, 2),
+                "sheet": sheet_name,
+                "status": "processing",
+                "message": "Import du classeur en cours",
+                "job_id": job_id,
             }
+
+        options = _ingest_options(overrides)
+        save_ingest_options(active_id, options)
+        if known:
+            reused = await compute_executor.run(
+                "dataset_upload", _reuse_parsed_upload,
+                save_path, active_id, file.filename.lower(), dataset_name, options, sha256,
+            )
+            if reused is not None:
+                return to_json_safe({"dataset_id": active_id, "filename": file.filename, **reused})
+
+        # Parse, profile and register
+        result = await compute_executor.run(
+            "dataset_upload", _ingest_upload,
+            save_path, active_id, file.filename.lower(), dataset_name, file_size_bytes, overrides, sha256=sha256,
         )
+        return to_json_safe({"dataset_id": active_id, "filename": file.filename, **result})
 
     except HTTPException:
         raise
+    except ColumnTypeError as e:
+        # Overrides the file cannot be parsed with: nothing is kept under this id
+        await compute_executor.run("dataset_upload", delete_dataset, active_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except SheetError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Upload error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/datasets/{dataset_id}/sheets")
+async def get_dataset_sheets(dataset_id: str):
+    """List the worksheets of an uploaded Excel workbook."""
+    path = find_dataset_file(dataset_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Dataset non trouve")
+    if not is_spreadsheet(path):
+        raise HTTPException(status_code=400, detail="Le dataset n'est pas un classeur Excel")
+    try:
+        sheets = await compute_executor.run("dataset_upload", list_sheets, path)
+    except Exception as e:
+        logger.error(f"Sheet listing error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"dataset_id": dataset_id, "sheets": sheets}
+
+
 @router.get("/datasets/{dataset_id}")
 async def get_dataset(dataset_id: str):
     """Get dataset info and preview."""
@@ -158,6 +471,20 @@ async def get_dataset(dataset_id: str):
     }
 
 
+@router.delete("/datasets/{dataset_id}")
+async def remove_dataset(dataset_id: str):
+    """Delete a dataset; its stored upload goes once no other dataset shares the same content."""
+    try:
+        found = await compute_executor.run("dataset_upload", delete_dataset, dataset_id)
+    except Exception as e:
+        logger.error(f"Dataset deletion error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    if not found:
+        raise HTTPException(status_code=404, detail="Dataset non trouve")
+    logger.info(f"Dataset {dataset_id} deleted")
+    return {"dataset_id": dataset_id, "status": "deleted"}
+
+
 @router.get("/eda/{dataset_id}")
 async def get_eda(dataset_id: str):
     """Get exploratory data analysis for a dataset."""
@@ -5,30 +5,41 @@ Fairness calculation and bias analysis endpoints.
 import uuid
 import json
 import asyncio
+import threading
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Any
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request
-from sklearn.preprocessing import LabelEncoder
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
-from config import (
-    logger, SUPABASE_URL, SUPABASE_SERVICE_KEY,
-    FAIRNESS_SPD_THRESHOLD, FAIRNESS_DI_LOW, FAIRNESS_DI_HIGH,
-    FAIRNESS_EOD_THRESHOLD, FAIRNESS_EO_THRESHOLD,
-    FAIRNESS_RISK_HIGH, FAIRNESS_RISK_MEDIUM,
+from config import logger
+from schemas import (
+    FairnessRequest, FairnessResponse, StreamingFairnessRequest, FairnessAppendRequest, ThresholdCurveRequest,
+    BatchFairnessRequest,
 )
-from schemas import FairnessRequest, FairnessMetric, FairnessResponse
-from utils import to_json_safe, datasets_store, load_dataset
-
-# Supabase client for background task updates
-from supabase import create_client, Client
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+from utils import (
+    to_json_safe, datasets_store, models_store, load_dataset, dataset_view, find_dataset_file, dataset_fingerprint,
+)
+from scoring import dataset_predictions, dataset_scores, predict_labels
+from compute import compute_executor
+from job_queue import job_queue, register_handler, JobContext, JobCancelled
+from result_cache import result_cache, make_cache_key
+from fairness_engine import (
+    build_count_tables, fairness_from_tables, stream_count_tables, text_labelled,
+    merge_count_tables, pool_small_groups, favorable_mask, SharedCountTables, group_outcome_counts,
+    group_rates, metric_values, sweep_thresholds, threshold_count_tensor,
+)
+from audit_store import save_audit_stats, load_audit_stats
+from proxy_detection import detect_proxies
+from fairness_stats import significance_for_tables
+from persistence import persistence
 
 router = APIRouter(prefix="/api", tags=["Fairness"])
 
+ENHANCED_AUDIT_JOB = "fairness_enhanced"
+
 # LLM analyzer (set by main app)
 llm_analyzer = None
 
@@ -38,162 +49,183 @@ def set_llm_analyzer(analyzer):
     llm_analyzer = analyzer
 
 
-def _calculate_metrics_for_df(df, target_column, sensitive_attributes, favorable_outcome=1, predictions=None):
-    """Helper to calculate fairness metrics for a dataframe."""
-    if predictions is None:
-        predictions = df[target_column]
-
-    actual = df[target_column]
-    metrics_by_attribute = {}
-    all_scores = []
-
-    for attr in sensitive_attributes:
-        if attr not in df.columns:
-            logger.warning(f"Attribute {attr} not found in columns: {df.columns.tolist()}")
-            continue
-
-        attr_metrics = []
-        groups = [g for g in df[attr].unique() if pd.notna(g)]
+# Request fields needed to update an audit from its stored count tables (model_id: prediction source)
+AUDIT_CONFIG_FIELDS = {
+    "dataset_id", "model_id", "target_column", "prediction_column", "sensitive_attributes", "favorable_outcome",
+    "intersectional", "max_intersection_size", "min_group_support", "small_group_strategy",
+    "confidence_intervals", "n_bootstrap", "confidence_level", "multiple_testing",
+}
 
-        if len(groups) < 2:
-            logger.warning(f"Not enough groups for {attr} (needed 2+, found {len(groups)})")
-            continue
 
-        # Calculate per-group statistics
-        group_stats = {}
-        for group in groups:
-            mask = df[attr] == group
-            group_preds = predictions[mask].astype(str)
-            group_actual = actual[mask].astype(str)
-            fav_str = str(favorable_outcome)
-
-            matches = group_preds == fav_str
-            positive_rate = matches.mean() if len(group_preds) > 0 else 0
-
-            actual_positive_mask = group_actual == fav_str
-            tpr = (
-                ((group_preds == fav_str) & actual_positive_mask).sum() / actual_positive_mask.sum()
-                if actual_positive_mask.sum() > 0
-                else 0
-            )
-
-            actual_negative_mask = group_actual != fav_str
-            fpr = (
-                ((group_preds == fav_str) & actual_negative_mask).sum() / actual_negative_mask.sum()
-                if actual_negative_mask.sum() > 0
-                else 0
-            )
-
-            group_stats[group] = {
-                "positive_rate": float(positive_rate),
-                "tpr": float(tpr),
-                "fpr": float(fpr),
-                "count": int(mask.sum()),
-            }
+def _intersection_options(request: FairnessRequest) -> Dict[str, Any]:
+    """Intersectional audit options of a fairness request."""
+    return {
+        "intersectional": request.intersectional,
+        "max_intersection_size": request.max_intersection_size,
+    }
 
-        ref_group = max(group_stats.keys(), key=lambda g: group_stats[g]["count"])
-        ref_stats = group_stats[ref_group]
 
-        for group, stats in group_stats.items():
-            if group == ref_group:
-                continue
+def _predictions_for(request: FairnessRequest, df, dataset_id):
+    """Predictions to audit: a prediction column, a stored model's scores, or the target itself."""
+    if request.prediction_column:
+        if request.prediction_column in df.columns:
+            return df[request.prediction_column]
+        logger.warning(f"Prediction column {request.prediction_column} not found, using model or target")
+    if request.model_id is not None and str(request.model_id) in models_store:
+        return dataset_predictions(request.model_id, dataset_id, df)
+    return None
+
+
+def _audited_request(request: FairnessRequest, df) -> FairnessRequest:
+    """The request as _predictions_for resolved it: the prediction source saved with the audit.
+
+    A model_id that is not a stored model (the enhanced endpoint passes the audit
+    id there) is not a source, nor is a prediction column missing from the data.
+    """
+    column = request.prediction_column if request.prediction_column in df.columns else None
+    model_id = request.model_id if column is None and str(request.model_id) in models_store else None
+    return request.model_copy(update={"prediction_column": column, "model_id": model_id})
+
+
+def _audit_columns(request: FairnessRequest):
+    """Columns an audit reads, or None when predictions come from a model (which needs its features)."""
+    if request.model_id is not None and str(request.model_id) in models_store:
+        return None
+    return list(dict.fromkeys(
+        [request.target_column, *request.sensitive_attributes]
+        + ([request.prediction_column] if request.prediction_column else [])
+    ))
+
+
+def _calculate_tables(df, request: FairnessRequest, predictions=None):
+    """Raw (mergeable) count tables of a dataframe for a fairness request."""
+    return build_count_tables(
+        df, request.target_column, request.sensitive_attributes, request.favorable_outcome,
+        predictions, **_intersection_options(request),
+    )
+
+
+def _results_from_tables(tables, request: FairnessRequest):
+    """Fairness results from raw count tables, with significance when requested."""
+    tables = pool_small_groups(
+        tables, request.sensitive_attributes, request.min_group_support, request.small_group_strategy
+    )
+    significance = None
+    if request.confidence_intervals:
+        significance = significance_for_tables(
+            tables,
+            n_resamples=request.n_bootstrap,
+            confidence_level=request.confidence_level,
+            correction=request.multiple_testing,
+        )
+    return fairness_from_tables(tables, significance)
 
-            # 1. Statistical Parity Difference
-            spd = stats["positive_rate"] - ref_stats["positive_rate"]
-            spd_status = "pass" if abs(spd) < FAIRNESS_SPD_THRESHOLD else ("warning" if abs(spd) < 0.2 else "fail")
-            attr_metrics.append(
-                FairnessMetric(
-                    name="Parite Statistique (SPD)",
-                    value=round(spd, 4),
-                    description=f"Difference de taux de selection entre {group} et {ref_group}",
-                    threshold=FAIRNESS_SPD_THRESHOLD,
-                    status=spd_status,
-                )
-            )
-            all_scores.append(1 - min(abs(spd), 1))
-
-            # 2. Disparate Impact Ratio
-            di = stats["positive_rate"] / ref_stats["positive_rate"] if ref_stats["positive_rate"] > 0 else 1.0
-            di_status = "pass" if FAIRNESS_DI_LOW <= di <= FAIRNESS_DI_HIGH else ("warning" if 0.6 <= di <= 1.5 else "fail")
-            attr_metrics.append(
-                FairnessMetric(
-                    name="Impact Disparate (DI)",
-                    value=round(di, 4),
-                    description=f"Ratio de selection entre {group} et {ref_group}",
-                    threshold=FAIRNESS_DI_LOW,
-                    status=di_status,
-                )
-            )
-            all_scores.append(min(di, 1 / di) if di > 0 else 0)
-
-            # 3. Equal Opportunity Difference
-            eod = stats["tpr"] - ref_stats["tpr"]
-            eod_status = "pass" if abs(eod) < FAIRNESS_EOD_THRESHOLD else ("warning" if abs(eod) < 0.2 else "fail")
-            attr_metrics.append(
-                FairnessMetric(
-                    name="Egalite des Chances (EOD)",
-                    value=round(eod, 4),
-                    description=f"Difference de taux de vrais positifs entre {group} et {ref_group}",
-                    threshold=FAIRNESS_EOD_THRESHOLD,
-                    status=eod_status,
-                )
-            )
-            all_scores.append(1 - min(abs(eod), 1))
-
-            # 4. Equalized Odds Difference
-            fpr_diff = stats["fpr"] - ref_stats["fpr"]
-            avg_odds = (abs(eod) + abs(fpr_diff)) / 2
-            eo_status = "pass" if avg_odds < FAIRNESS_EO_THRESHOLD else ("warning" if avg_odds < 0.2 else "fail")
-            attr_metrics.append(
-                FairnessMetric(
-                    name="Odds Egalises (EO)",
-                    value=round(avg_odds, 4),
-                    description=f"Moyenne des differences TPR et FPR entre {group} et {ref_group}",
-                    threshold=FAIRNESS_EO_THRESHOLD,
-                    status=eo_status,
-                )
-            )
-            all_scores.append(1 - min(avg_odds, 1))
 
-        metrics_by_attribute[attr] = attr_metrics
+def _cache_params(request: FairnessRequest) -> Dict[str, Any]:
+    """Request parameters that determine an audit result (datasets are keyed by content)."""
+    params = request.model_dump(
+        exclude={"dataset_id", "dataset_id_post", "enable_llm", "ia_type", "model_type"}
+    )
+    params["favorable_outcome"] = str(request.favorable_outcome)
+    return params
 
-    overall_score = np.mean(all_scores) * 100 if all_scores else 100
 
-    if overall_score >= FAIRNESS_RISK_MEDIUM:
-        risk_level = "faible"
-    elif overall_score >= FAIRNESS_RISK_HIGH:
-        risk_level = "moyen"
-    else:
-        risk_level = "eleve"
+def _save_tables(audit_id, request: FairnessRequest, tables):
+    """Persist the count tables of an audit so it can be updated incrementally."""
+    try:
+        save_audit_stats(audit_id, request.model_dump(include=AUDIT_CONFIG_FIELDS), tables)
+    except Exception as e:
+        logger.warning(f"Could not save count tables for audit {audit_id}: {e}")
+
+
+def _build_response(main_results: Dict[str, Any], comparison_results=None, audit_id=None) -> FairnessResponse:
+    """FairnessResponse with recommendations derived from failed metrics."""
+    risk_level = main_results.get("risk_level", "eleve")
+    overall_score = main_results["overall_score"]
+
+    all_recommendations = []
+    if main_results["bias_detected"]:
+        for attr, metrics in main_results["metrics_by_attribute"].items():
+            for m in metrics:
+                if m.status == "fail":
+                    if "Parite" in m.name:
+                        all_recommendations.append(f"Reequilibrer les taux de selection pour l'attribut '{attr}'")
+                    if "Impact" in m.name:
+                        all_recommendations.append(f"Appliquer une correction d'impact disparate pour '{attr}'")
+
+    if not all_recommendations:
+        if risk_level == "faible":
+            all_recommendations = ["Continuer a surveiller les metriques de fairness regulierement"]
+        else:
+            all_recommendations = [
+                "Analyser les donnees d'entrainement pour detecter les desequilibres",
+                "Appliquer des contraintes de fairness lors de l'entrainement",
+            ]
 
-    return {
-        "overall_score": round(overall_score, 2),
-        "risk_level": risk_level,
-        "metrics_by_attribute": metrics_by_attribute,
-        "bias_detected": any(m.status == "fail" for attr in metrics_by_attribute.values() for m in attr),
-    }
+    return FairnessResponse(
+        audit_id=str(audit_id or uuid.uuid4()),
+        overall_score=overall_score,
+        risk_level="Low" if risk_level == "faible" else "Medium" if risk_level == "moyen" else "High",
+        bias_detected=main_results["bias_detected"],
+        metrics_by_attribute=main_results["metrics_by_attribute"],
+        recommendations=list(set(all_recommendations))[:5],
+        comparison_results=comparison_results,
+    )
 
 
 @router.post("/fairness/calculate", response_model=FairnessResponse)
 async def calculate_fairness(request: FairnessRequest):
     """Calculate fairness metrics for a dataset."""
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("fairness", _calculate_fairness, request)
+
+
+def _calculate_fairness(request: FairnessRequest):
     try:
         if request.dataset_id not in datasets_store:
             raise HTTPException(status_code=404, detail="Dataset original non trouve")
 
-        df_pre = datasets_store[request.dataset_id]["df"].copy()
-        results_pre = _calculate_metrics_for_df(
-            df_pre, request.target_column, request.sensitive_attributes, request.favorable_outcome
+        dataset_ids = [request.dataset_id]
+        if request.dataset_id_post and request.dataset_id_post in datasets_store:
+            dataset_ids.append(request.dataset_id_post)
+        cache_key = make_cache_key(
+            "fairness/calculate", [dataset_fingerprint(d) for d in dataset_ids], _cache_params(request)
         )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            result_cache.link(cache_key, dataset_ids)
+            # A repeated computation: its audit id is not stored, so it cannot be appended to
+            return cached[0].model_copy(update={"audit_id": str(uuid.uuid4())})
+
+        # A second model needs every feature column; otherwise only the audited columns are read
+        columns = None if request.model_id_post is not None else _audit_columns(request)
+        df_pre = dataset_view(request.dataset_id, columns)
+        tables_pre = _calculate_tables(df_pre, request, _predictions_for(request, df_pre, request.dataset_id))
+        results_pre = _results_from_tables(tables_pre, request)
+        audited = _audited_request(request, df_pre)
 
         results_post = None
+        post_id = None
         if request.dataset_id_post and request.dataset_id_post in datasets_store:
-            df_post = datasets_store[request.dataset_id_post]["df"].copy()
-            results_post = _calculate_metrics_for_df(
-                df_post, request.target_column, request.sensitive_attributes, request.favorable_outcome
-            )
+            post_id = request.dataset_id_post
+        elif request.model_id_post is not None:
+            # Same data, second model: e.g. a mitigated model against its raw version
+            post_id = request.dataset_id
+
+        if post_id is not None:
+            df_post = df_pre if post_id == request.dataset_id else dataset_view(post_id, columns)
+            # The reported (and stored) tables are those of the second dataset or model
+            if request.model_id_post is not None:
+                predictions_post = dataset_predictions(request.model_id_post, post_id, df_post)
+                audited = request.model_copy(update={"prediction_column": None, "model_id": request.model_id_post})
+            else:
+                predictions_post = _predictions_for(request, df_post, post_id)
+                audited = _audited_request(request, df_post)
+            tables_post = _calculate_tables(df_post, request, predictions_post)
+            results_post = _results_from_tables(tables_post, request)
 
         main_results = results_post if results_post else results_pre
+        main_tables = tables_post if results_post else tables_pre
 
         comparison_results = None
         if results_post:
@@ -203,37 +235,10 @@ async def calculate_fairness(request: FairnessRequest):
                 "improvement": round(results_post["overall_score"] - results_pre["overall_score"], 2),
             }
 
-        risk_level = main_results.get("risk_level", "eleve")
-        overall_score = main_results["overall_score"]
-
-        all_recommendations = []
-        if main_results["bias_detected"]:
-            for attr, metrics in main_results["metrics_by_attribute"].items():
-                for m in metrics:
-                    if m.status == "fail":
-                        if "Parite" in m.name:
-                            all_recommendations.append(f"Reequilibrer les taux de selection pour l'attribut '{attr}'")
-                        if "Impact" in m.name:
-                            all_recommendations.append(f"Appliquer une correction d'impact disparate pour '{attr}'")
-
-        if not all_recommendations:
-            if risk_level == "faible":
-                all_recommendations = ["Continuer a surveiller les metriques de fairness regulierement"]
-            else:
-                all_recommendations = [
-                    "Analyser les donnees d'entrainement pour detecter les desequilibres",
-                    "Appliquer des contraintes de fairness lors de l'entrainement",
-                ]
-
-        return FairnessResponse(
-            audit_id=str(uuid.uuid4()),
-            overall_score=overall_score,
-            risk_level="Low" if risk_level == "faible" else "Medium" if risk_level == "moyen" else "High",
-            bias_detected=main_results["bias_detected"],
-            metrics_by_attribute=main_results["metrics_by_attribute"],
-            recommendations=list(set(all_recommendations))[:5],
-            comparison_results=comparison_results,
-        )
+        response = _build_response(main_results, comparison_results)
+        _save_tables(response.audit_id, audited, main_tables)
+        result_cache.set(cache_key, (response, main_tables), dataset_ids=dataset_ids)
+        return response
 
     except HTTPException:
         raise
@@ -242,24 +247,316 @@ async def calculate_fairness(request: FairnessRequest):
         raise HTTPException(status_code=500, detail=f"Erreur de calcul de fairness: {str(e)}")
 
 
-@router.post("/fairness/calculate-enhanced")
-async def calculate_fairness_enhanced(request: FairnessRequest, background_tasks: BackgroundTasks):
-    """Enhanced fairness calculation with LLM insights (background processing)."""
-    logger.info(f"Enhanced fairness request for dataset {request.dataset_id}")
+@router.post("/fairness/calculate-stream", response_model=FairnessResponse)
+async def calculate_fairness_stream(request: StreamingFairnessRequest):
+    """Calculate fairness metrics by streaming the uploaded CSV file in chunks.
+
+    Only per-group counts are kept in memory, so files larger than RAM can be audited.
+    """
+    return await compute_executor.run("fairness", _calculate_fairness_stream, request)
+
+
+def _calculate_fairness_stream(request: StreamingFairnessRequest):
+    try:
+        path = find_dataset_file(request.dataset_id)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Fichier du dataset non trouve")
+        if not path.lower().endswith(".csv"):
+            raise HTTPException(status_code=400, detail="L'audit en streaming ne supporte que les fichiers CSV")
+
+        header = pd.read_csv(path, nrows=0).columns
+        if request.target_column not in header:
+            raise HTTPException(status_code=400, detail=f"Target '{request.target_column}' not found")
+        if request.prediction_column and request.prediction_column not in header:
+            raise HTTPException(status_code=400, detail=f"Prediction '{request.prediction_column}' not found")
+
+        attrs = [a for a in request.sensitive_attributes if a in header]
+        for attr in set(request.sensitive_attributes) - set(attrs):
+            logger.warning(f"Attribute {attr} not found in columns: {header.tolist()}")
+
+        usecols = list(dict.fromkeys(attrs + [request.target_column] + (
+            [request.prediction_column] if request.prediction_column else []
+        )))
+        # Read as strings so that group labels and outcomes stay stable across chunks
+        chunks = pd.read_csv(path, usecols=usecols, dtype=str, chunksize=request.chunk_size)
+        tables = text_labelled(stream_count_tables(
+            chunks, request.target_column, attrs, request.favorable_outcome,
+            prediction_column=request.prediction_column, **_intersection_options(request),
+        ))
+        logger.info(f"Streaming audit of {request.dataset_id}: {len(tables)} count tables")
+
+        response = _build_response(_results_from_tables(tables, request))
+        # Streamed audits never score with a model
+        _save_tables(response.audit_id, request.model_copy(update={"model_id": None}), tables)
+        return response
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Streaming fairness error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de calcul de fairness: {str(e)}")
+
+
+def _batch_spec_result(shared: SharedCountTables, spec: FairnessRequest, dataset_id, fingerprint: str):
+    """Audit one batch spec against the shared tables (and the /fairness/calculate cache)."""
+    cache_key = make_cache_key("fairness/calculate", [fingerprint], _cache_params(spec))
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        result_cache.link(cache_key, [dataset_id])
+        return cached[0].model_copy(update={"audit_id": str(uuid.uuid4())})
+
+    df = shared.df
+    if spec.target_column not in df.columns:
+        raise HTTPException(status_code=400, detail=f"Target '{spec.target_column}' not found")
+
+    prediction_key, pred_mask = None, None
+    if spec.prediction_column and spec.prediction_column in df.columns:
+        prediction_key = f"column:{spec.prediction_column}"
+        pred_mask = shared.encoded.mask(spec.prediction_column, spec.favorable_outcome)
+    elif spec.model_id is not None and str(spec.model_id) in models_store:
+        prediction_key = f"model:{spec.model_id}"
+        predictions = dataset_predictions(spec.model_id, dataset_id, df)
+        pred_mask = favorable_mask(predictions, spec.favorable_outcome)
+
+    tables = shared.build(
+        spec.target_column, spec.sensitive_attributes, spec.favorable_outcome,
+        prediction_key=prediction_key, pred_mask=pred_mask,
+        **_intersection_options(spec),
+    )
+    response = _build_response(_results_from_tables(tables, spec))
+    result_cache.set(cache_key, (response, tables), dataset_ids=[dataset_id])
+    return response
+
+
+def _batch_results(request: BatchFairnessRequest, df: pd.DataFrame):
+    """Yield one result entry per spec; a failing spec does not stop the batch."""
+    shared = SharedCountTables(df)
+    fingerprint = dataset_fingerprint(request.dataset_id)
+
+    for index, spec in enumerate(request.specs):
+        spec = spec.model_copy(update={"dataset_id": request.dataset_id})
+        try:
+            response = _batch_spec_result(shared, spec, request.dataset_id, fingerprint)
+            yield {"index": index, "status": "success", "result": response.model_dump(mode="json")}
+        except HTTPException as e:
+            yield {"index": index, "status": "error", "detail": e.detail}
+        except Exception as e:
+            logger.error(f"Batch audit spec {index} error: {str(e)}", exc_info=True)
+            yield {"index": index, "status": "error", "detail": f"Erreur de calcul de fairness: {str(e)}"}
+
+    logger.info(
+        f"Batch audit of {request.dataset_id}: {len(request.specs)} specs, "
+        f"{shared.hits} shared count tables reused"
+    )
+
+
+def _batch_frame(dataset_id) -> pd.DataFrame:
+    return load_dataset(dataset_id)[0]
+
+
+async def _stream_batch_results(request: BatchFairnessRequest, df: pd.DataFrame):
+    """NDJSON lines of a batch audit, each spec computed in the compute executor."""
+    with datasets_store.pinned(request.dataset_id):
+        results = _batch_results(request, df)
+        while (entry := await compute_executor.run("fairness", next, results, None)) is not None:
+            yield json.dumps(to_json_safe(entry)) + "\n"
+
+
+@router.post("/fairness/calculate-batch")
+async def calculate_fairness_batch(request: BatchFairnessRequest):
+    """Audit one dataset under many configurations in a single request.
+
+    The dataset is loaded and encoded once; group codes, outcome masks and count
+    tables are shared between specs. With `stream`, each result is sent as an
+    NDJSON line as soon as it is ready. Specs cannot compare two datasets or
+    models (dataset_id_post / model_id_post). Batch audits are not stored, so
+    rows cannot be appended to them.
+    """
+    try:
+        with datasets_store.pinned(request.dataset_id):
+            df = await compute_executor.run("fairness", _batch_frame, request.dataset_id)
+
+            if request.stream:
+                return StreamingResponse(_stream_batch_results(request, df), media_type="application/x-ndjson")
+
+            results = await compute_executor.run("fairness", list, _batch_results(request, df))
+        return to_json_safe({"dataset_id": request.dataset_id, "results": results})
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch fairness error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de calcul de fairness: {str(e)}")
+
 
+# Serializes the read-merge-write of stored audit tables
+_append_lock = threading.Lock()
+
+
+def _appended_predictions(audit_request: FairnessRequest, df_new, dataset_id=None):
+    """Predictions of appended rows, from the same source as the audit's stored counts."""
+    if audit_request.prediction_column:
+        if audit_request.prediction_column not in df_new.columns:
+            raise HTTPException(status_code=400, detail=f"Prediction '{audit_request.prediction_column}' not found")
+        return df_new[audit_request.prediction_column]
+    if audit_request.model_id is not None:
+        model_data = models_store.get(str(audit_request.model_id))
+        if model_data is None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Le modele {audit_request.model_id} de l'audit n'est plus disponible pour scorer les lignes",
+            )
+        if dataset_id is not None:
+            return dataset_predictions(audit_request.model_id, dataset_id, df_new)
+        return predict_labels(model_data, df_new)
+    return None
+
+
+@router.post("/fairness/audits/{audit_id}/append", response_model=FairnessResponse)
+async def append_to_audit(audit_id: str, request: FairnessAppendRequest):
+    """Update an audit with new rows only, by merging their counts into the stored tables.
+
+    The new rows get their predictions from the audit's source: the same
+    prediction column, or the same model (409 if it is no longer available).
+    """
+    if request.rows or request.dataset_id is None:
+        return await compute_executor.run("fairness", _append_to_audit, audit_id, request)
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("fairness", _append_to_audit, audit_id, request)
+
+
+def _append_to_audit(audit_id: str, request: FairnessAppendRequest):
+    try:
+        stored = load_audit_stats(audit_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Statistiques de l'audit non trouvees")
+        audit_request = FairnessRequest(**stored[0])
+
+        if request.rows:
+            df_new, new_id = pd.DataFrame(request.rows), None
+        else:
+            (df_new, _), new_id = load_dataset(request.dataset_id), request.dataset_id
+
+        if audit_request.target_column not in df_new.columns:
+            raise HTTPException(status_code=400, detail=f"Target '{audit_request.target_column}' not found")
+
+        predictions = _appended_predictions(audit_request, df_new, new_id)
+        new_tables = _calculate_tables(df_new, audit_request, predictions)
+
+        with _append_lock:
+            _, tables = load_audit_stats(audit_id)
+            # Text labels on both sides: a streamed audit's '25' and a JSON row's 25 are one group
+            tables = merge_count_tables(text_labelled(tables), text_labelled(new_tables))
+            _save_tables(audit_id, audit_request, tables)
+        logger.info(f"Appended {len(df_new)} rows to audit {audit_id}")
+
+        return _build_response(_results_from_tables(tables, audit_request), audit_id=audit_id)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Audit append error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de mise a jour de l'audit: {str(e)}")
+
+
+@router.post("/fairness/threshold-curves")
+async def calculate_threshold_curves(request: ThresholdCurveRequest):
+    """Selection rate, TPR, FPR and fairness gaps of every group across decision thresholds.
+
+    Each group's scores are sorted once and all thresholds are read from cumulative
+    counts, so a full sweep costs O(n log n) instead of one pass per threshold.
+    """
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("fairness", _calculate_threshold_curves, request)
+
+
+def _calculate_threshold_curves(request: ThresholdCurveRequest):
     try:
         df, _ = load_dataset(request.dataset_id)
+        for col in [request.target_column, request.sensitive_attribute]:
+            if col not in df.columns:
+                raise HTTPException(status_code=400, detail=f"Colonne '{col}' non trouvee")
+
+        if request.score_column:
+            if request.score_column not in df.columns:
+                raise HTTPException(status_code=400, detail=f"Colonne '{request.score_column}' non trouvee")
+            scores = pd.to_numeric(df[request.score_column], errors="coerce").to_numpy(dtype=float)
+        else:
+            scores = dataset_scores(request.model_id, request.dataset_id, df, request.favorable_outcome)
+
+        thresholds = sweep_thresholds(scores, request.resolution)
+        if len(thresholds) == 0:
+            raise HTTPException(status_code=400, detail="Aucun score valide")
+
+        labels, sizes, counts = threshold_count_tensor(
+            scores, df[request.sensitive_attribute],
+            favorable_mask(df[request.target_column], request.favorable_outcome), thresholds,
+        )
+        if len(labels) == 0:
+            raise HTTPException(status_code=400, detail="Aucun groupe valide")
+
+        ref = int(np.argmax(sizes))
+        rates = group_rates(counts)
+        gaps = metric_values(counts, ref)
+        fpr_gaps = rates["fpr"] - rates["fpr"][:, ref:ref + 1]
+
+        def curve(values):
+            return np.round(values, 4).tolist()
+
+        groups = {
+            str(label): {
+                "count": int(sizes[g]),
+                "selection_rate": curve(rates["positive_rate"][:, g]),
+                "tpr": curve(rates["tpr"][:, g]),
+                "fpr": curve(rates["fpr"][:, g]),
+                "spd": curve(gaps["spd"][:, g]),
+                "di": curve(gaps["di"][:, g]),
+                "tpr_gap": curve(gaps["eod"][:, g]),
+                "fpr_gap": curve(fpr_gaps[:, g]),
+            }
+            for g, label in enumerate(labels)
+        }
+        logger.info(
+            f"Threshold curves for {request.sensitive_attribute}: "
+            f"{len(thresholds)} thresholds, {len(labels)} groups"
+        )
 
-        if request.target_column not in df.columns:
-            raise HTTPException(status_code=400, detail=f"Target '{request.target_column}' not found")
+        return to_json_safe({
+            "sensitive_attribute": request.sensitive_attribute,
+            "thresholds": curve(thresholds),
+            "reference_group": str(labels[ref]),
+            "groups": groups,
+        })
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Threshold curve error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de calcul des courbes: {str(e)}")
+
+
+@router.post("/fairness/calculate-enhanced")
+async def calculate_fairness_enhanced(request: FairnessRequest):
+    """Enhanced fairness calculation with LLM insights (durable background job)."""
+    logger.info(f"Enhanced fairness request for dataset {request.dataset_id}")
+
+    try:
         audit_id = request.model_id
         if not audit_id:
             raise HTTPException(status_code=400, detail="audit_id (passed in model_id) is required")
 
-        background_tasks.add_task(_process_fairness_background, audit_id, request, df)
+        # Only the target column is read, off the event loop
+        target = await compute_executor.run(
+            "fairness", dataset_view, request.dataset_id, [request.target_column]
+        )
+        if request.target_column not in target.columns:
+            raise HTTPException(status_code=400, detail=f"Target '{request.target_column}' not found")
 
-        return {"status": "processing", "message": "Optimized analysis started in background."}
+        job_id = job_queue.enqueue(
+            ENHANCED_AUDIT_JOB, {"audit_id": audit_id, "request": request.model_dump(mode="json")}
+        )
+
+        return {"status": "processing", "message": "Optimized analysis started in background.", "job_id": job_id}
 
     except HTTPException:
         raise
@@ -276,6 +573,10 @@ async def calculate_data_bias(raw_request: Request):
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
+    return await compute_executor.run("bias_analysis", _calculate_data_bias, request_data)
+
+
+def _calculate_data_bias(request_data: Dict[str, Any]):
     try:
         dataset_id = request_data.get("dataset_id")
         target_column = request_data.get("target_column")
@@ -296,71 +597,46 @@ async def calculate_data_bias(raw_request: Request):
             attrs = []
         attrs = [str(a) for a in attrs]
 
+        cache_key = make_cache_key(
+            "fairness/bias-analysis",
+            [dataset_fingerprint(dataset_id)],
+            {"target_column": target_column, "sensitive_attributes": attrs, "favorable_outcome": str(favorable_outcome)},
+        )
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            result_cache.link(cache_key, [dataset_id])
+            return cached
+
         df, _ = load_dataset(dataset_id)
 
         results = {"demographics": {}, "success_rates": {}, "proxy_correlations": {}}
 
-        # 1. Demographics & Success Rates
+        # 1. Demographics & Success Rates (one grouped count per attribute)
+        success_mask = None
+        if target_column and target_column in df.columns:
+            success_mask = favorable_mask(df[target_column], favorable_outcome)
+
+        total = len(df)
         for attr in attrs:
             if attr not in df.columns:
                 continue
 
-            counts = df[attr].value_counts().to_dict()
-            total = len(df)
+            labels, sizes, successes = group_outcome_counts(df[attr], success_mask)
             results["demographics"][attr] = [
                 {"name": str(k), "value": int(v), "percentage": round(v / total * 100, 2)}
-                for k, v in counts.items()
+                for k, v in zip(labels, sizes)
             ]
 
-            if target_column and target_column in df.columns:
-                fav_val = str(favorable_outcome)
-                group_rates = []
-                for group in counts.keys():
-                    group_df = df[df[attr] == group]
-                    if len(group_df) > 0:
-                        successes = (group_df[target_column].astype(str) == fav_val).sum()
-                        rate = successes / len(group_df)
-                        group_rates.append(
-                            {"group": str(group), "rate": round(float(rate), 4), "count": int(len(group_df))}
-                        )
-                results["success_rates"][attr] = group_rates
+            if success_mask is not None:
+                results["success_rates"][attr] = [
+                    {"group": str(k), "rate": round(float(s / v), 4), "count": int(v)}
+                    for k, v, s in zip(labels, sizes, successes)
+                ]
 
         # 2. Proxy Correlation Analysis
-        numeric_df = df.select_dtypes(include=[np.number])
-        if not numeric_df.empty:
-            for attr in attrs:
-                if attr not in df.columns:
-                    continue
-
-                target_series = df[attr]
-                if target_series.dtype == "object" or target_series.nunique() < 20:
-                    le = LabelEncoder()
-                    target_encoded = le.fit_transform(target_series.astype(str))
-                else:
-                    target_encoded = target_series
-
-                corrs = []
-                for col in numeric_df.columns:
-                    if col == attr or col == target_column:
-                        continue
-
-                    col_data = numeric_df[col].fillna(numeric_df[col].median())
-                    if col_data.std() == 0:
-                        continue
-
-                    correlation = np.corrcoef(target_encoded, col_data)[0, 1]
-                    if abs(correlation) > 0.1:
-                        corrs.append(
-                            {
-                                "feature": col,
-                                "correlation": round(float(correlation), 4),
-                                "abs_correlation": abs(float(correlation)),
-                            }
-                        )
-
-                corrs.sort(key=lambda x: x["abs_correlation"], reverse=True)
-                results["proxy_correlations"][attr] = corrs[:10]
+        results["proxy_correlations"] = detect_proxies(df, attrs, exclude=[target_column] if target_column else [])
 
+        result_cache.set(cache_key, results, dataset_ids=[dataset_id])
         return results
 
     except HTTPException:
@@ -370,14 +646,26 @@ async def calculate_data_bias(raw_request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def _process_fairness_background(audit_id: str, request: FairnessRequest, df: pd.DataFrame):
-    """Background task for enhanced fairness analysis with LLM."""
-    logger.info(f"[Background] Starting analysis for Audit {audit_id}")
+def _process_fairness_background(payload: Dict[str, Any], job: JobContext):
+    """Job handler for enhanced fairness analysis with LLM.
+
+    Runs in a job worker: the dataset is reloaded from disk and progress is
+    reported to the job queue. The audit record is only marked failed once
+    the last retry has failed.
+    """
+    audit_id = payload["audit_id"]
+    request = FairnessRequest(**payload["request"])
+    logger.info(f"[Background] Starting analysis for Audit {audit_id} (attempt {job.attempt})")
 
     try:
-        metrics_result = _calculate_metrics_for_df(
-            df, request.target_column, request.sensitive_attributes, request.favorable_outcome
-        )
+        job.progress(0.05, "Chargement du dataset")
+        df, _ = load_dataset(request.dataset_id, columns=_audit_columns(request))
+
+        job.progress(0.1, "Calcul des métriques")
+        tables = _calculate_tables(df, request, _predictions_for(request, df, request.dataset_id))
+        # model_id carries the audit id here: it is only saved as a source if it names a stored model
+        _save_tables(audit_id, _audited_request(request, df), tables)
+        metrics_result = _results_from_tables(tables, request)
 
         serialized_metrics = {}
         for attr, metrics in metrics_result["metrics_by_attribute"].items():
@@ -386,6 +674,7 @@ async def _process_fairness_background(audit_id: str, request: FairnessRequest,
         logger.info(f"[Background] Generated metrics for {len(serialized_metrics)} attributes")
 
         if request.enable_llm and llm_analyzer:
+            job.progress(0.4, "Génération des insights IA")
             context = {
                 "ia_type": request.ia_type,
                 "model_type": request.model_type,
@@ -402,9 +691,10 @@ async def _process_fairness_background(audit_id: str, request: FairnessRequest,
                 context,
             )
 
-            interpretations, recommendations, executive_summary = await asyncio.gather(
-                task_interpretations, task_recommendations, task_summary
-            )
+            async def gather_insights():
+                return await asyncio.gather(task_interpretations, task_recommendations, task_summary)
+
+            interpretations, recommendations, executive_summary = asyncio.run(gather_insights())
 
             metrics_result["llm_insights"] = {
                 "interpretations": interpretations,
@@ -413,7 +703,9 @@ async def _process_fairness_background(audit_id: str, request: FairnessRequest,
             }
             metrics_result["recommendations"] = recommendations
 
-        # Update Supabase
+        job.progress(0.9, "Enregistrement des résultats")
+
+        # Persist the audit (kept in the outbox if the backend is unreachable)
         critical_bias_count = sum(
             1 for metrics in serialized_metrics.values() for m in metrics if m.get("status") == "fail"
         )
@@ -436,14 +728,25 @@ async def _process_fairness_background(audit_id: str, request: FairnessRequest,
         if "llm_insights" in metrics_result:
             update_payload["llm_insights"] = metrics_result["llm_insights"]
 
-        supabase.table("audits").update(update_payload).eq("id", audit_id).execute()
+        persistence.update_sync("audits", audit_id, update_payload)
         logger.info(f"[Background] Audit {audit_id} completed successfully")
+        return {"audit_id": audit_id, "overall_score": update_payload["overall_score"]}
 
+    except JobCancelled:
+        _mark_audit_failed(audit_id, "Analyse annulée")
+        raise
     except Exception as e:
         logger.error(f"[Background] Error processing audit {audit_id}: {e}", exc_info=True)
-        try:
-            supabase.table("audits").update(
-                {"status": "failed", "error_message": str(e)}
-            ).eq("id", audit_id).execute()
-        except Exception as update_err:
-            logger.error(f"[Background] Could not update failed status for {audit_id}: {update_err}")
+        if job.final_attempt:
+            _mark_audit_failed(audit_id, str(e))
+        raise
+
+
+def _mark_audit_failed(audit_id: str, message: str):
+    try:
+        persistence.update_sync("audits", audit_id, {"status": "failed", "error_message": message})
+    except Exception as update_err:
+        logger.error(f"[Background] Could not update failed status for {audit_id}: {update_err}")
+
+
+register_handler(ENHANCED_AUDIT_JOB, _process_fairness_background)
@@ -0,0 +1,44 @@
+"""
+Background job status, progress and cancellation endpoints.
+"""
+
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+
+from job_queue import job_queue, JOB_STATUSES
+
+router = APIRouter(prefix="/api", tags=["Jobs"])
+
+
+def _public(job):
+    job = dict(job)
+    job.pop("payload", None)
+    return job
+
+
+@router.get("/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = Query(50, ge=1, le=500)):
+    """Most recent jobs, optionally filtered by status."""
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Statut inconnu: {status}")
+    return {"jobs": [_public(j) for j in job_queue.list(status, limit)], "counts": job_queue.counts()}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress and result of a job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job non trouvé")
+    return _public(job)
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued job, or ask a running one to stop at its next progress step."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job non trouvé")
+    if job["status"] in ("completed", "failed", "cancelled"):
+        raise HTTPException(status_code=409, detail=f"Job déjà terminé ({job['status']})")
+    return _public(job_queue.cancel(job_id))
@@ -6,36 +6,52 @@ import time
 import uuid
 import numpy as np
 import pandas as pd
+from typing import List
 
 from fastapi import APIRouter, HTTPException
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 
-from config import logger, ML_RANDOM_STATE, ML_DEFAULT_TEST_SIZE, ML_MAX_ESTIMATORS
-from schemas import TrainRequest, TrainResponse
-from utils import datasets_store, models_store
-
-try:
-    import xgboost as xgb
-    XGBOOST_AVAILABLE = True
-except ImportError:
-    XGBOOST_AVAILABLE = False
+from config import logger, ML_RANDOM_STATE
+from schemas import (
+    TrainRequest, TrainResponse, ThresholdMitigationRequest, PreprocessingMitigationRequest, BatchPredictRequest,
+)
+from utils import to_json_safe, datasets_store, models_store, load_dataset, dataset_view
+from compute import compute_executor
+from scoring import get_model, model_classes, dataset_predictions, dataset_scores
+from fairness_engine import favorable_mask
+from fairness_mitigation import fit_group_thresholds, evaluate_preprocessing_candidates, DEFAULT_THRESHOLD
+from training import XGBOOST_AVAILABLE, encode_training_frame, build_classifier, feature_importance_of
 
 router = APIRouter(prefix="/api", tags=["ML Training"])
 
 
+def _feature_columns(request, df: pd.DataFrame) -> List[str]:
+    """Requested feature columns present in the dataset, or every non-target column."""
+    if request.feature_columns:
+        return [
+            c for c in request.feature_columns
+            if c in df.columns and c != request.target_column
+        ]
+    return [c for c in df.columns if c != request.target_column]
+
+
 @router.post("/ml/train", response_model=TrainResponse)
 async def train_model(request: TrainRequest):
     """Train a classification model on the uploaded dataset."""
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("train_model", _train_model, request)
+
+
+def _train_model(request: TrainRequest):
     start_time = time.time()
 
     try:
         if request.dataset_id not in datasets_store:
             raise HTTPException(status_code=404, detail="Dataset non trouve")
 
-        df = datasets_store[request.dataset_id]["df"].copy()
+        df = dataset_view(request.dataset_id)
 
         if request.target_column not in df.columns:
             raise HTTPException(
@@ -43,38 +59,9 @@ async def train_model(request: TrainRequest):
                 detail=f"Colonne cible '{request.target_column}' non trouvee",
             )
 
-        # Prepare features
-        if request.feature_columns:
-            feature_cols = [
-                c for c in request.feature_columns
-                if c in df.columns and c != request.target_column
-            ]
-        else:
-            feature_cols = [c for c in df.columns if c != request.target_column]
-
-        df = df.dropna(subset=[request.target_column])
-
-        # Encode categorical features
-        label_encoders = {}
-        for col in feature_cols:
-            if df[col].dtype == "object":
-                le = LabelEncoder()
-                df[col] = df[col].fillna("Unknown")
-                df[col] = le.fit_transform(df[col].astype(str))
-                label_encoders[col] = le
-            else:
-                df[col] = df[col].fillna(df[col].median())
-
-        # Encode target if categorical
-        y = df[request.target_column]
-        if y.dtype == "object":
-            le = LabelEncoder()
-            y = le.fit_transform(y.astype(str))
-            label_encoders["target"] = le
-        else:
-            y = y.values
-
-        X = df[feature_cols].values
+        feature_cols = _feature_columns(request, df)
+
+        X, y, label_encoders, fill_values, _ = encode_training_frame(df, request.target_column, feature_cols)
 
         scaler = StandardScaler()
         X = scaler.fit_transform(X)
@@ -84,27 +71,9 @@ async def train_model(request: TrainRequest):
         )
 
         # Train model
-        feature_importance = None
-
-        if request.algorithm == "xgboost" and XGBOOST_AVAILABLE:
-            model = xgb.XGBClassifier(
-                n_estimators=ML_MAX_ESTIMATORS,
-                max_depth=5,
-                learning_rate=0.1,
-                random_state=ML_RANDOM_STATE,
-                use_label_encoder=False,
-                eval_metric="logloss",
-            )
-            model.fit(X_train, y_train)
-            feature_importance = dict(zip(feature_cols, model.feature_importances_.tolist()))
-        else:
-            model = LogisticRegression(max_iter=1000, random_state=ML_RANDOM_STATE)
-            model.fit(X_train, y_train)
-            if hasattr(model, "coef_"):
-                importance = (
-                    np.abs(model.coef_[0]) if len(model.coef_.shape) > 1 else np.abs(model.coef_)
-                )
-                feature_importance = dict(zip(feature_cols, importance.tolist()))
+        model = build_classifier(request.algorithm)
+        model.fit(X_train, y_train)
+        feature_importance = feature_importance_of(model, feature_cols)
 
         # Predictions
         y_pred = model.predict(X_test)
@@ -128,6 +97,7 @@ async def train_model(request: TrainRequest):
             "model": model,
             "scaler": scaler,
             "label_encoders": label_encoders,
+            "fill_values": fill_values,
             "feature_columns": feature_cols,
             "target_column": request.target_column,
             "algorithm": request.algorithm,
@@ -153,3 +123,196 @@ async def train_model(request: TrainRequest):
     except Exception as e:
         logger.error(f"Training error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Erreur d'entrainement: {str(e)}")
+
+
+@router.post("/ml/mitigate/thresholds")
+async def mitigate_with_thresholds(request: ThresholdMitigationRequest):
+    """Post-process a trained model with per-group decision thresholds.
+
+    The mitigated model is stored as a new model wrapping the original one, so it
+    can be used anywhere a model_id is accepted without retraining.
+    """
+    return await compute_executor.run("mitigation", _mitigate_with_thresholds, request)
+
+
+def _mitigate_with_thresholds(request: ThresholdMitigationRequest):
+    try:
+        base = get_model(request.model_id)
+        if "group_thresholds" in base:
+            raise HTTPException(status_code=400, detail="Le modele est deja mitige")
+        if len(model_classes(base)) != 2:
+            raise HTTPException(status_code=400, detail="La mitigation par seuils requiert une cible binaire")
+
+        dataset_id = request.dataset_id or base["dataset_id"]
+        df, _ = load_dataset(dataset_id)
+        for col in [base["target_column"], request.sensitive_attribute]:
+            if col not in df.columns:
+                raise HTTPException(status_code=400, detail=f"Colonne '{col}' non trouvee")
+
+        scores = dataset_scores(request.model_id, dataset_id, df, request.favorable_outcome)
+        labelled = df[base["target_column"]].notna().to_numpy()
+        df, scores = df[labelled], scores[labelled]
+        try:
+            fit = fit_group_thresholds(
+                scores,
+                df[request.sensitive_attribute],
+                favorable_mask(df[base["target_column"]], request.favorable_outcome),
+                constraint=request.constraint,
+                tolerance=request.tolerance,
+                resolution=request.resolution,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        model_id = str(uuid.uuid4())
+        models_store[model_id] = {
+            **base,
+            "algorithm": f"{base['algorithm']}+group_thresholds",
+            "metrics": {**base["metrics"], "accuracy": fit["accuracy"]},
+            "dataset_id": dataset_id,
+            "base_model_id": request.model_id,
+            "group_thresholds": {
+                "sensitive_attribute": request.sensitive_attribute,
+                "favorable_outcome": request.favorable_outcome,
+                "constraint": request.constraint,
+                "thresholds": fit["thresholds"],
+                "default_threshold": DEFAULT_THRESHOLD,
+            },
+        }
+        logger.info(
+            f"Model {model_id} mitigated from {request.model_id} ({request.constraint}): "
+            f"violation {fit['baseline']['violation']:.3f} -> {fit['violation']:.3f}"
+        )
+
+        return to_json_safe({
+            "model_id": model_id,
+            "base_model_id": request.model_id,
+            "constraint": request.constraint,
+            "thresholds": fit["thresholds"],
+            "feasible": fit["feasible"],
+            "mitigated": {"accuracy": fit["accuracy"], "violation": fit["violation"]},
+            "baseline": fit["baseline"],
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Threshold mitigation error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de mitigation: {str(e)}")
+
+
+@router.post("/ml/mitigate/preprocessing")
+async def mitigate_with_preprocessing(request: PreprocessingMitigationRequest):
+    """Train one model per pre-processing strategy and return the fairness/accuracy frontier.
+
+    Features are encoded and split once; each candidate (baseline, reweighing,
+    group-aware over/undersampling) is trained in a process pool and stored as a
+    regular model so it can be audited or used for predictions.
+    """
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("mitigation", _mitigate_with_preprocessing, request)
+
+
+def _mitigate_with_preprocessing(request: PreprocessingMitigationRequest):
+    start_time = time.time()
+
+    try:
+        if request.dataset_id not in datasets_store:
+            raise HTTPException(status_code=404, detail="Dataset non trouve")
+
+        original = dataset_view(request.dataset_id)
+        for col in [request.target_column, request.sensitive_attribute]:
+            if col not in original.columns:
+                raise HTTPException(status_code=400, detail=f"Colonne '{col}' non trouvee")
+
+        feature_cols = _feature_columns(request, original)
+        X, y, label_encoders, fill_values, df = encode_training_frame(
+            original, request.target_column, feature_cols
+        )
+        groups = original.loc[df.index, request.sensitive_attribute].to_numpy()
+
+        favorable = favorable_mask(df[request.target_column], request.favorable_outcome)
+        if not favorable.any():
+            raise HTTPException(
+                status_code=400, detail=f"Issue favorable '{request.favorable_outcome}' absente de la cible"
+            )
+        favorable_code = y[favorable][0]
+
+        scaler = StandardScaler()
+        X = scaler.fit_transform(X)
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y)), test_size=request.test_size, random_state=ML_RANDOM_STATE
+        )
+
+        candidates = evaluate_preprocessing_candidates(
+            request.algorithm,
+            X[train_idx], y[train_idx], groups[train_idx],
+            X[test_idx], y[test_idx], groups[test_idx],
+            favorable_code,
+            strategies=request.strategies,
+        )
+
+        frontier = []
+        for candidate in candidates:
+            model_id = str(uuid.uuid4())
+            models_store[model_id] = {
+                "model": candidate.pop("model"),
+                "scaler": scaler,
+                "label_encoders": label_encoders,
+                "fill_values": fill_values,
+                "feature_columns": feature_cols,
+                "target_column": request.target_column,
+                "algorithm": request.algorithm,
+                "metrics": {"accuracy": candidate["accuracy"]},
+                "dataset_id": request.dataset_id,
+                "mitigation": candidate["strategy"],
+            }
+            frontier.append({"model_id": model_id, **candidate})
+
+        logger.info(
+            f"Pre-processing mitigation on {request.dataset_id}: {len(frontier)} candidates "
+            f"in {time.time() - start_time:.2f}s"
+        )
+        return to_json_safe({
+            "sensitive_attribute": request.sensitive_attribute,
+            "candidates": frontier,
+            "training_time": time.time() - start_time,
+        })
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Pre-processing mitigation error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de mitigation: {str(e)}")
+
+
+@router.post("/ml/predict")
+async def predict_batch(request: BatchPredictRequest):
+    """Predictions of a stored (raw or mitigated) model for every row of a dataset."""
+    with datasets_store.pinned(request.dataset_id):
+        return await compute_executor.run("scoring", _predict_batch, request)
+
+
+def _predict_batch(request: BatchPredictRequest):
+    try:
+        get_model(request.model_id)
+        df, _ = load_dataset(request.dataset_id)
+
+        predictions = dataset_predictions(request.model_id, request.dataset_id, df)
+        result = {
+            "model_id": request.model_id,
+            "dataset_id": request.dataset_id,
+            "rows": len(predictions),
+            "predictions": predictions.tolist(),
+        }
+        if request.include_scores:
+            scores = dataset_scores(request.model_id, request.dataset_id, df, request.favorable_outcome)
+            result["scores"] = np.round(scores, 6).tolist()
+
+        return to_json_safe(result)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Erreur de prediction: {str(e)}")
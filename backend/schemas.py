@@ -41,11 +41,51 @@ class TrainResponse(BaseModel):
     training_time: float
 
 
+class ThresholdMitigationRequest(BaseModel):
+    model_id: str
+    sensitive_attribute: str
+    # Dataset used to fit the thresholds (defaults to the model's training dataset)
+    dataset_id: Optional[str] = None
+    favorable_outcome: Any = 1
+    constraint: str = Field(default="demographic_parity", pattern="^(demographic_parity|equalized_odds)$")
+    tolerance: float = Field(default=0.05, ge=0, le=1)
+    resolution: int = Field(default=101, ge=2, le=2000)
+
+
+class PreprocessingMitigationRequest(BaseModel):
+    dataset_id: str
+    target_column: str
+    sensitive_attribute: str
+    favorable_outcome: Any = 1
+    algorithm: str = Field(default="logistic_regression", pattern="^(logistic_regression|xgboost|random_forest)$")
+    test_size: float = Field(default=0.2, ge=0.05, le=0.5)
+    feature_columns: Optional[List[str]] = None
+    strategies: List[str] = Field(default=["baseline", "reweighing", "oversample", "undersample"], min_length=1)
+
+    @model_validator(mode="after")
+    def validate_strategies(self):
+        unknown = set(self.strategies) - {"baseline", "reweighing", "oversample", "undersample"}
+        if unknown:
+            raise ValueError(f"Unknown strategies: {sorted(unknown)}")
+        if self.feature_columns is not None:
+            self.feature_columns = [c for c in self.feature_columns if c != self.target_column]
+        return self
+
+
+class BatchPredictRequest(BaseModel):
+    model_id: str
+    dataset_id: str
+    include_scores: bool = False
+    favorable_outcome: Any = 1
+
+
 # --- Fairness ---
 class FairnessRequest(BaseModel):
     dataset_id: Any
     dataset_id_post: Optional[Any] = None
     model_id: Optional[Any] = None
+    # Second model audited on the same data (e.g. a mitigated version of model_id)
+    model_id_post: Optional[Any] = None
     target_column: str
     prediction_column: Optional[str] = None
     sensitive_attributes: List[str] = Field(min_length=1)
@@ -54,6 +94,67 @@ class FairnessRequest(BaseModel):
     model_type: Optional[str] = None
     ia_type: Optional[str] = None
     enable_llm: bool = True
+    # Intersectional audit: also evaluate combinations of sensitive attributes ("gender|region")
+    intersectional: bool = False
+    max_intersection_size: Optional[int] = Field(default=None, ge=2)
+    min_group_support: int = Field(default=30, ge=1)
+    small_group_strategy: str = Field(default="pool", pattern="^(pool|skip)$")
+    # Bootstrap confidence intervals and significance tests
+    confidence_intervals: bool = False
+    n_bootstrap: int = Field(default=1000, ge=100, le=20000)
+    confidence_level: float = Field(default=0.95, gt=0.5, lt=1)
+    multiple_testing: str = Field(default="holm", pattern="^(none|bonferroni|holm|fdr_bh)$")
+
+
+class StreamingFairnessRequest(FairnessRequest):
+    chunk_size: int = Field(default=200_000, ge=1_000, le=5_000_000)
+
+
+class FairnessAuditSpec(FairnessRequest):
+    """One configuration of a batch audit (the dataset comes from the batch request)."""
+    dataset_id: Optional[Any] = None
+
+    @model_validator(mode="after")
+    def validate_single_audit(self):
+        # Before/after comparisons need a second dataset or model: use /fairness/calculate
+        if self.dataset_id_post is not None or self.model_id_post is not None:
+            raise ValueError("dataset_id_post and model_id_post are not supported in batch audits")
+        return self
+
+
+class BatchFairnessRequest(BaseModel):
+    dataset_id: Any
+    specs: List[FairnessAuditSpec] = Field(min_length=1, max_length=200)
+    # Return results as NDJSON lines as soon as each spec is computed
+    stream: bool = False
+
+
+class FairnessAppendRequest(BaseModel):
+    """New rows for an existing audit, inline or as an uploaded dataset."""
+    rows: Optional[List[Dict[str, Any]]] = None
+    dataset_id: Optional[Any] = None
+
+    @model_validator(mode="after")
+    def validate_source(self):
+        if not self.rows and self.dataset_id is None:
+            raise ValueError("rows or dataset_id is required")
+        return self
+
+
+class ThresholdCurveRequest(BaseModel):
+    dataset_id: Any
+    target_column: str
+    sensitive_attribute: str
+    favorable_outcome: Any = 1
+    model_id: Optional[Any] = None
+    score_column: Optional[str] = None
+    resolution: int = Field(default=101, ge=2, le=5000)
+
+    @model_validator(mode="after")
+    def validate_score_source(self):
+        if self.model_id is None and not self.score_column:
+            raise ValueError("model_id or score_column is required")
+        return self
 
 
 class FairnessMetric(BaseModel):
@@ -62,6 +163,9 @@ class FairnessMetric(BaseModel):
     description: str
     threshold: float
     status: str = Field(pattern="^(pass|warning|fail)$")
+    ci_low: Optional[float] = None
+    ci_high: Optional[float] = None
+    p_value: Optional[float] = None
 
 
 class FairnessResponse(BaseModel):
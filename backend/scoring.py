@@ -0,0 +1,170 @@
+"""
+Batch scoring of datasets with trained models from models_store.
+Features are encoded with the stored label encoders and scaler, chunks are scored
+across a thread pool and prediction vectors are cached per (model, dataset version).
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+from config import logger, SCORING_CHUNK_SIZE, SCORING_WORKERS
+from result_cache import prediction_cache, make_cache_key
+from utils import models_store, dataset_fingerprint
+from fairness_engine import group_label
+
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=SCORING_WORKERS, thread_name_prefix="scoring")
+    return _thread_pool
+
+
+def get_model(model_id) -> Dict[str, Any]:
+    """Stored model entry, or 404."""
+    model_data = models_store.get(str(model_id))
+    if model_data is None:
+        raise HTTPException(status_code=404, detail="Modele non trouve")
+    return model_data
+
+
+def prepare_features(df: pd.DataFrame, model_data: Dict[str, Any]) -> np.ndarray:
+    """Encode a dataframe the way the model's training data was encoded."""
+    label_encoders = model_data.get("label_encoders", {})
+    fill_values = model_data.get("fill_values", {})
+
+    missing = [c for c in model_data["feature_columns"] if c not in df.columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Colonnes manquantes pour le modele: {missing}")
+
+    columns = []
+    for col in model_data["feature_columns"]:
+        if col in label_encoders:
+            classes = label_encoders[col].classes_
+            mapping = {cls: i for i, cls in enumerate(classes)}
+            # Unseen categories fall back to "Unknown" when it was seen in training
+            unseen = mapping.get("Unknown", -1)
+            values = df[col].astype(object).fillna("Unknown").astype(str)
+            columns.append(values.map(mapping).fillna(unseen).to_numpy(dtype=float))
+        else:
+            values = pd.to_numeric(df[col], errors="coerce")
+            # Training median; this frame's is only computed for models saved without one
+            fill = fill_values[col] if col in fill_values else values.median()
+            columns.append(values.fillna(fill).to_numpy(dtype=float))
+
+    X = np.column_stack(columns) if columns else np.empty((len(df), 0))
+    return model_data["scaler"].transform(X)
+
+
+def _predict_chunk(model_data: Dict[str, Any], chunk: pd.DataFrame, proba: bool) -> np.ndarray:
+    X = prepare_features(chunk, model_data)
+    model = model_data["model"]
+    return model.predict_proba(X) if proba else model.predict(X)
+
+
+def _score_in_chunks(model_data: Dict[str, Any], df: pd.DataFrame, proba: bool) -> np.ndarray:
+    """Score a dataframe chunk by chunk across the scoring thread pool."""
+    if len(df) <= SCORING_CHUNK_SIZE:
+        return _predict_chunk(model_data, df, proba)
+
+    chunks = [df.iloc[i:i + SCORING_CHUNK_SIZE] for i in range(0, len(df), SCORING_CHUNK_SIZE)]
+    pool = _get_thread_pool()
+    parts = pool.map(lambda chunk: _predict_chunk(model_data, chunk, proba), chunks)
+    return np.concatenate(list(parts), axis=0)
+
+
+def model_classes(model_data: Dict[str, Any]) -> list:
+    """Classes of a model, decoded back to the original target values."""
+    classes = list(model_data["model"].classes_)
+    target_encoder = model_data.get("label_encoders", {}).get("target")
+    if target_encoder is not None:
+        classes = list(target_encoder.inverse_transform(np.asarray(classes, dtype=int)))
+    return classes
+
+
+def _apply_group_thresholds(model_data: Dict[str, Any], df: pd.DataFrame) -> np.ndarray:
+    """Labels of a threshold-mitigated model: each group has its own decision threshold."""
+    mitigation = model_data["group_thresholds"]
+    attr = mitigation["sensitive_attribute"]
+    if attr not in df.columns:
+        raise HTTPException(status_code=400, detail=f"Colonnes manquantes pour le modele: {[attr]}")
+
+    scores = predict_scores(model_data, df, mitigation["favorable_outcome"])
+    # Same group labels as the fit: 25, 25.0 and "25" share a threshold
+    groups = df[attr].astype(object).map(group_label, na_action="ignore")
+    thresholds = groups.map(mitigation["thresholds"]).fillna(mitigation["default_threshold"]).to_numpy(dtype=float)
+    classes = model_classes(model_data)
+    favorable = favorable_class_index(model_data, mitigation["favorable_outcome"])
+    return np.where(scores >= thresholds, classes[favorable], classes[1 - favorable])
+
+
+def predict_labels(model_data: Dict[str, Any], df: pd.DataFrame) -> np.ndarray:
+    """Predicted labels, decoded back to the original target values."""
+    if "group_thresholds" in model_data:
+        return _apply_group_thresholds(model_data, df)
+
+    predictions = _score_in_chunks(model_data, df, proba=False)
+    target_encoder = model_data.get("label_encoders", {}).get("target")
+    if target_encoder is not None:
+        predictions = target_encoder.inverse_transform(predictions.astype(int))
+    return predictions
+
+
+def favorable_class_index(model_data: Dict[str, Any], favorable_outcome) -> int:
+    """Column of predict_proba holding the favorable outcome."""
+    classes = model_classes(model_data)
+    for i, cls in enumerate(classes):
+        if str(cls) == str(favorable_outcome):
+            return i
+    raise HTTPException(
+        status_code=400,
+        detail=f"Issue favorable '{favorable_outcome}' inconnue du modele (classes: {[str(c) for c in classes]})",
+    )
+
+
+def predict_scores(model_data: Dict[str, Any], df: pd.DataFrame, favorable_outcome) -> np.ndarray:
+    """Probability of the favorable outcome for every row."""
+    if not hasattr(model_data["model"], "predict_proba"):
+        raise HTTPException(status_code=400, detail="Le modele ne fournit pas de probabilites")
+    column = favorable_class_index(model_data, favorable_outcome)
+    return _score_in_chunks(model_data, df, proba=True)[:, column]
+
+
+def dataset_scores(model_id, dataset_id, df: pd.DataFrame, favorable_outcome) -> np.ndarray:
+    """Favorable-outcome probabilities of a model over a dataset, cached per dataset version."""
+    model_data = get_model(model_id)
+    key = make_cache_key(
+        "scores", [dataset_fingerprint(dataset_id)],
+        {"model_id": str(model_id), "favorable_outcome": str(favorable_outcome)},
+    )
+
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        prediction_cache.link(key, [dataset_id])
+        return cached
+
+    scores = predict_scores(model_data, df, favorable_outcome)
+    prediction_cache.set(key, scores, dataset_ids=[dataset_id])
+    return scores
+
+
+def dataset_predictions(model_id, dataset_id, df: pd.DataFrame) -> np.ndarray:
+    """Predictions of a model over a dataset, cached per (model, dataset version)."""
+    model_data = get_model(model_id)
+    key = make_cache_key("predictions", [dataset_fingerprint(dataset_id)], {"model_id": str(model_id)})
+
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        prediction_cache.link(key, [dataset_id])
+        return cached
+
+    predictions = predict_labels(model_data, df)
+    prediction_cache.set(key, predictions, dataset_ids=[dataset_id])
+    logger.info(f"Scored dataset {dataset_id} with model {model_id} ({len(predictions)} rows)")
+    return predictions
@@ -0,0 +1,77 @@
+"""
+Model training building blocks shared by /ml/train and the mitigation endpoints.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import LabelEncoder
+
+from config import ML_RANDOM_STATE, ML_MAX_ESTIMATORS
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+
+def encode_training_frame(
+    df: pd.DataFrame, target_column: str, feature_cols: List[str]
+) -> Tuple[np.ndarray, np.ndarray, Dict[str, LabelEncoder], Dict[str, Any], pd.DataFrame]:
+    """Encode features and target for training.
+
+    Returns (X, y, label_encoders, fill_values, df) where `df` is the frame with
+    unlabelled rows dropped, aligned with X and y.
+    """
+    # Only the columns used are materialized; writes below replace whole columns
+    df = df[list(dict.fromkeys([target_column, *feature_cols]))].dropna(subset=[target_column])
+
+    # Encode categorical features
+    label_encoders = {}
+    fill_values = {}
+    for col in feature_cols:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            le = LabelEncoder()
+            df[col] = le.fit_transform(df[col].astype(object).fillna("Unknown").astype(str))
+            label_encoders[col] = le
+        else:
+            fill_values[col] = df[col].median()
+            df[col] = df[col].fillna(fill_values[col])
+
+    # Encode target if categorical
+    y = df[target_column]
+    if not pd.api.types.is_numeric_dtype(y):
+        le = LabelEncoder()
+        y = le.fit_transform(y.astype(str))
+        label_encoders["target"] = le
+    else:
+        y = y.values
+
+    return df[feature_cols].values, y, label_encoders, fill_values, df
+
+
+def build_classifier(algorithm: str):
+    """Unfitted classifier for an algorithm name (logistic regression when unavailable)."""
+    if algorithm == "xgboost" and XGBOOST_AVAILABLE:
+        return xgb.XGBClassifier(
+            n_estimators=ML_MAX_ESTIMATORS,
+            max_depth=5,
+            learning_rate=0.1,
+            random_state=ML_RANDOM_STATE,
+            use_label_encoder=False,
+            eval_metric="logloss",
+        )
+    return LogisticRegression(max_iter=1000, random_state=ML_RANDOM_STATE)
+
+
+def feature_importance_of(model, feature_cols: List[str]) -> Optional[Dict[str, float]]:
+    """Feature importances (or absolute coefficients) of a fitted classifier."""
+    if hasattr(model, "feature_importances_"):
+        return dict(zip(feature_cols, model.feature_importances_.tolist()))
+    if hasattr(model, "coef_"):
+        importance = np.abs(model.coef_[0]) if len(model.coef_.shape) > 1 else np.abs(model.coef_)
+        return dict(zip(feature_cols, importance.tolist()))
+    return None
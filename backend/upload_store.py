@@ -0,0 +1,156 @@
+"""
+Content-addressed storage of uploaded files.
+Each distinct upload is stored once, named after its SHA-256, in
+UPLOAD_BLOB_DIR. The dataset files in UPLOAD_DIR ({dataset_id}.csv...) are
+hard links to their blob: they cost no space, readers keep opening the
+dataset's own path, and a blob's link count says how many datasets use it.
+Blobs left with a single link are no longer referenced and are collected.
+
+The parsing options an upload was made with (column type overrides, sheet)
+are recorded next to it in {dataset_id}.options, so the file can be parsed
+again the same way once its columnar copy is gone. Uploads parsed by a
+background job also record the job's id there.
+"""
+
+import os
+import json
+import hashlib
+import shutil
+from typing import Any, Dict, List, Optional
+
+from config import logger, UPLOAD_DIR, UPLOAD_BLOB_DIR, UPLOAD_CHUNK_BYTES, ALLOWED_FILE_EXTENSIONS
+
+
+def blob_path(digest: str, ext: str) -> str:
+    return os.path.join(UPLOAD_BLOB_DIR, f"{digest}{ext.lower()}")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_BYTES):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _link(source: str, path: str) -> None:
+    """Atomically make `path` a hard link to `source` (a copy where links are not supported)."""
+    tmp_path = f"{path}.link-{os.getpid()}"
+    try:
+        os.link(source, tmp_path)
+    except OSError as e:
+        logger.warning(f"Hard link to {source} failed, copying it instead: {e}")
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def store_upload(partial: str, digest: str, path: str) -> bool:
+    """Move a fully received upload to `path`, sharing the blob of identical earlier uploads.
+
+    Returns True when the content was already stored (`partial` is then left
+    to the caller to delete).
+    """
+    blob = blob_path(digest, os.path.splitext(path)[1])
+    os.makedirs(UPLOAD_BLOB_DIR, exist_ok=True)
+    try:
+        os.link(partial, blob)
+    except FileExistsError:
+        _link(blob, path)
+        return True
+    except OSError as e:
+        logger.warning(f"Upload kept outside the blob store ({e})")
+    os.replace(partial, path)
+    return False
+
+
+def options_path(dataset_id: str) -> str:
+    return os.path.join(UPLOAD_DIR, f"{dataset_id}.options")
+
+
+def save_ingest_options(dataset_id: str, options: Dict[str, Any]) -> None:
+    """Record the parsing options of an upload (replacing those of the file it replaced)."""
+    path = options_path(dataset_id)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(options, f)
+    os.replace(tmp_path, path)
+
+
+def _upload_record(dataset_id: str) -> Dict[str, Any]:
+    try:
+        with open(options_path(dataset_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_ingest_options(dataset_id: str) -> Dict[str, Any]:
+    """Parsing options recorded with an upload (the defaults for files stored before they were)."""
+    options = _upload_record(dataset_id)
+    return {"column_types": options.get("column_types") or {}, "sheet": options.get("sheet")}
+
+
+def ingest_job(dataset_id: str) -> Optional[str]:
+    """Id of the background job parsing an upload, or None if it was parsed on upload."""
+    return _upload_record(dataset_id).get("job_id")
+
+
+def remove_ingest_options(dataset_id: str) -> None:
+    try:
+        os.remove(options_path(dataset_id))
+    except FileNotFoundError:
+        pass
+
+
+def aliases(path: str) -> List[str]:
+    """Ids of the datasets whose file is the same stored blob as `path` (itself included)."""
+    stat = os.stat(path)
+    return sorted(
+        os.path.splitext(entry.name)[0]
+        for entry in os.scandir(UPLOAD_DIR)
+        if os.path.splitext(entry.name)[1].lower() in ALLOWED_FILE_EXTENSIONS
+        and entry.is_file() and os.path.samestat(entry.stat(), stat)
+    )
+
+
+def collect_garbage() -> int:
+    """Delete the blobs no dataset file links to any more. Returns how many were removed."""
+    removed = 0
+    try:
+        entries = list(os.scandir(UPLOAD_BLOB_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if os.path.splitext(entry.name)[1].lower() not in ALLOWED_FILE_EXTENSIONS:
+            continue
+        try:
+            if entry.stat().st_nlink <= 1:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    if removed:
+        logger.info(f"Upload store: removed {removed} unreferenced blob(s)")
+    return removed
+
+
+def adopt_uploads() -> int:
+    """Move dataset files stored before the blob store into it, merging identical ones."""
+    adopted = 0
+    os.makedirs(UPLOAD_BLOB_DIR, exist_ok=True)
+    for entry in sorted(os.scandir(UPLOAD_DIR), key=lambda e: e.name):
+        ext = os.path.splitext(entry.name)[1].lower()
+        if ext not in ALLOWED_FILE_EXTENSIONS or not entry.is_file() or entry.stat().st_nlink > 1:
+            continue
+        blob = blob_path(file_digest(entry.path), ext)
+        try:
+            os.link(entry.path, blob)
+        except FileExistsError:
+            _link(blob, entry.path)
+        except OSError as e:
+            logger.warning(f"Upload store: cannot adopt {entry.name}: {e}")
+            continue
+        adopted += 1
+    if adopted:
+        logger.info(f"Upload store: adopted {adopted} existing upload(s)")
+    return adopted
@@ -4,19 +4,35 @@ Shared utilities: JSON safety, in-memory stores, dataset loading.
 
 import os
 import glob
+import pickle
+import hashlib
+import joblib
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from fastapi import HTTPException
-from config import logger, UPLOAD_DIR
+from config import (
+    logger, UPLOAD_DIR, ALLOWED_FILE_EXTENSIONS, COMPACT_DTYPES,
+    DATASET_STORE_BUDGET_MB, MODEL_STORE_BUDGET_MB, MODEL_STORE_DIR,
+)
+from result_cache import result_cache, prediction_cache
+from dataset_cache import (
+    PYARROW_AVAILABLE, has_columnar, save_columnar, load_columnar, columnar_metadata, columnar_version,
+    remove_columnar,
+)
+from bounded_store import BoundedStore
+from compaction import compact_dtypes
+from ingestion import ingest_file
+from upload_store import collect_garbage, load_ingest_options, ingest_job, remove_ingest_options
+from job_queue import job_queue
+
+# Copy-on-write: dataset views share memory with the stored frames and only the
+# columns a handler modifies get copied, so the store is never written through
+pd.set_option("mode.copy_on_write", True)
 
 # Ensure upload directory exists
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-# In-memory stores
-models_store: dict = {}
-datasets_store: dict = {}
-
 
 def to_json_safe(obj):
     """Recursively convert NaN/Inf/-Inf to None for JSON compliance."""
@@ -42,58 +58,277 @@ def to_json_safe(obj):
     return obj
 
 
-def load_dataset(dataset_id):
-    """Load dataset from memory or disk. Returns (df, filename)."""
+def find_dataset_file(dataset_id):
+    """Path of the uploaded file backing a dataset, or None."""
     sid = str(dataset_id)
-
-    # 1. Check memory
-    if sid in datasets_store:
-        return datasets_store[sid]["df"].copy(), datasets_store[sid]["filename"]
-
-    # 2. Try reload from disk (CSV)
     possible_file = os.path.join(UPLOAD_DIR, f"{sid}.csv")
     if os.path.exists(possible_file):
+        return possible_file
+    files = [
+        f for f in glob.glob(os.path.join(UPLOAD_DIR, f"{sid}.*"))
+        if os.path.splitext(f)[1].lower() in ALLOWED_FILE_EXTENSIONS
+    ]
+    return files[0] if files else None
+
+
+def _dataset_entry(df, filename, metadata=None):
+    """Store entry of a dataframe (metadata restored from the columnar cache)."""
+    return {
+        "filename": filename,
+        "name": filename,
+        "uploaded_at": datetime.now().isoformat(),
+        **(metadata or {}),
+        "df": df,
+        "rows": len(df),
+        "columns": len(df.columns),
+    }
+
+
+def compact_dataset(df):
+    """Dtype-compacted frame and its schema record (unchanged when COMPACT_DTYPES is off)."""
+    if not COMPACT_DTYPES:
+        return df, None
+    return compact_dtypes(df)
+
+
+def _entry_metadata(entry):
+    if "fingerprint" not in entry:
+        entry["fingerprint"] = _frame_fingerprint(entry["df"])
+    return to_json_safe({k: v for k, v in entry.items() if k not in ("df", "columnar_version")})
+
+
+def _save_entry_columnar(sid, entry) -> bool:
+    """Write an entry to the shared columnar cache and remember which version it matches."""
+    saved = save_columnar(sid, entry["df"], _entry_metadata(entry))
+    entry["columnar_version"] = columnar_version(sid) if saved else None
+    return saved
+
+
+def _restore_dataset(sid):
+    """Store entry of a dataset read back from disk: columnar cache first, else the uploaded file.
+
+    Raises a 409 while the background job parsing the upload is still pending.
+    """
+    source = find_dataset_file(sid)
+
+    # Columnar cache (memory-mapped, schema preserved)
+    if has_columnar(sid, source):
+        try:
+            version = columnar_version(sid)
+            metadata = columnar_metadata(sid)
+            df = _resident_frame(version)
+            df = load_columnar(sid) if df is None else df
+            entry = _dataset_entry(df, metadata.get("filename", f"reloaded_{sid}"), metadata)
+            entry["columnar_version"] = version
+            logger.info(f"Restored dataset {sid} from columnar cache")
+            return entry
+        except Exception as e:
+            logger.warning(f"Failed to read columnar cache of {sid}: {str(e)}")
+
+    # Workbooks are parsed by a background job: never in the API while it runs
+    job_id = ingest_job(sid) if source is not None else None
+    if job_id is not None:
+        job = job_queue.get(job_id)
+        status = job["status"] if job else "failed"
+        if status in ("queued", "running"):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Import du dataset {sid} en cours (job {job_id}) - suivre /api/jobs/{job_id}",
+            )
+        if status != "completed":
+            logger.warning(f"Dataset {sid}: ingestion job {job_id} {status}, not parsing the upload")
+            return None
+
+    # Parse the uploaded file with its upload options, then cache it in columnar form for the next loads
+    if source is not None:
         try:
-            df = pd.read_csv(possible_file)
-            filename = f"reloaded_{sid}.csv"
-            datasets_store[sid] = {
-                "df": df,
-                "filename": filename,
-                "name": filename,
-                "uploaded_at": datetime.now().isoformat(),
-                "rows": len(df),
-                "columns": len(df.columns),
-            }
+            options = load_ingest_options(sid)
+            df, ingestion = ingest_file(source, options["column_types"], sheet=options["sheet"])
+            filename = f"reloaded_{sid}.csv" if source.endswith(".csv") else os.path.basename(source)
+            df, schema = compact_dataset(df)
+            entry = _dataset_entry(df, filename, {"schema": schema, "ingestion": ingestion, "ingest_options": options})
             logger.info(f"Restored dataset {sid} from disk")
-            return df.copy(), filename
+            if PYARROW_AVAILABLE:
+                _save_entry_columnar(sid, entry)
+            return entry
         except Exception as e:
             logger.warning(f"Failed to restore {sid} from disk: {str(e)}")
+    return None
 
-    # 3. Search for any matching file
-    files = glob.glob(os.path.join(UPLOAD_DIR, f"{sid}.*"))
-    if files:
-        target = files[0]
-        try:
-            if target.endswith(".csv"):
-                df = pd.read_csv(target)
-            else:
-                df = pd.read_excel(target)
-            filename = os.path.basename(target)
-            datasets_store[sid] = {
-                "df": df,
-                "filename": filename,
-                "name": filename,
-                "uploaded_at": datetime.now().isoformat(),
-                "rows": len(df),
-                "columns": len(df.columns),
-            }
-            return df.copy(), filename
-        except Exception:
-            pass
-
-    # 4. Not found
-    logger.error(f"Dataset {sid} not found. Known IDs: {list(datasets_store.keys())}")
-    raise HTTPException(
-        status_code=404,
-        detail=f"Dataset {sid} non trouve - Veuillez re-uploader le fichier.",
+
+def _resident_frame(version):
+    """Frame of a resident dataset read from the same columnar file (an upload of identical content)."""
+    if version is None:
+        return None
+    for _, entry in datasets_store.resident_items():
+        if entry.get("columnar_version") == version:
+            return entry["df"]
+    return None
+
+
+def _spill_dataset(sid, entry) -> bool:
+    """Make sure an evicted dataset can be restored (the columnar copy, else the untouched upload)."""
+    source = find_dataset_file(sid)
+    if has_columnar(sid, source):
+        return True
+    if PYARROW_AVAILABLE and save_columnar(sid, entry["df"], _entry_metadata(entry)):
+        return True
+    return source is not None and "modified_at" not in entry
+
+
+def _dataset_on_disk(sid) -> bool:
+    return has_columnar(sid) or find_dataset_file(sid) is not None
+
+
+def _dataset_current(sid, entry) -> bool:
+    """False once another worker has rewritten (or removed) the columnar copy this entry was read from."""
+    version = entry.get("columnar_version")
+    return version is None or version == columnar_version(sid)
+
+
+def _model_path(model_id) -> str:
+    return os.path.join(MODEL_STORE_DIR, f"{model_id}.joblib")
+
+
+def _spill_model(model_id, entry) -> bool:
+    path = _model_path(model_id)
+    if not os.path.exists(path):
+        os.makedirs(MODEL_STORE_DIR, exist_ok=True)
+        joblib.dump(entry, path)
+    return True
+
+
+def _restore_model(model_id):
+    path = _model_path(model_id)
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+def create_dataset_store() -> BoundedStore:
+    return BoundedStore(
+        "datasets", DATASET_STORE_BUDGET_MB * 1024 * 1024,
+        sizer=lambda entry: entry["df"].memory_usage(deep=True).sum(),
+        spill=_spill_dataset, restore=_restore_dataset, exists=_dataset_on_disk, validate=_dataset_current,
     )
+
+
+def create_model_store() -> BoundedStore:
+    return BoundedStore(
+        "models", MODEL_STORE_BUDGET_MB * 1024 * 1024,
+        sizer=lambda entry: len(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)),
+        spill=_spill_model, restore=_restore_model, exists=lambda model_id: os.path.exists(_model_path(model_id)),
+    )
+
+
+# In-memory stores, bounded: least recently used entries are evicted to disk.
+# Datasets are shared between worker processes through the columnar cache.
+models_store = create_model_store()
+datasets_store = create_dataset_store()
+
+
+def load_dataset(dataset_id, columns=None):
+    """Load dataset from memory or disk. Returns (df, filename).
+
+    The frame is a copy-on-write view of the stored one (see dataset_view). With
+    `columns`, only those columns are returned; a dataset that is not resident
+    is then read column-projected from the columnar cache without being loaded
+    whole.
+    """
+    sid = str(dataset_id)
+
+    if columns is not None and not datasets_store.is_resident(sid) and has_columnar(sid, find_dataset_file(sid)):
+        try:
+            filename = columnar_metadata(sid).get("filename", f"reloaded_{sid}")
+            return load_columnar(sid, columns), filename
+        except Exception as e:
+            logger.warning(f"Failed to read columnar cache of {sid}: {str(e)}")
+
+    entry = datasets_store.get(sid)
+    if entry is None:
+        logger.error(f"Dataset {sid} not found. Known IDs: {list(datasets_store.keys())}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"Dataset {sid} non trouve - Veuillez re-uploader le fichier.",
+        )
+
+    df = entry["df"]
+    if columns is not None:
+        return df[[c for c in columns if c in df.columns]], entry["filename"]
+    return df.copy(deep=False), entry["filename"]
+
+
+def dataset_view(dataset_id, columns=None) -> pd.DataFrame:
+    """Column-projected view of a dataset that shares memory with the store.
+
+    Nothing is copied up front; a handler that modifies the view gets private
+    copies of the columns it touches, and the stored frame never changes.
+    """
+    return load_dataset(dataset_id, columns)[0]
+
+
+def _frame_fingerprint(df) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def dataset_fingerprint(dataset_id) -> str:
+    """Content hash of a dataset, computed once per dataset version."""
+    sid = str(dataset_id)
+    if not datasets_store.is_resident(sid):
+        if has_columnar(sid, find_dataset_file(sid)):
+            fingerprint = columnar_metadata(sid).get("fingerprint")
+            if fingerprint:
+                return fingerprint
+        load_dataset(sid)
+
+    entry = datasets_store[sid]
+    if "fingerprint" not in entry:
+        entry["fingerprint"] = _frame_fingerprint(entry["df"])
+    return entry["fingerprint"]
+
+
+def save_dataset_columnar(dataset_id) -> bool:
+    """Write a stored dataset and its metadata to the columnar cache."""
+    if not PYARROW_AVAILABLE:
+        return False
+    return _save_entry_columnar(str(dataset_id), datasets_store[str(dataset_id)])
+
+
+def update_dataset_df(dataset_id, df):
+    """Replace a dataset's dataframe and invalidate everything derived from the old one."""
+    sid = str(dataset_id)
+    entry = datasets_store[sid]
+    entry["df"] = df
+    entry["rows"] = len(df)
+    entry["columns"] = len(df.columns)
+    entry["modified_at"] = datetime.now().isoformat()
+    entry.pop("fingerprint", None)
+    datasets_store.resize(sid)
+    invalidate_dataset_caches(sid)
+    save_dataset_columnar(sid)
+
+
+def delete_dataset(dataset_id) -> bool:
+    """Remove a dataset everywhere: memory, columnar cache and upload file (its blob once unused).
+
+    Returns False if there was nothing to delete.
+    """
+    sid = str(dataset_id)
+    found = datasets_store.discard(sid)
+    found = has_columnar(sid) or found
+    remove_columnar(sid)
+    for path in glob.glob(os.path.join(UPLOAD_DIR, f"{sid}.*")):
+        if os.path.splitext(path)[1].lower() in ALLOWED_FILE_EXTENSIONS:
+            os.remove(path)
+            found = True
+    remove_ingest_options(sid)
+    invalidate_dataset_caches(sid)
+    collect_garbage()
+    return found
+
+
+def invalidate_dataset_caches(dataset_id):
+    """Drop cached results and predictions computed from a dataset."""
+    result_cache.invalidate_dataset(dataset_id)
+    prediction_cache.invalidate_dataset(dataset_id)
@@ -0,0 +1,61 @@
+"""
+Shared test setup: every test gets its own storage directories.
+"""
+
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+
+import pytest
+
+# Storage paths are read from the environment when the backend is imported:
+# point them at a scratch directory before any test module imports it.
+_SCRATCH = tempfile.mkdtemp(prefix="auditiq-tests-")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ["UPLOAD_DIR"] = _SCRATCH
+for _var, _name in (
+    ("DATASET_CACHE_DIR", "columnar"),
+    ("UPLOAD_BLOB_DIR", "blobs"),
+    ("MODEL_STORE_DIR", "models"),
+    ("FAIRNESS_STATS_DIR", "audit_stats"),
+    ("JOBS_DB_PATH", "jobs.sqlite3"),
+    ("PERSISTENCE_SQLITE_PATH", "records.sqlite3"),
+    ("PERSISTENCE_OUTBOX_PATH", "outbox.sqlite3"),
+):
+    os.environ[_var] = os.path.join(_SCRATCH, _name)
+
+# Module-level copies of the storage settings, patched for each test
+_STORAGE_ATTRIBUTES = {
+    "utils": {"UPLOAD_DIR": "", "MODEL_STORE_DIR": "models"},
+    "routers.datasets": {"UPLOAD_DIR": ""},
+    "upload_store": {"UPLOAD_DIR": "", "UPLOAD_BLOB_DIR": "blobs"},
+    "dataset_cache": {"DATASET_CACHE_DIR": "columnar"},
+    "audit_store": {"FAIRNESS_STATS_DIR": "audit_stats"},
+}
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path_factory, monkeypatch):
+    """Uploads, caches, audit statistics, jobs and records of a test go to a fresh temporary directory."""
+    storage = tmp_path_factory.mktemp("storage")
+    (storage / "audit_stats").mkdir()
+    for module_name, attributes in _STORAGE_ATTRIBUTES.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        for attribute, sub in attributes.items():
+            monkeypatch.setattr(module, attribute, str(storage / sub) if sub else str(storage))
+
+    job_queue = sys.modules.get("job_queue")
+    if job_queue is not None:
+        monkeypatch.setattr(job_queue.job_queue, "path", job_queue.JobQueue(str(storage / "jobs.sqlite3")).path)
+
+    persistence = sys.modules.get("persistence")
+    if persistence is not None:
+        store = persistence.persistence
+        monkeypatch.setattr(store, "outbox", persistence.Outbox(str(storage / "outbox.sqlite3")))
+        if isinstance(store.backend, persistence.SQLiteBackend):
+            monkeypatch.setattr(store, "backend", persistence.SQLiteBackend(str(storage / "records.sqlite3")))
+    return storage
@@ -3,6 +3,7 @@ Backend API tests for AuditIQ.
 Tests critical endpoints: health, upload, fairness, ML training.
 """
 
+import glob
 import os
 import sys
 import pytest
@@ -45,6 +46,12 @@ class TestHealthCheck:
         data = client.get("/health").json()
         assert "services" in data
 
+    def test_health_reports_compute_queues(self, client):
+        data = client.get("/health").json()
+        assert {"thread_workers", "process_workers", "endpoints"} <= set(data["compute"])
+        assert {"workers", "queued", "running"} <= set(data["jobs"])
+        assert {"backend", "buffered", "outbox"} <= set(data["persistence"])
+
 
 class TestDatasetUpload:
     def test_upload_csv(self, client, sample_csv):
@@ -80,6 +87,229 @@ class TestDatasetUpload:
         assert "profiling" in data
         assert "missing_values" in data["profiling"]
 
+    def test_upload_streamed_in_chunks(self, client, sample_csv, monkeypatch):
+        import routers.datasets as datasets_router
+        import starlette.formparsers
+        monkeypatch.setattr(datasets_router, "UPLOAD_CHUNK_BYTES", 16)
+        # Written to disk once: no spooled copy of the body
+        monkeypatch.setattr(starlette.formparsers, "SpooledTemporaryFile", lambda **kw: pytest.fail("body spooled"))
+        with open(sample_csv, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"dataset_name": "chunked"},
+            )
+        assert response.status_code == 200
+        assert response.json()["rows"] == 10
+        assert response.json()["filename"] == "test.csv"
+        assert not glob.glob(os.path.join(datasets_router.UPLOAD_DIR, "*.part"))
+
+    def test_upload_without_file(self, client):
+        response = client.post("/api/datasets/upload", files={"dataset_name": (None, "no file")})
+        assert response.status_code == 422
+
+    def test_upload_too_large_rejected_while_streaming(self, client, sample_csv, monkeypatch):
+        import routers.datasets as datasets_router
+        monkeypatch.setattr(datasets_router, "UPLOAD_CHUNK_BYTES", 16)
+        monkeypatch.setattr(datasets_router, "MAX_UPLOAD_SIZE_BYTES", 64)
+        with open(sample_csv, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"dataset_id": "too-large"},
+            )
+        assert response.status_code == 413
+        assert not [f for f in os.listdir(datasets_router.UPLOAD_DIR) if f.startswith("too-large")]
+
+    def test_upload_body_over_limit_refused_before_parsing(self, client, sample_csv, monkeypatch):
+        import middleware
+        import routers.datasets as datasets_router
+        monkeypatch.setattr(middleware, "MAX_UPLOAD_SIZE_BYTES", 64)
+        monkeypatch.setattr(middleware, "UPLOAD_FORM_OVERHEAD_BYTES", 0)
+        monkeypatch.setattr(datasets_router, "_receive_upload", lambda *a: pytest.fail("body was read"))
+
+        with open(sample_csv, "rb") as f:
+            declared = client.post("/api/datasets/upload", files={"file": ("test.csv", f, "text/csv")})
+        assert declared.status_code == 413
+        monkeypatch.undo()
+        monkeypatch.setattr(middleware, "MAX_UPLOAD_SIZE_BYTES", 64)
+        monkeypatch.setattr(middleware, "UPLOAD_FORM_OVERHEAD_BYTES", 0)
+        monkeypatch.setattr(datasets_router, "store_upload", lambda *a: pytest.fail("upload was stored"))
+
+        # No Content-Length (chunked body): counted as it arrives
+        body = (
+            b'--xyz\r\nContent-Disposition: form-data; name="file"; filename="test.csv"\r\n'
+            b"Content-Type: text/csv\r\n\r\n" + sample_csv.read_bytes() + b"\r\n--xyz--\r\n"
+        )
+        chunked = client.post(
+            "/api/datasets/upload",
+            content=iter([body[i:i + 32] for i in range(0, len(body), 32)]),
+            headers={"content-type": "multipart/form-data; boundary=xyz"},
+        )
+        assert chunked.status_code == 413
+        assert not glob.glob(os.path.join(datasets_router.UPLOAD_DIR, "*.part"))
+
+    def test_upload_column_type_overrides(self, client, sample_csv):
+        with open(sample_csv, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"dataset_id": "no-row-fits", "column_types": '{"gender": "int"}'},
+            )
+        assert response.status_code == 400
+        assert "gender" in response.json()["detail"]
+        assert client.get("/api/datasets/no-row-fits").status_code == 404
+
+        with open(sample_csv, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"column_types": '{"gender": "decimal"}'},
+            )
+        assert response.status_code == 400
+
+    def test_restore_from_upload_keeps_column_types(self, client, sample_csv):
+        from utils import datasets_store
+        from dataset_cache import remove_columnar
+        with open(sample_csv, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"dataset_id": "typed", "column_types": '{"age": "string"}'},
+            )
+        assert response.status_code == 200
+
+        # Columnar copy lost: the dataset is parsed again from the upload, with its overrides
+        datasets_store.discard("typed")
+        remove_columnar("typed")
+        dataset = client.get("/api/datasets/typed").json()
+        assert dataset["rows"] == 10 and dataset["preview"][0]["age"] == "25"
+
+    def test_upload_json_kept_as_json(self, client, tmp_path):
+        import routers.datasets as datasets_router
+        path = tmp_path / "data.json"
+        path.write_text('[{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]')
+        with open(path, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("data.json", f, "application/json")},
+                data={"dataset_id": "json-upload"},
+            )
+        assert response.status_code == 200 and response.json()["rows"] == 2
+        assert os.path.exists(os.path.join(datasets_router.UPLOAD_DIR, "json-upload.json"))
+
+    def test_duplicate_upload_reuses_parse(self, client, sample_csv):
+        pytest.importorskip("pyarrow")
+        from utils import datasets_store
+        with open(sample_csv, "a") as f:
+            f.write("65,F,52000,1\n")  # content no other test uploads
+        responses = []
+        for dataset_id in ("dup-a", "dup-b"):
+            with open(sample_csv, "rb") as f:
+                responses.append(client.post(
+                    "/api/datasets/upload",
+                    files={"file": ("test.csv", f, "text/csv")},
+                    data={"dataset_id": dataset_id, "dataset_name": dataset_id},
+                ).json())
+        first, second = responses
+        assert "duplicate_of" not in first and second["duplicate_of"] == "dup-a"
+        assert second["sha256"] == first["sha256"]
+        assert second["profiling"] == first["profiling"] and second["rows"] == 11
+        assert client.get("/api/datasets/dup-b").json()["name"] == "dup-b"
+        assert datasets_store["dup-b"]["df"] is datasets_store["dup-a"]["df"]
+
+        # Other parsing options: parsed again
+        with open(sample_csv, "rb") as f:
+            third = client.post(
+                "/api/datasets/upload",
+                files={"file": ("test.csv", f, "text/csv")},
+                data={"dataset_id": "dup-c", "column_types": '{"age": "float"}'},
+            ).json()
+        assert "duplicate_of" not in third
+
+    def test_reupload_existing_id_with_content_of_another_id(self, client, tmp_path):
+        pytest.importorskip("pyarrow")
+        content_a, content_b = tmp_path / "a.csv", tmp_path / "b.csv"
+        content_a.write_text("x,y\n1,a\n2,b\n")
+        content_b.write_text("x,y\n3,c\n4,d\n5,e\n")
+
+        def upload(path, dataset_id):
+            with open(path, "rb") as f:
+                return client.post("/api/datasets/upload", files={"file": ("data.csv", f, "text/csv")},
+                                   data={"dataset_id": dataset_id}).json()
+
+        upload(content_b, "b-holder")
+        upload(content_a, "a-x")
+        assert client.get("/api/datasets/a-x").json()["rows"] == 2
+
+        reused = upload(content_b, "a-x")
+        assert reused["duplicate_of"] == "b-holder" and reused["rows"] == 3
+        dataset = client.get("/api/datasets/a-x").json()
+        assert dataset["rows"] == 3 and [row["x"] for row in dataset["preview"]] == [3, 4, 5]
+
+    def test_delete_dataset(self, client, sample_csv):
+        import routers.datasets as datasets_router
+        blob_dir = os.path.join(datasets_router.UPLOAD_DIR, "blobs")
+        with open(sample_csv, "a") as f:
+            f.write("70,M,61000,0\n")
+        for dataset_id in ("del-a", "del-b"):
+            with open(sample_csv, "rb") as f:
+                client.post("/api/datasets/upload", files={"file": ("test.csv", f, "text/csv")},
+                            data={"dataset_id": dataset_id, "column_types": '{"income": "float"}'})
+        blob_count = len(os.listdir(blob_dir))
+
+        assert client.delete("/api/datasets/del-a").status_code == 200
+        assert client.get("/api/datasets/del-a").status_code == 404
+        assert client.get("/api/datasets/del-b").json()["rows"] == 11
+        assert len(os.listdir(blob_dir)) == blob_count
+
+        assert client.delete("/api/datasets/del-b").status_code == 200
+        assert len(os.listdir(blob_dir)) == blob_count - 1
+        assert client.delete("/api/datasets/del-b").status_code == 404
+
+    def test_excel_upload_ingested_in_background(self, client, sample_csv, tmp_path):
+        pytest.importorskip("openpyxl")
+        import pandas as pd
+        from job_queue import job_queue, JobWorker
+        path = tmp_path / "data.xlsx"
+        with pd.ExcelWriter(path) as writer:
+            pd.DataFrame({"note": ["readme"]}).to_excel(writer, sheet_name="Notes", index=False)
+            pd.read_csv(sample_csv).to_excel(writer, sheet_name="Data", index=False)
+
+        with open(path, "rb") as f:
+            response = client.post(
+                "/api/datasets/upload",
+                files={"file": ("data.xlsx", f)},
+                data={"dataset_id": "excel-upload", "sheet": "Data"},
+            )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "processing" and data["sheet"] == "Data"
+
+        # Not parsed by the API while the job is pending
+        pending = client.get("/api/datasets/excel-upload")
+        assert pending.status_code == 409 and data["job_id"] in pending.json()["detail"]
+
+        worker = JobWorker(job_queue, kinds=["dataset_ingest"])
+        while worker.run_once():
+            pass
+        job = client.get(f"/api/jobs/{data['job_id']}").json()
+        assert job["status"] == "completed" and job["result"]["rows"] == 10
+
+        dataset = client.get("/api/datasets/excel-upload").json()
+        assert dataset["rows"] == 10 and dataset["columns"] == 4
+        assert client.get("/api/datasets/excel-upload/sheets").json()["sheets"] == ["Notes", "Data"]
+
+    def test_excel_upload_unknown_sheet(self, client, sample_csv, tmp_path):
+        pytest.importorskip("openpyxl")
+        import pandas as pd
+        path = tmp_path / "data.xlsx"
+        pd.read_csv(sample_csv).to_excel(path, index=False)
+        with open(path, "rb") as f:
+            response = client.post("/api/datasets/upload", files={"file": ("data.xlsx", f)}, data={"sheet": "Nope"})
+        assert response.status_code == 400
+        assert client.get("/api/datasets/unknown/sheets").status_code == 404
+
 
 class TestFairness:
     def _upload_and_get_id(self, client, sample_csv):
@@ -104,6 +334,203 @@ class TestFairness:
         assert "risk_level" in data
         assert "metrics_by_attribute" in data
 
+    def test_fairness_intersectional(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        response = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender", "age"],
+            "favorable_outcome": 1,
+            "intersectional": True,
+            "min_group_support": 1,
+        })
+        assert response.status_code == 200
+        assert "gender|age" in response.json()["metrics_by_attribute"]
+
+    def test_fairness_confidence_intervals(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        response = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "confidence_intervals": True,
+            "n_bootstrap": 200,
+        })
+        assert response.status_code == 200
+        metric = response.json()["metrics_by_attribute"]["gender"][0]
+        assert metric["ci_low"] <= metric["value"] <= metric["ci_high"]
+        assert metric["p_value"] is not None
+
+    def test_fairness_stream_matches_in_memory(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        payload = {
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "favorable_outcome": 1,
+        }
+        in_memory = client.post("/api/fairness/calculate", json=payload).json()
+        streamed = client.post("/api/fairness/calculate-stream", json={**payload, "chunk_size": 1000})
+        assert streamed.status_code == 200
+        assert streamed.json()["metrics_by_attribute"] == in_memory["metrics_by_attribute"]
+        assert streamed.json()["overall_score"] == in_memory["overall_score"]
+
+    def test_fairness_append_rows(self, client, sample_csv):
+        from result_cache import result_cache
+
+        result_cache.clear()
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        spec = {
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "favorable_outcome": 1,
+        }
+        audit = client.post("/api/fairness/calculate", json=spec).json()
+
+        # Served from the result cache: not stored, so not an audit rows can be appended to
+        repeated = client.post("/api/fairness/calculate", json=spec).json()
+        response = client.post(f"/api/fairness/audits/{repeated['audit_id']}/append", json={"rows": [{"a": 1}]})
+        assert response.status_code == 404
+
+        new_rows = [{"gender": "F", "approved": 0}] * 5 + [{"gender": "M", "approved": 1}] * 5
+        response = client.post(
+            f"/api/fairness/audits/{audit['audit_id']}/append", json={"rows": new_rows}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["audit_id"] == audit["audit_id"]
+        spd = data["metrics_by_attribute"]["gender"][0]["value"]
+        # F: 3/10 approved, M: 9/10 approved after the append
+        assert spd == pytest.approx(-0.6)
+
+    def test_fairness_append_to_streamed_audit(self, client, sample_csv):
+        from audit_store import load_audit_stats
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        audit = client.post("/api/fairness/calculate-stream", json={
+            "dataset_id": dataset_id, "target_column": "approved", "sensitive_attributes": ["age"],
+        }).json()
+        labels = load_audit_stats(audit["audit_id"])[1]["age"].labels
+
+        response = client.post(
+            f"/api/fairness/audits/{audit['audit_id']}/append", json={"rows": [{"age": 25, "approved": 1}]}
+        )
+        assert response.status_code == 200
+        table = load_audit_stats(audit["audit_id"])[1]["age"]
+        assert table.labels == labels and all(isinstance(label, str) for label in labels)
+        assert table.counts[labels.index("25")].sum() == 3
+
+    def test_fairness_append_unknown_audit(self, client):
+        response = client.post("/api/fairness/audits/unknown/append", json={"rows": [{"a": 1}]})
+        assert response.status_code == 404
+
+    def test_fairness_result_cache(self, client, sample_csv):
+        from result_cache import result_cache
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        payload = {
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "favorable_outcome": 1,
+        }
+        first = client.post("/api/fairness/calculate", json=payload).json()
+        hits = result_cache.hits
+        second = client.post("/api/fairness/calculate", json={**payload, "favorable_outcome": "1"}).json()
+        assert result_cache.hits == hits + 1
+        assert second["metrics_by_attribute"] == first["metrics_by_attribute"]
+        assert second["audit_id"] != first["audit_id"]
+
+        client.post("/api/ds/feature-engineering", json={"dataset_id": dataset_id})
+        client.post("/api/fairness/calculate", json=payload)
+        assert result_cache.hits == hits + 1
+        assert "results" in client.get("/health").json()["caches"]
+
+    def test_bias_analysis_success_rates(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        response = client.post("/api/fairness/bias-analysis", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "favorable_outcome": 1,
+        })
+        assert response.status_code == 200
+        data = response.json()
+        rates = {r["group"]: (r["rate"], r["count"]) for r in data["success_rates"]["gender"]}
+        assert rates == {"M": (0.8, 5), "F": (0.6, 5)}
+        assert sum(d["value"] for d in data["demographics"]["gender"]) == 10
+
+    def test_batch_audit(self, client, sample_csv):
+        import json
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        specs = [
+            {"target_column": "approved", "sensitive_attributes": ["gender"], "min_group_support": 1},
+            {"target_column": "approved", "sensitive_attributes": ["gender", "age"], "favorable_outcome": 0,
+             "intersectional": True, "min_group_support": 1},
+            {"target_column": "missing", "sensitive_attributes": ["gender"]},
+        ]
+        response = client.post("/api/fairness/calculate-batch", json={"dataset_id": dataset_id, "specs": specs})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == ["success", "success", "error"]
+        assert "gender|age" in results[1]["result"]["metrics_by_attribute"]
+
+        single = client.post("/api/fairness/calculate", json={"dataset_id": dataset_id, **specs[0]}).json()
+        assert single["metrics_by_attribute"] == results[0]["result"]["metrics_by_attribute"]
+
+        streamed = client.post(
+            "/api/fairness/calculate-batch", json={"dataset_id": dataset_id, "specs": specs, "stream": True}
+        )
+        assert streamed.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in streamed.text.splitlines()]
+        assert [line["index"] for line in lines] == [0, 1, 2]
+
+        comparison = dict(specs[0], model_id_post="some-model")
+        response = client.post("/api/fairness/calculate-batch", json={"dataset_id": dataset_id, "specs": [comparison]})
+        assert response.status_code == 422
+        assert client.post("/api/fairness/calculate-batch", json={"dataset_id": "unknown", "specs": specs}).status_code == 404
+
+    def test_enhanced_audit_is_a_durable_job(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        response = client.post("/api/fairness/calculate-enhanced", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "model_id": "audit-123",
+        })
+        assert response.status_code == 200
+        job_id = response.json()["job_id"]
+
+        job = client.get(f"/api/jobs/{job_id}").json()
+        assert job["kind"] == "fairness_enhanced" and job["status"] == "queued"
+        assert job_id in [j["id"] for j in client.get("/api/jobs", params={"status": "queued"}).json()["jobs"]]
+
+        assert client.post(f"/api/jobs/{job_id}/cancel").json()["status"] == "cancelled"
+        assert client.post(f"/api/jobs/{job_id}/cancel").status_code == 409
+        assert client.get("/api/jobs/unknown").status_code == 404
+
+    def test_append_to_enhanced_audit(self, client, sample_csv):
+        from job_queue import job_queue, JobWorker
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        job_id = client.post("/api/fairness/calculate-enhanced", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "model_id": "audit-enhanced",
+            "enable_llm": False,
+        }).json()["job_id"]
+        JobWorker(job_queue, kinds=["fairness_enhanced"]).run_once()
+        assert client.get(f"/api/jobs/{job_id}").json()["status"] == "completed"
+
+        # model_id carried the audit id: the audit's predictions are the target, not a model's
+        response = client.post(
+            "/api/fairness/audits/audit-enhanced/append", json={"rows": [{"gender": "F", "approved": 1}]}
+        )
+        assert response.status_code == 200
+
     def test_fairness_missing_dataset(self, client):
         response = client.post("/api/fairness/calculate", json={
             "dataset_id": "nonexistent",
@@ -135,6 +562,150 @@ class TestMLTraining:
         assert "accuracy" in data["metrics"]
 
 
+    def test_append_to_model_scored_audit(self, client, sample_csv):
+        import numpy as np
+        import pandas as pd
+        from audit_store import load_audit_stats
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        model_id = client.post("/api/ml/train", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "feature_columns": ["age", "gender", "income"],
+        }).json()["model_id"]
+        audit = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id, "model_id": model_id, "target_column": "approved",
+            "sensitive_attributes": ["gender"], "min_group_support": 1,
+        }).json()
+        before = load_audit_stats(audit["audit_id"])[1]["gender"].counts
+
+        # The same rows again, scored by the same model: every count doubles
+        rows = pd.read_csv(sample_csv).to_dict(orient="records")
+        response = client.post(f"/api/fairness/audits/{audit['audit_id']}/append", json={"rows": rows})
+        assert response.status_code == 200
+        np.testing.assert_array_equal(load_audit_stats(audit["audit_id"])[1]["gender"].counts, 2 * before)
+
+        # Without its model, new rows cannot be scored consistently
+        from utils import models_store, _model_path
+        models_store.discard(model_id)
+        if os.path.exists(_model_path(model_id)):
+            os.remove(_model_path(model_id))
+        response = client.post(f"/api/fairness/audits/{audit['audit_id']}/append", json={"rows": rows})
+        assert response.status_code == 409
+
+        # An id that never named a stored model is not a prediction source (the target is audited)
+        unscored = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id, "model_id": "not-a-model", "target_column": "approved",
+            "sensitive_attributes": ["gender"], "min_group_support": 1,
+        }).json()
+        assert load_audit_stats(unscored["audit_id"])[0]["model_id"] is None
+        response = client.post(f"/api/fairness/audits/{unscored['audit_id']}/append", json={"rows": rows})
+        assert response.status_code == 200
+
+    def test_fairness_with_model_predictions(self, client, sample_csv):
+        from result_cache import prediction_cache
+
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        model_id = client.post("/api/ml/train", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "feature_columns": ["age", "gender", "income"],
+        }).json()["model_id"]
+
+        payload = {
+            "dataset_id": dataset_id,
+            "model_id": model_id,
+            "target_column": "approved",
+            "favorable_outcome": 1,
+        }
+        first = client.post("/api/fairness/calculate", json={**payload, "sensitive_attributes": ["gender"]})
+        assert first.status_code == 200
+        hits = prediction_cache.hits
+        second = client.post("/api/fairness/calculate", json={**payload, "sensitive_attributes": ["age"]})
+        assert second.status_code == 200
+        assert prediction_cache.hits == hits + 1
+
+    def test_threshold_curves_from_model(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        model_id = client.post("/api/ml/train", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "feature_columns": ["age", "gender", "income"],
+        }).json()["model_id"]
+
+        response = client.post("/api/fairness/threshold-curves", json={
+            "dataset_id": dataset_id,
+            "model_id": model_id,
+            "target_column": "approved",
+            "sensitive_attribute": "gender",
+            "resolution": 5,
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["thresholds"]) <= 5
+        assert set(data["groups"]) == {"M", "F"}
+        for group in data["groups"].values():
+            assert len(group["selection_rate"]) == len(data["thresholds"])
+            # Every row is selected at the lowest threshold
+            assert group["selection_rate"][0] == 1.0
+
+
+    def test_threshold_mitigation_compared_in_one_audit(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        model_id = client.post("/api/ml/train", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "feature_columns": ["age", "income"],
+        }).json()["model_id"]
+
+        mitigation = client.post("/api/ml/mitigate/thresholds", json={
+            "model_id": model_id,
+            "sensitive_attribute": "gender",
+            "tolerance": 0.0,
+        })
+        assert mitigation.status_code == 200
+        mitigated = mitigation.json()
+        assert set(mitigated["thresholds"]) == {"M", "F"}
+        assert mitigated["mitigated"]["violation"] <= mitigated["baseline"]["violation"]
+
+        batch = client.post("/api/ml/predict", json={"model_id": mitigated["model_id"], "dataset_id": dataset_id})
+        assert batch.status_code == 200
+        assert batch.json()["rows"] == 10
+
+        audit = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id,
+            "model_id": model_id,
+            "model_id_post": mitigated["model_id"],
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+            "min_group_support": 1,
+        })
+        assert audit.status_code == 200
+        comparison = audit.json()["comparison_results"]
+        assert set(comparison) == {"pre", "post", "improvement"}
+
+
+    def test_preprocessing_mitigation_frontier(self, client, sample_csv):
+        dataset_id = self._upload_and_get_id(client, sample_csv)
+        response = client.post("/api/ml/mitigate/preprocessing", json={
+            "dataset_id": dataset_id,
+            "target_column": "approved",
+            "sensitive_attribute": "gender",
+            "strategies": ["baseline", "reweighing"],
+        })
+        assert response.status_code == 200
+        candidates = response.json()["candidates"]
+        assert [c["strategy"] for c in candidates] == ["baseline", "reweighing"]
+
+        audit = client.post("/api/fairness/calculate", json={
+            "dataset_id": dataset_id,
+            "model_id": candidates[1]["model_id"],
+            "target_column": "approved",
+            "sensitive_attributes": ["gender"],
+        })
+        assert audit.status_code == 200
+
+
 class TestPydanticValidation:
     def test_invalid_algorithm(self, client):
         response = client.post("/api/ml/train", json={
@@ -0,0 +1,39 @@
+"""
+Unit tests for the stored count tables of incremental audits.
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import audit_store  # noqa: E402
+from audit_store import save_audit_stats, load_audit_stats, collect_audit_stats  # noqa: E402
+from fairness_engine import GroupCounts  # noqa: E402
+
+
+def _tables():
+    return {"gender": GroupCounts(labels=["F", "M"], counts=np.array([[1, 2, 3, 4], [4, 3, 2, 1]]))}
+
+
+class TestAuditStore:
+    def test_save_and_load(self):
+        save_audit_stats("a1", {"target_column": "y"}, _tables())
+        config, tables = load_audit_stats("a1")
+        assert config == {"target_column": "y"}
+        assert tables["gender"].labels == ["F", "M"] and tables["gender"].counts.tolist()[0] == [1, 2, 3, 4]
+        assert load_audit_stats("missing") is None
+
+    def test_old_audits_collected(self):
+        save_audit_stats("old", {}, _tables())
+        save_audit_stats("recent", {}, _tables())
+        month_ago = time.time() - 31 * 24 * 3600
+        os.utime(os.path.join(audit_store.FAIRNESS_STATS_DIR, "old.json"), (month_ago, month_ago))
+
+        assert collect_audit_stats(retention_days=0) == 0
+        assert collect_audit_stats(retention_days=30) == 1
+        assert load_audit_stats("old") is None and load_audit_stats("recent") is not None
@@ -0,0 +1,100 @@
+"""
+Unit tests for the memory-bounded dataset/model store.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import utils  # noqa: E402
+import dataset_cache  # noqa: E402
+from bounded_store import BoundedStore  # noqa: E402
+
+
+def make_store(budget, disk=None, spillable=lambda key: True):
+    disk = {} if disk is None else disk
+
+    def spill(key, entry):
+        if not spillable(key):
+            return False
+        disk[key] = entry
+        return True
+
+    return BoundedStore(
+        "test", budget, sizer=len, spill=spill, restore=disk.get, exists=lambda key: key in disk,
+    ), disk
+
+
+class TestBoundedStore:
+    def test_lru_eviction_and_restore(self):
+        store, disk = make_store(budget=10)
+        store["a"] = "x" * 4
+        store["b"] = "x" * 4
+        store["a"]  # a is now most recently used
+        store["c"] = "x" * 4
+
+        assert not store.is_resident("b") and "b" in disk
+        assert store.is_resident("a") and store.is_resident("c")
+        assert "b" in store and store["b"] == "xxxx"
+        assert store.stats()["evictions"] == 2 and store.stats()["restores"] == 1
+        assert store.resident_bytes <= 10
+
+    def test_pinned_entries_stay_resident(self):
+        store, _ = make_store(budget=10)
+        store["a"] = "x" * 6
+        with store.pinned("a"):
+            store["b"] = "x" * 6
+            assert store.is_resident("a") and store.is_resident("b")
+            assert store.stats()["pinned"] == 1
+        # Back under budget once the pin is released
+        assert store.resident_bytes <= 10 and not store.is_resident("a")
+
+    def test_unspillable_entries_are_kept(self):
+        store, _ = make_store(budget=5, spillable=lambda key: key != "a")
+        store["a"] = "x" * 4
+        store["b"] = "x" * 4
+        assert store.is_resident("a") and store.stats()["spill_failures"] >= 1
+
+    def test_missing_key(self):
+        store, _ = make_store(budget=0)
+        assert "nope" not in store and store.get("nope") is None
+        with pytest.raises(KeyError):
+            store["nope"]
+
+    def test_resize_after_in_place_change(self):
+        store, _ = make_store(budget=0)
+        entry = ["x"]
+        store["a"] = entry
+        entry.extend("xxx")
+        store.resize("a")
+        assert store.resident_bytes == 4
+
+
+class TestDatasetStore:
+    @pytest.fixture
+    def upload_dir(self, tmp_path, monkeypatch):
+        pytest.importorskip("pyarrow")
+        monkeypatch.setattr(utils, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(dataset_cache, "DATASET_CACHE_DIR", str(tmp_path / "columnar"))
+        return tmp_path
+
+    def test_evicted_dataset_restores_from_columnar(self, upload_dir, monkeypatch):
+        store = utils.create_dataset_store()
+        store.budget_bytes = 1
+        monkeypatch.setattr(utils, "datasets_store", store)
+
+        frames = {}
+        for sid in ("d1", "d2"):
+            frames[sid] = pd.DataFrame({"x": range(100), "g": [sid] * 100})
+            store[sid] = utils._dataset_entry(frames[sid], f"{sid}.csv")
+        assert not store.is_resident("d1") and os.path.exists(dataset_cache.cache_path("d1"))
+
+        df, filename = utils.load_dataset("d1")
+        pd.testing.assert_frame_equal(df, frames["d1"])
+        assert filename == "d1.csv"
+        assert store.stats()["restores"] == 1
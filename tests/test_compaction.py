@@ -0,0 +1,93 @@
+"""
+Unit tests for lossless dtype compaction of ingested datasets.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from compaction import compact_dtypes  # noqa: E402
+from fairness_engine import build_count_tables, fairness_from_tables  # noqa: E402
+from proxy_detection import encode_attribute  # noqa: E402
+from training import encode_training_frame  # noqa: E402
+
+
+@pytest.fixture
+def applicants():
+    rng = np.random.default_rng(0)
+    n = 400
+    return pd.DataFrame({
+        "age": rng.integers(18, 70, n),
+        "income": rng.integers(0, 200_000, n) * 1.0,
+        "score": rng.random(n),
+        "gender": pd.Series(rng.choice(["F", "M", "?"], n)).replace("?", np.nan),
+        "city": rng.choice(["Paris", "Lyon", "Lille"], n),
+        "applicant_id": [f"id-{i}" for i in range(n)],
+        "mixed": [1 if i % 2 else "x" for i in range(n)],
+        "employed": rng.random(n) > 0.5,
+        "hired": rng.integers(0, 2, n),
+    })
+
+
+class TestCompactDtypes:
+    def test_lossless(self, applicants):
+        compacted, schema = compact_dtypes(applicants)
+        pd.testing.assert_frame_equal(
+            compacted.astype(object), applicants.astype(object), check_dtype=False
+        )
+        assert schema["bytes_after"] < schema["bytes_before"]
+
+    def test_chosen_dtypes(self, applicants):
+        compacted, schema = compact_dtypes(applicants)
+        dtypes = {col: info["dtype"] for col, info in schema["columns"].items()}
+        assert dtypes["age"] == "int8"
+        assert dtypes["hired"] == "int8"
+        assert dtypes["income"] == "float64"  # floats are never narrowed
+        assert dtypes["score"] == "float64"
+        assert dtypes["gender"] == "category"
+        assert dtypes["city"] == "category"
+        assert dtypes["applicant_id"] == "object"  # high cardinality
+        assert dtypes["mixed"] == "object"
+        assert dtypes["employed"] == "bool"
+        assert schema["columns"]["age"]["original"] == "int64"
+        assert compacted["gender"].isna().sum() == applicants["gender"].isna().sum()
+
+    def test_int_range(self):
+        df = pd.DataFrame({"small": [-128, 127], "mid": [0, 40_000], "big": [0, 2**40]})
+        compacted, _ = compact_dtypes(df)
+        assert compacted.dtypes.astype(str).tolist() == ["int8", "int32", "int64"]
+
+
+class TestEnginesOnCompactedFrames:
+    def test_fairness_unchanged(self, applicants):
+        compacted, _ = compact_dtypes(applicants)
+        audit = lambda df: fairness_from_tables(build_count_tables(df, "hired", ["gender", "city"], 1))
+        expected, actual = audit(applicants), audit(compacted)
+        for attr in ("gender", "city"):
+            assert [m.value for m in actual["metrics_by_attribute"][attr]] == pytest.approx(
+                [m.value for m in expected["metrics_by_attribute"][attr]]
+            )
+
+    def test_statistics_unchanged(self, applicants):
+        compacted, _ = compact_dtypes(applicants)
+        numeric = ["age", "income", "score", "hired"]
+        pd.testing.assert_frame_equal(compacted[numeric].describe(), applicants[numeric].describe(), check_exact=True)
+
+    def test_training_encoding_unchanged(self, applicants):
+        compacted, _ = compact_dtypes(applicants)
+        features = ["age", "income", "gender", "city"]
+        X, y, encoders, _, _ = encode_training_frame(applicants, "hired", features)
+        X_c, y_c, encoders_c, _, _ = encode_training_frame(compacted, "hired", features)
+        np.testing.assert_array_equal(np.asarray(X, dtype=float), np.asarray(X_c, dtype=float))
+        np.testing.assert_array_equal(y, y_c)
+        assert list(encoders_c["gender"].classes_) == list(encoders["gender"].classes_)
+
+    def test_proxy_encoding_treats_categories_as_categorical(self, applicants):
+        compacted, _ = compact_dtypes(applicants)
+        np.testing.assert_array_equal(encode_attribute(compacted["city"]), encode_attribute(applicants["city"]))
@@ -0,0 +1,76 @@
+"""
+Unit tests for the compute executor.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from compute import ComputeExecutor  # noqa: E402
+
+
+def _square(x):
+    return x * x
+
+
+class TestComputeExecutor:
+    def test_limit_and_stats(self):
+        executor = ComputeExecutor(thread_workers=8, process_workers=1, limits={"heavy": 2})
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def job():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return True
+
+        async def main():
+            return await asyncio.gather(*(executor.run("heavy", job) for _ in range(6)))
+
+        assert all(asyncio.run(main()))
+        assert peak[0] == 2
+        stats = executor.stats()["endpoints"]["heavy"]
+        assert stats["completed"] == 6 and stats["queued"] == 0 and stats["running"] == 0
+        assert stats["max_queued"] >= 4
+        executor.shutdown()
+
+    def test_event_loop_stays_responsive(self):
+        executor = ComputeExecutor(thread_workers=2, process_workers=1)
+
+        async def main():
+            heavy = asyncio.ensure_future(executor.run("heavy", time.sleep, 0.3))
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            latency = time.perf_counter() - started
+            await heavy
+            return latency
+
+        assert asyncio.run(main()) < 0.1
+        executor.shutdown()
+
+    def test_errors_counted_and_raised(self):
+        executor = ComputeExecutor(thread_workers=1, process_workers=1)
+
+        async def main():
+            await executor.run("bad", _square, None)
+
+        with pytest.raises(TypeError):
+            asyncio.run(main())
+        assert executor.stats()["endpoints"]["bad"]["failed"] == 1
+        executor.shutdown()
+
+    def test_process_pool(self):
+        executor = ComputeExecutor(thread_workers=1, process_workers=2)
+        assert asyncio.run(executor.run("cpu", _square, 7, process=True)) == 49
+        executor.shutdown()
@@ -0,0 +1,145 @@
+"""
+Unit tests for the columnar dataset cache.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+pytest.importorskip("pyarrow")
+
+import utils  # noqa: E402
+import dataset_cache  # noqa: E402
+from dataset_cache import save_columnar, load_columnar, columnar_metadata, has_columnar  # noqa: E402
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(dataset_cache, "DATASET_CACHE_DIR", str(tmp_path / "columnar"))
+    return tmp_path
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "age": [25, 30, 35, 40],
+        "gender": pd.Categorical(["M", "F", "M", "F"]),
+        "city": ["Paris", "Lyon", np.nan, "Nice"],
+        "income": [1.5, None, 3.0, 4.5],
+    })
+
+
+class TestColumnarCache:
+    def test_roundtrip_preserves_schema(self, upload_dir, df):
+        assert save_columnar("ds", df, {"name": "test"})
+        loaded = load_columnar("ds")
+        pd.testing.assert_frame_equal(loaded, df)
+        assert isinstance(loaded["gender"].dtype, pd.CategoricalDtype)
+        assert columnar_metadata("ds") == {"name": "test"}
+
+    def test_column_projection(self, upload_dir, df):
+        save_columnar("ds", df)
+        loaded = load_columnar("ds", ["gender", "age"])
+        assert list(loaded.columns) == ["gender", "age"]
+        pd.testing.assert_frame_equal(loaded, df[["gender", "age"]])
+
+    def test_stale_when_source_is_newer(self, upload_dir, df):
+        save_columnar("ds", df)
+        source = upload_dir / "ds.csv"
+        df.to_csv(source, index=False)
+        later = os.path.getmtime(dataset_cache.cache_path("ds")) + 10
+        os.utime(source, (later, later))
+        assert has_columnar("ds") and not has_columnar("ds", str(source))
+
+
+class TestLoadDatasetFromCache:
+    def test_restart_restores_from_columnar(self, upload_dir, df, monkeypatch):
+        df.to_csv(upload_dir / "ds1.csv", index=False)
+        monkeypatch.setattr(utils, "datasets_store", utils.create_dataset_store())
+        first, _ = utils.load_dataset("ds1")
+        fingerprint = utils.dataset_fingerprint("ds1")
+        assert has_columnar("ds1", str(upload_dir / "ds1.csv"))
+
+        # Simulated restart: empty store, CSV must not be parsed again
+        monkeypatch.setattr(utils, "datasets_store", utils.create_dataset_store())
+        monkeypatch.setattr(utils.pd, "read_csv", lambda *a, **k: pytest.fail("CSV re-parsed"))
+        assert utils.dataset_fingerprint("ds1") == fingerprint
+        assert not utils.datasets_store.is_resident("ds1")
+
+        projected, _ = utils.load_dataset("ds1", columns=["income"])
+        assert list(projected.columns) == ["income"] and not utils.datasets_store.is_resident("ds1")
+
+        restored, filename = utils.load_dataset("ds1")
+        pd.testing.assert_frame_equal(restored, first)
+        assert filename == "reloaded_ds1.csv"
+        assert utils.datasets_store["ds1"]["fingerprint"] == fingerprint
+
+
+class TestDatasetViews:
+    def test_views_share_memory_and_copy_on_write(self, upload_dir, monkeypatch):
+        store = utils.create_dataset_store()
+        monkeypatch.setattr(utils, "datasets_store", store)
+        stored = pd.DataFrame({"a": np.arange(5.0), "b": np.ones(5)})
+        store["ds"] = utils._dataset_entry(stored, "ds.csv")
+
+        view = utils.dataset_view("ds", ["a"])
+        assert list(view.columns) == ["a"]
+        assert np.shares_memory(view["a"].to_numpy(), stored["a"].to_numpy())
+
+        view.loc[0, "a"] = 99.0
+        full = utils.dataset_view("ds")
+        full["c"] = 1
+        assert stored.loc[0, "a"] == 0.0 and list(stored.columns) == ["a", "b"]
+
+
+class TestSharedRegistry:
+    """Two stores over the same cache directory stand in for two worker processes."""
+
+    @pytest.fixture
+    def workers(self, upload_dir, monkeypatch):
+        worker_a, worker_b = utils.create_dataset_store(), utils.create_dataset_store()
+        monkeypatch.setattr(utils, "datasets_store", worker_a)
+        return worker_a, worker_b
+
+    def test_upload_visible_to_other_worker_without_copy(self, workers, df):
+        worker_a, worker_b = workers
+        worker_a["ds"] = utils._dataset_entry(df, "ds.csv")
+        assert utils.save_dataset_columnar("ds")
+
+        assert "ds" in worker_b and not worker_b.is_resident("ds")
+        attached = worker_b["ds"]["df"]
+        pd.testing.assert_frame_equal(attached, df)
+        ages = attached["age"].to_numpy()
+        assert not ages.flags.owndata and not ages.flags.writeable  # view of the mapped file
+
+        # Engines work on the read-only mapped columns
+        from training import encode_training_frame
+        X, y, _, _, _ = encode_training_frame(attached, "age", ["gender", "income"])
+        assert len(X) == len(y) == 4
+
+    def test_replaced_dataset_reloaded_by_other_worker(self, workers, df):
+        worker_a, worker_b = workers
+        worker_a["ds"] = utils._dataset_entry(df, "ds.csv")
+        utils.save_dataset_columnar("ds")
+        assert list(worker_b["ds"]["df"].columns) == list(df.columns)
+
+        utils.update_dataset_df("ds", df.assign(score=1.0))
+        assert "score" in worker_b["ds"]["df"].columns
+        assert worker_b.stats()["stale_reloads"] == 1
+        assert utils.datasets_store.stats()["stale_reloads"] == 0
+
+    def test_removed_dataset_disappears_from_other_worker(self, workers, df):
+        worker_a, worker_b = workers
+        worker_a["ds"] = utils._dataset_entry(df, "ds.csv")
+        utils.save_dataset_columnar("ds")
+        worker_b["ds"]
+
+        dataset_cache.remove_columnar("ds")
+        assert "ds" not in worker_b
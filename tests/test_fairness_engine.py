@@ -0,0 +1,300 @@
+"""
+Unit tests for the vectorized fairness engine.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fairness_engine import (  # noqa: E402
+    favorable_mask, build_count_tables, fairness_from_tables, group_rates, group_outcome_counts,
+    TP, FP, FN, TN,
+)
+
+
+@pytest.fixture
+def hiring_df():
+    return pd.DataFrame({
+        "gender": ["M", "F", "M", "F", "M", "F", "M", "F", "M", None],
+        "hired": [1, 1, 1, 0, 1, 1, 1, 0, 0, 1],
+        "predicted": [1, 0, 1, 0, 1, 1, 0, 1, 0, 1],
+    })
+
+
+class TestFavorableMask:
+    def test_matches_as_strings(self):
+        mask = favorable_mask(pd.Series([1, 0, 1]), "1")
+        assert mask.tolist() == [True, False, True]
+
+    def test_missing_never_matches(self):
+        mask = favorable_mask(pd.Series(["yes", None, "no"]), "yes")
+        assert mask.tolist() == [True, False, False]
+
+
+class TestCountTables:
+    def test_confusion_counts(self, hiring_df):
+        tables = build_count_tables(
+            hiring_df, "hired", ["gender"], 1, predictions=hiring_df["predicted"]
+        )
+        table = tables["gender"]
+        assert table.labels == ["M", "F"]
+        # M: actual 1,1,1,1,0 / pred 1,1,1,0,0 -> TP=3, FP=0, FN=1, TN=1
+        assert table.counts[0].tolist() == [3, 0, 1, 1]
+        # F: actual 1,0,1,0 / pred 0,0,1,1 -> TP=1, FP=1, FN=1, TN=1
+        assert table.counts[1, [TP, FP, FN, TN]].tolist() == [1, 1, 1, 1]
+
+    def test_missing_attribute_skipped(self, hiring_df):
+        tables = build_count_tables(hiring_df, "hired", ["gender", "unknown"], 1)
+        assert list(tables) == ["gender"]
+
+    def test_rates_match_row_level(self, hiring_df):
+        table = build_count_tables(
+            hiring_df, "hired", ["gender"], 1, predictions=hiring_df["predicted"]
+        )["gender"]
+        rates = group_rates(table.counts)
+        females = hiring_df[hiring_df["gender"] == "F"]
+        assert rates["positive_rate"][1] == pytest.approx((females["predicted"] == 1).mean())
+        assert rates["tpr"][1] == pytest.approx(0.5)
+        assert rates["fpr"][1] == pytest.approx(0.5)
+
+
+class TestGroupOutcomeCounts:
+    def test_matches_filtered_groups(self):
+        rng = np.random.default_rng(6)
+        df = pd.DataFrame({"zip": rng.integers(0, 300, 5_000).astype(str), "y": rng.choice([0, 1, None], 5_000)})
+        df.loc[::7, "zip"] = None
+        labels, sizes, successes = group_outcome_counts(df["zip"], favorable_mask(df["y"], 1))
+
+        assert dict(zip(labels, sizes)) == df["zip"].value_counts().to_dict()
+        assert list(sizes) == sorted(sizes, reverse=True)
+        for label, size, success in list(zip(labels, sizes, successes))[:20]:
+            group = df[df["zip"] == label]
+            assert (size, success) == (len(group), (group["y"].astype(str) == "1").sum())
+
+    def test_without_target(self):
+        labels, sizes, successes = group_outcome_counts(pd.Series(["a", "b", "b"]))
+        assert labels == ["b", "a"] and sizes.tolist() == [2, 1] and successes is None
+
+
+class TestFairnessFromTables:
+    def test_reference_is_largest_group(self, hiring_df):
+        results = fairness_from_tables(build_count_tables(hiring_df, "hired", ["gender"], 1))
+        metrics = results["metrics_by_attribute"]["gender"]
+        assert len(metrics) == 4
+        assert all("entre F et M" in m.description for m in metrics)
+
+    def test_single_group_skipped(self):
+        df = pd.DataFrame({"g": ["A"] * 5, "y": [1, 0, 1, 0, 1]})
+        results = fairness_from_tables(build_count_tables(df, "y", ["g"], 1))
+        assert results["metrics_by_attribute"] == {}
+        assert results["overall_score"] == 100
+
+    def test_large_frame(self):
+        rng = np.random.default_rng(0)
+        n = 50_000
+        df = pd.DataFrame({"g": rng.choice(["A", "B", "C"], n), "y": rng.integers(0, 2, n)})
+        table = build_count_tables(df, "y", ["g"], 1)["g"]
+        assert table.sizes.sum() == n
+        assert dict(zip(table.labels, table.sizes)) == df["g"].value_counts().to_dict()
+
+
+class TestIntersections:
+    @pytest.fixture
+    def df(self):
+        rng = np.random.default_rng(1)
+        n = 5_000
+        return pd.DataFrame({
+            "gender": rng.choice(["F", "M"], n),
+            "age_band": rng.choice(["18-30", "31-50", "51+"], n),
+            "region": rng.choice(["N", "S", "E", "W"], n),
+            "approved": rng.integers(0, 2, n),
+        })
+
+    def test_all_combinations(self, df):
+        tables = build_count_tables(
+            df, "approved", ["gender", "age_band", "region"], 1, intersectional=True, min_group_support=1
+        )
+        assert set(tables) == {
+            "gender", "age_band", "region",
+            "gender|age_band", "gender|region", "age_band|region", "gender|age_band|region",
+        }
+
+    def test_matches_groupby(self, df):
+        table = build_count_tables(
+            df, "approved", ["gender", "region"], 1, intersectional=True, min_group_support=1
+        )["gender|region"]
+        expected = df.groupby(["gender", "region"]).size()
+        assert dict(zip(table.labels, table.sizes)) == {f"{g}|{r}": v for (g, r), v in expected.items()}
+        positives = df[df["approved"] == 1].groupby(["gender", "region"]).size()
+        assert dict(zip(table.labels, table.counts[:, TP])) == {f"{g}|{r}": v for (g, r), v in positives.items()}
+
+    def test_max_size(self, df):
+        tables = build_count_tables(
+            df, "approved", ["gender", "age_band", "region"], 1, intersectional=True, max_intersection_size=2
+        )
+        assert "gender|age_band|region" not in tables
+
+    def test_small_groups_pooled_or_skipped(self, df):
+        small = df.iloc[:120]
+        pooled = build_count_tables(
+            small, "approved", ["gender", "age_band", "region"], 1, intersectional=True, min_group_support=10
+        )["gender|age_band|region"]
+        assert pooled.sizes.sum() == 120
+        assert all(s >= 10 for label, s in zip(pooled.labels, pooled.sizes) if label != "autres")
+
+        skipped = build_count_tables(
+            small, "approved", ["gender", "age_band", "region"], 1,
+            intersectional=True, min_group_support=10, small_group_strategy="skip",
+        )["gender|age_band|region"]
+        assert "autres" not in skipped.labels
+        assert all(s >= 10 for s in skipped.sizes)
+
+
+class TestSharedCountTables:
+    def test_matches_build_and_reuses_tables(self, hiring_df):
+        from fairness_engine import SharedCountTables
+
+        hiring_df = hiring_df.assign(region=["N", "S"] * 5)
+        shared = SharedCountTables(hiring_df)
+        first = shared.build("hired", ["gender", "region"], 1, intersectional=True)
+        again = shared.build("hired", ["region"], "1")
+        assert shared.hits == 1
+
+        expected = build_count_tables(hiring_df, "hired", ["gender", "region"], 1, intersectional=True)
+        assert set(first) == set(expected)
+        for key, table in expected.items():
+            assert first[key].labels == table.labels
+            assert first[key].counts.tolist() == table.counts.tolist()
+        assert again["region"] is first["region"]
+
+        pred_mask = favorable_mask(hiring_df["predicted"], 1)
+        with_predictions = shared.build("hired", ["gender"], 1, prediction_key="predicted", pred_mask=pred_mask)
+        assert with_predictions["gender"].counts.tolist() != first["gender"].counts.tolist()
+
+
+class TestSignificance:
+    def _tables(self, n, seed=0):
+        rng = np.random.default_rng(seed)
+        df = pd.DataFrame({"group": rng.choice(["A", "B"], n), "y": rng.integers(0, 2, n)})
+        df["pred"] = np.where(df["group"] == "A", rng.random(n) < 0.55, rng.random(n) < 0.44).astype(int)
+        return build_count_tables(df, "y", ["group"], 1, predictions=df["pred"])
+
+    def test_interval_contains_point_estimate(self):
+        from fairness_stats import significance_for_tables
+
+        tables = self._tables(20_000)
+        results = fairness_from_tables(tables, significance_for_tables(tables, n_resamples=400))
+        for m in results["metrics_by_attribute"]["group"]:
+            assert m.ci_low <= m.value <= m.ci_high
+            assert 0 <= m.p_value <= 1
+
+    def test_small_sample_not_failed(self):
+        from fairness_stats import significance_for_tables
+
+        tables = self._tables(40, seed=3)
+        point = fairness_from_tables(tables)
+        interval = fairness_from_tables(tables, significance_for_tables(tables, n_resamples=400))
+        severity = {"pass": 0, "warning": 1, "fail": 2}
+        for p, i in zip(point["metrics_by_attribute"]["group"], interval["metrics_by_attribute"]["group"]):
+            assert severity[i.status] <= severity[p.status]
+            assert i.ci_high - i.ci_low > 0
+
+    def test_correction_increases_p_values(self):
+        from fairness_stats import significance_for_tables
+
+        tables = self._tables(2_000)
+        tables["copy"] = tables["group"]
+        raw = significance_for_tables(tables, n_resamples=100, correction="none")
+        holm = significance_for_tables(tables, n_resamples=100, correction="holm")
+        assert np.all(holm["group"]["spd"]["p_value"] >= raw["group"]["spd"]["p_value"])
+
+    def test_correction_family_is_the_tests_made(self):
+        from statsmodels.stats.multitest import multipletests
+        from fairness_engine import reference_index
+        from fairness_stats import significance_for_tables
+
+        tables = self._tables(2_000)
+        ref = reference_index(tables["group"])
+        other = 1 - ref
+        raw = significance_for_tables(tables, n_resamples=100, correction="none")["group"]
+        holm = significance_for_tables(tables, n_resamples=100, correction="holm")["group"]
+
+        # One compared group, three tests: SPD/DI (shared), EOD and EO
+        expected = multipletests([raw[key]["p_value"][other] for key in ("spd", "eod", "eo")], method="holm")[1]
+        assert np.allclose([holm[key]["p_value"][other] for key in ("spd", "eod", "eo")], expected)
+        assert holm["di"]["p_value"][other] == holm["spd"]["p_value"][other]
+        assert all(holm[key]["p_value"][ref] == 1 for key in holm)
+
+
+class TestStreaming:
+    def test_merge_preserves_order_and_sums(self):
+        from fairness_engine import GroupCounts
+
+        a = GroupCounts(labels=["A", "B"], counts=np.array([[1, 2, 3, 4], [1, 1, 1, 1]]))
+        b = GroupCounts(labels=["C", "A"], counts=np.array([[5, 5, 5, 5], [1, 0, 0, 0]]))
+        merged = a.merge(b)
+        assert merged.labels == ["A", "B", "C"]
+        assert merged.counts.tolist() == [[2, 2, 3, 4], [1, 1, 1, 1], [5, 5, 5, 5]]
+
+    def test_chunks_match_full_frame(self):
+        from fairness_engine import stream_count_tables
+
+        rng = np.random.default_rng(4)
+        n = 10_000
+        df = pd.DataFrame({
+            "gender": rng.choice(["F", "M", None], n),
+            "region": rng.choice(["N", "S", "E"], n),
+            "y": rng.integers(0, 2, n),
+            "pred": rng.integers(0, 2, n),
+        })
+        full = build_count_tables(
+            df, "y", ["gender", "region"], 1, predictions=df["pred"],
+            intersectional=True, min_group_support=700,
+        )
+        chunks = (df.iloc[i:i + 777] for i in range(0, n, 777))
+        streamed = stream_count_tables(
+            chunks, "y", ["gender", "region"], 1, prediction_column="pred",
+            intersectional=True, min_group_support=700,
+        )
+        assert set(full) == set(streamed)
+        for key, table in full.items():
+            other = dict(zip(streamed[key].labels, streamed[key].counts.tolist()))
+            assert dict(zip(table.labels, table.counts.tolist())) == other
+
+
+class TestThresholdCurves:
+    def test_matches_per_threshold_counts(self):
+        from fairness_engine import sweep_thresholds, threshold_count_tensor
+
+        rng = np.random.default_rng(5)
+        n = 3_000
+        groups = pd.Series(rng.choice(["A", "B", "C"], n))
+        scores = np.round(rng.random(n), 2)
+        scores[:10] = np.nan
+        actual = rng.random(n) < 0.4
+
+        thresholds = sweep_thresholds(scores, 20)
+        assert len(thresholds) <= 20
+        labels, sizes, counts = threshold_count_tensor(scores, groups, actual, thresholds)
+
+        valid = ~np.isnan(scores)
+        for t_idx, t in enumerate(thresholds):
+            pred = pd.Series(np.where(valid, scores >= t, False))
+            table = build_count_tables(
+                pd.DataFrame({"g": groups[valid], "y": actual[valid].astype(int)}),
+                "y", ["g"], 1, predictions=pred[valid].astype(int),
+            )["g"]
+            expected = dict(zip(table.labels, table.counts.tolist()))
+            assert dict(zip(labels, counts[t_idx].tolist())) == expected
+        assert sizes.sum() == valid.sum()
+
+    def test_distinct_scores_used_when_few(self):
+        from fairness_engine import sweep_thresholds
+
+        assert sweep_thresholds([0.2, 0.8, 0.2, np.nan], 10).tolist() == [0.2, 0.8]
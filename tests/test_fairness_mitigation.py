@@ -0,0 +1,123 @@
+"""
+Unit tests for fairness mitigation.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from fairness_mitigation import fit_group_thresholds  # noqa: E402
+
+
+@pytest.fixture
+def biased_scores():
+    rng = np.random.default_rng(0)
+    n = 4_000
+    groups = pd.Series(rng.choice(["A", "B"], n))
+    actual = rng.random(n) < 0.5
+    # Group B is scored lower for the same outcome
+    scores = np.clip(0.3 * actual + rng.normal(0.45, 0.15, n) - 0.15 * (groups == "B"), 0, 1)
+    return scores, groups, actual
+
+
+class TestGroupThresholds:
+    def test_demographic_parity_reduces_gap(self, biased_scores):
+        scores, groups, actual = biased_scores
+        fit = fit_group_thresholds(scores, groups, actual, "demographic_parity", tolerance=0.02)
+        assert fit["feasible"]
+        assert fit["violation"] <= 0.02 < fit["baseline"]["violation"]
+        assert fit["thresholds"]["B"] < fit["thresholds"]["A"]
+
+        selected = scores >= groups.map(fit["thresholds"]).to_numpy()
+        rates = pd.Series(selected).groupby(groups).mean()
+        assert abs(rates["A"] - rates["B"]) <= 0.02
+
+    def test_equalized_odds(self, biased_scores):
+        scores, groups, actual = biased_scores
+        fit = fit_group_thresholds(scores, groups, actual, "equalized_odds", tolerance=0.05)
+        assert fit["violation"] < fit["baseline"]["violation"]
+        assert set(fit["thresholds"]) == {"A", "B"}
+
+    def test_infeasible_returns_smallest_gap(self, biased_scores):
+        scores, groups, actual = biased_scores
+        fit = fit_group_thresholds(scores, groups, actual, "equalized_odds", tolerance=-1)
+        most_accurate = fit_group_thresholds(scores, groups, actual, "equalized_odds", tolerance=1)
+        assert not fit["feasible"]
+        assert fit["violation"] <= most_accurate["violation"]
+        assert most_accurate["accuracy"] >= fit["accuracy"]
+
+    def test_numeric_groups_keep_their_threshold(self, biased_scores, monkeypatch):
+        import scoring
+        scores, groups, actual = biased_scores
+        bands = groups.map({"A": 1.0, "B": 2.0})
+        fit = fit_group_thresholds(scores, bands, actual, "demographic_parity", tolerance=0.02)
+        assert set(fit["thresholds"]) == {"1", "2"}
+
+        model_data = {"group_thresholds": {
+            "sensitive_attribute": "band", "favorable_outcome": 1,
+            "thresholds": fit["thresholds"], "default_threshold": 0.5,
+        }}
+        monkeypatch.setattr(scoring, "predict_scores", lambda model_data, df, favorable: scores)
+        monkeypatch.setattr(scoring, "model_classes", lambda model_data: np.array([0, 1]))
+        monkeypatch.setattr(scoring, "favorable_class_index", lambda model_data, favorable: 1)
+        expected = (scores >= bands.map({1.0: fit["thresholds"]["1"], 2.0: fit["thresholds"]["2"]})).astype(int)
+        # Scored frames may carry the groups as floats, integers, text or categories
+        for band in (bands, bands.astype(int), bands.astype(int).astype(str), bands.astype("category")):
+            labels = scoring._apply_group_thresholds(model_data, pd.DataFrame({"band": band}))
+            assert np.array_equal(labels, expected)
+
+    def test_unknown_constraint(self, biased_scores):
+        with pytest.raises(ValueError):
+            fit_group_thresholds(*biased_scores, constraint="calibration")
+
+
+class TestPreprocessing:
+    @pytest.fixture
+    def skewed(self):
+        rng = np.random.default_rng(1)
+        n = 2_000
+        groups = rng.choice(["A", "B"], n, p=[0.7, 0.3])
+        actual = rng.random(n) < np.where(groups == "A", 0.6, 0.3)
+        return groups, actual
+
+    def test_reweighing_equalizes_favorable_rates(self, skewed):
+        from fairness_mitigation import reweighing_weights
+
+        groups, actual = skewed
+        weights = reweighing_weights(groups, actual)
+        overall = actual.mean()
+        for g in ["A", "B"]:
+            mask = groups == g
+            assert np.average(actual[mask], weights=weights[mask]) == pytest.approx(overall)
+        assert weights.sum() == pytest.approx(len(groups))
+
+    @pytest.mark.parametrize("strategy", ["oversample", "undersample"])
+    def test_resampling_balances_cells(self, skewed, strategy):
+        from fairness_mitigation import group_aware_sample
+
+        groups, actual = skewed
+        idx = group_aware_sample(groups, actual, strategy)
+        cells = pd.Series(list(zip(groups[idx], actual[idx]))).value_counts()
+        assert len(cells) == 4
+        assert cells.nunique() == 1
+
+    def test_candidates_form_frontier(self, skewed):
+        from fairness_mitigation import evaluate_preprocessing_candidates
+
+        groups, actual = skewed
+        rng = np.random.default_rng(2)
+        X = np.column_stack([actual + rng.normal(0, 1, len(actual)), groups == "A"]).astype(float)
+        y = actual.astype(int)
+        candidates = evaluate_preprocessing_candidates(
+            "logistic_regression", X[:1500], y[:1500], groups[:1500], X[1500:], y[1500:], groups[1500:], 1,
+        )
+        assert [c["strategy"] for c in candidates] == ["baseline", "reweighing", "oversample", "undersample"]
+        assert any(c["pareto"] for c in candidates)
+        by_name = {c["strategy"]: c for c in candidates}
+        assert by_name["reweighing"]["max_abs_spd"] < by_name["baseline"]["max_abs_spd"]
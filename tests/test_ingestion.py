@@ -0,0 +1,166 @@
+"""
+Unit tests for dataset ingestion engines.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+pytest.importorskip("pyarrow")
+
+import ingestion  # noqa: E402
+from ingestion import ingest_file, read_dataset_file, list_sheets, ColumnTypeError, SheetError  # noqa: E402
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text(
+        "date,flag,city,score,count,zip\n"
+        "2020-01-01,True,Paris,,1,07500\n"
+        "2020-01-02,False,,1.5,2,69001\n"
+        "2020-01-03,,Lyon,NA,3,13001\n"
+    )
+    return str(path)
+
+
+def write_drift_csv(tmp_path, late_values):
+    """CSV whose first sample (1 MB) is all integers, with other values afterwards."""
+    path = tmp_path / "drift.csv"
+    rows = ["value"] + [str(i) for i in range(300_000)] + list(late_values)
+    path.write_text("\n".join(rows))
+    return str(path)
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    pytest.importorskip("openpyxl")
+    path = tmp_path / "data.xlsx"
+    people = pd.DataFrame({
+        "age": [25, 40, 31],
+        "name": ["Ana", None, "Léo"],
+        "score": [1.5, np.nan, 3.0],
+        "hired": [True, False, True],
+        "since": pd.to_datetime(["2020-01-01", "2021-06-30", "2019-03-15"]),
+    })
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({"note": ["summary"]}).to_excel(writer, sheet_name="Summary", index=False)
+        people.to_excel(writer, sheet_name="People", index=False)
+    return str(path)
+
+
+class TestEngines:
+    def test_arrow_matches_pandas(self, csv_path, monkeypatch):
+        monkeypatch.setattr(ingestion.pd, "read_csv", lambda *a, **k: pytest.fail("pandas fallback used"))
+        df, report = ingest_file(csv_path, engine="arrow")
+        monkeypatch.undo()
+        pd.testing.assert_frame_equal(df, pd.read_csv(csv_path))
+        assert df["date"].tolist() == ["2020-01-01", "2020-01-02", "2020-01-03"]
+        assert report["engine"] == "arrow" and report["rows_rejected"] == 0
+
+    @pytest.mark.parametrize("engine", ["arrow_stream", "pandas"])
+    def test_engines_agree(self, csv_path, engine):
+        pd.testing.assert_frame_equal(ingest_file(csv_path, engine=engine)[0], ingest_file(csv_path, engine="arrow")[0])
+
+    def test_no_staging_file_left(self, csv_path):
+        ingest_file(csv_path, engine="arrow_stream")
+        assert os.listdir(os.path.dirname(csv_path)) == ["data.csv"]
+
+    def test_unknown_engine(self, csv_path):
+        with pytest.raises(ValueError):
+            ingest_file(csv_path, engine="nope")
+
+    def test_json_lines_and_arrays(self, tmp_path):
+        frame = pd.DataFrame({"a": [1, 2], "b": [np.nan, 1.0]})
+        array_path, lines_path = tmp_path / "array.json", tmp_path / "lines.json"
+        frame.to_json(array_path, orient="records")
+        frame.to_json(lines_path, orient="records", lines=True)
+        assert read_dataset_file(str(array_path))["a"].tolist() == [1, 2]
+        assert ingest_file(str(lines_path))[0]["a"].tolist() == [1, 2]
+
+
+class TestSampledSchema:
+    def test_few_misfits_rejected_and_reported(self, tmp_path):
+        df, report = ingest_file(write_drift_csv(tmp_path, ["not-a-number", "300001"]))
+        assert len(df) == 300_001 and df["value"].dtype == np.int64
+        assert report["rows_rejected"] == 1
+        assert report["rejected"] == [{"row": 300_000, "column": "value", "value": "not-a-number", "expected": "int64"}]
+
+    def test_many_misfits_keep_column_as_text(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ingestion, "INGEST_MAX_REJECTED_RATIO", 0.0)
+        df, report = ingest_file(write_drift_csv(tmp_path, ["not-a-number"]))
+        assert len(df) == 300_001 and df["value"].iloc[-1] == "not-a-number"
+        assert report["widened_columns"] == ["value"] and report["rows_rejected"] == 0
+
+    def test_integers_widened_to_floats(self, tmp_path):
+        df, report = ingest_file(write_drift_csv(tmp_path, ["2.5"]))
+        assert df["value"].dtype == np.float64 and df["value"].iloc[-1] == 2.5
+        assert report["rows_rejected"] == 0
+
+    def test_malformed_rows_skipped(self, tmp_path):
+        path = tmp_path / "bad.csv"
+        path.write_text("a,b\n1,2\n3,4,5\n6,7\n")
+        df, report = ingest_file(str(path))
+        assert df["a"].tolist() == [1, 6]
+        assert report["malformed_rows"] == 1 and report["rejected"][0]["text"] == "3,4,5"
+
+
+class TestColumnTypeOverrides:
+    @pytest.mark.parametrize("engine", ["arrow", "pandas"])
+    def test_text_override_keeps_leading_zeros(self, csv_path, engine):
+        df, _ = ingest_file(csv_path, {"zip": "string"}, engine=engine)
+        assert df["zip"].tolist() == ["07500", "69001", "13001"]
+
+    @pytest.mark.parametrize("engine", ["arrow", "pandas"])
+    def test_override_rejects_rows(self, csv_path, engine):
+        df, report = ingest_file(csv_path, {"city": "int"}, engine=engine)
+        assert report["rows_rejected"] == 2 and len(df) == 1
+        assert {r["value"] for r in report["rejected"]} == {"Paris", "Lyon"}
+
+    def test_datetime_override(self, csv_path):
+        df, _ = ingest_file(csv_path, {"date": "datetime"})
+        assert pd.api.types.is_datetime64_any_dtype(df["date"])
+
+    def test_invalid_overrides(self, csv_path):
+        with pytest.raises(ColumnTypeError):
+            ingest_file(csv_path, {"zip": "decimal"})
+        with pytest.raises(ColumnTypeError):
+            ingest_file(csv_path, {"missing": "string"})
+
+    @pytest.mark.parametrize("engine", ["arrow", "arrow_stream"])
+    def test_override_no_row_fits(self, tmp_path, engine):
+        # One malformed row too: its report entry has no column
+        path = tmp_path / "text.csv"
+        path.write_text("a,b\nx,1\ny,2,3\nz,4\n")
+        with pytest.raises(ColumnTypeError, match="a: int64"):
+            ingest_file(str(path), {"a": "int"}, engine=engine)
+
+
+class TestSpreadsheets:
+    def test_sheets_listed(self, workbook_path):
+        assert list_sheets(workbook_path) == ["Summary", "People"]
+
+    @pytest.mark.parametrize("sheet", ["People", "1"])
+    def test_streamed_sheet_matches_read_excel(self, workbook_path, sheet):
+        df, report = ingest_file(workbook_path, sheet=sheet)
+        pd.testing.assert_frame_equal(df, pd.read_excel(workbook_path, sheet_name="People"))
+        assert report["engine"] == "openpyxl" and report["sheet"] == "People"
+
+    def test_first_sheet_by_default(self, workbook_path):
+        assert ingest_file(workbook_path)[0]["note"].tolist() == ["summary"]
+
+    def test_progress_reported(self, workbook_path, monkeypatch):
+        monkeypatch.setattr(ingestion, "INGEST_EXCEL_PROGRESS_ROWS", 1)
+        calls = []
+        ingest_file(workbook_path, sheet="People", progress=lambda fraction, rows: calls.append(rows))
+        assert calls == [1, 2, 3]
+
+    def test_unknown_sheet(self, workbook_path):
+        with pytest.raises(SheetError):
+            ingest_file(workbook_path, sheet="Missing")
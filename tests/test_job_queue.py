@@ -0,0 +1,196 @@
+"""
+Unit tests for the durable job queue.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import job_queue as jq  # noqa: E402
+import job_worker  # noqa: E402
+from job_queue import JobQueue, JobWorker, register_handler  # noqa: E402
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jq, "JOB_RETRY_BACKOFF_SECONDS", 0)
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+class TestJobQueue:
+    def test_enqueue_claim_complete(self, queue):
+        job_id = queue.enqueue("echo", {"x": 1})
+        job = queue.claim("w1")
+        assert job["id"] == job_id and job["status"] == "running" and job["attempts"] == 1
+        assert queue.claim("w2") is None
+
+        queue.complete(job_id, "w1", {"ok": True})
+        job = queue.get(job_id)
+        assert job["status"] == "completed" and job["progress"] == 1.0 and job["result"] == {"ok": True}
+        assert queue.counts()["completed"] == 1
+
+    def test_retry_then_fail(self, queue):
+        job_id = queue.enqueue("echo", {}, max_attempts=2)
+        queue.claim("w1")
+        assert queue.fail(job_id, "w1", "boom") is True
+        assert queue.get(job_id)["status"] == "queued"
+        queue.claim("w1")
+        assert queue.fail(job_id, "w1", "boom again") is False
+        job = queue.get(job_id)
+        assert job["status"] == "failed" and job["attempts"] == 2 and job["error"] == "boom again"
+
+    def test_cancel_queued_and_running(self, queue):
+        queued = queue.enqueue("echo", {})
+        assert queue.cancel(queued)["status"] == "cancelled"
+        assert queue.claim("w1") is None
+
+        running = queue.enqueue("echo", {})
+        queue.claim("w1")
+        assert queue.cancel(running)["cancel_requested"] is True
+        assert queue.heartbeat(running, 0.5) is True
+
+    def test_stale_jobs_are_requeued(self, queue):
+        job_id = queue.enqueue("echo", {})
+        queue.claim("crashed-worker")
+        assert queue.requeue_stale(stale_seconds=60) == 0
+        time.sleep(0.01)
+        assert queue.requeue_stale(stale_seconds=0) == 1
+        job = queue.claim("w2")
+        assert job["id"] == job_id and job["worker"] == "w2" and job["attempts"] == 2
+
+    def test_job_that_keeps_losing_its_worker_fails(self, queue):
+        job_id = queue.enqueue("crash", {}, max_attempts=2)
+        for attempt in (1, 2):
+            assert queue.claim("doomed-worker")["attempts"] == attempt
+            time.sleep(0.01)
+            queue.requeue_stale(stale_seconds=0)
+        job = queue.get(job_id)
+        assert job["status"] == "failed" and job["attempts"] == 2 and "Worker lost" in job["error"]
+        assert queue.claim("w2") is None
+
+    def test_requeued_job_is_no_longer_the_stale_workers(self, queue):
+        job_id = queue.enqueue("echo", {})
+        queue.claim("stale-worker")
+        time.sleep(0.01)
+        queue.requeue_stale(stale_seconds=0)
+        queue.claim("w2")
+
+        assert queue.heartbeat(job_id, 0.9, worker="stale-worker") is True
+        assert queue.complete(job_id, "stale-worker", "stale result") is False
+        assert queue.fail(job_id, "stale-worker", "late error") is False
+        assert queue.mark_cancelled(job_id, "stale-worker") is False
+        job = queue.get(job_id)
+        assert job["status"] == "running" and job["worker"] == "w2" and job["progress"] == 0
+
+        assert queue.complete(job_id, "w2", "fresh result") is True
+        assert queue.get(job_id)["result"] == "fresh result"
+
+    def test_lease_has_one_holder(self, queue):
+        assert queue.acquire_lease("workers", "p1", ttl=60) is True
+        assert queue.acquire_lease("workers", "p2", ttl=60) is False
+        assert queue.acquire_lease("workers", "p1", ttl=0) is True  # renewed
+        time.sleep(0.01)
+        assert queue.acquire_lease("workers", "p2", ttl=60) is True  # p1's lease expired
+        queue.release_lease("workers", "p1")
+        assert queue.acquire_lease("workers", "p1", ttl=60) is False
+        queue.release_lease("workers", "p2")
+        assert queue.acquire_lease("workers", "p1", ttl=60) is True
+
+    def test_release_worker_keeps_attempts(self, queue):
+        job_id = queue.enqueue("echo", {})
+        queue.claim("w1")
+        assert queue.release_worker("w1") == 1
+        job = queue.get(job_id)
+        assert job["status"] == "queued" and job["attempts"] == 0
+
+
+class TestJobWorker:
+    def test_runs_handler_with_progress(self, queue):
+        seen = []
+
+        def handler(payload, job):
+            job.progress(0.5, "halfway")
+            seen.append(queue.get(job.job_id)["progress"])
+            return payload["x"] * 2
+
+        register_handler("double", handler)
+        job_id = queue.enqueue("double", {"x": 21})
+        worker = JobWorker(queue, name="w1")
+        assert worker.run_once() == job_id
+        assert seen == [0.5]
+        job = queue.get(job_id)
+        assert job["status"] == "completed" and job["result"] == 42 and job["message"] == "halfway"
+        assert worker.run_once() is None
+
+    def test_failing_handler_is_retried(self, queue):
+        calls = []
+
+        def handler(payload, job):
+            calls.append(job.final_attempt)
+            if not job.final_attempt:
+                raise RuntimeError("transient")
+            return "done"
+
+        register_handler("flaky", handler)
+        job_id = queue.enqueue("flaky", {}, max_attempts=3)
+        worker = JobWorker(queue, name="w1")
+        while worker.run_once():
+            pass
+        assert calls == [False, False, True]
+        assert queue.get(job_id)["status"] == "completed"
+
+    def test_cancel_running_job(self, queue):
+        def handler(payload, job):
+            queue.cancel(job.job_id)
+            job.progress(0.1)
+            return "unreachable"
+
+        register_handler("cancelled", handler)
+        job_id = queue.enqueue("cancelled", {})
+        JobWorker(queue, name="w1").run_once()
+        assert queue.get(job_id)["status"] == "cancelled"
+
+    def test_lost_job_keeps_the_new_owners_result(self, queue):
+        def handler(payload, job):
+            # Meanwhile the job looked stale and another worker took it over
+            time.sleep(0.01)
+            queue.requeue_stale(stale_seconds=0)
+            queue.claim("w2")
+            return "stale result"
+
+        register_handler("overtaken", handler)
+        job_id = queue.enqueue("overtaken", {})
+        JobWorker(queue, name="w1").run_once()
+        job = queue.get(job_id)
+        assert job["status"] == "running" and job["worker"] == "w2" and job["result"] is None
+
+    def test_unknown_kind_fails(self, queue):
+        job_id = queue.enqueue("missing-kind", {}, max_attempts=1)
+        JobWorker(queue, name="w1").run_once()
+        job = queue.get(job_id)
+        assert job["status"] == "failed" and "missing-kind" in job["error"]
+
+
+class TestWorkerSupervisor:
+    def test_one_api_process_runs_the_workers(self, queue, monkeypatch):
+        started = []
+        monkeypatch.setattr(job_worker, "start_workers", lambda count: started.append(count) or ["process"])
+        monkeypatch.setattr(job_worker, "stop_workers", lambda processes: None)
+        first = job_worker.WorkerSupervisor(2, queue)
+        second = job_worker.WorkerSupervisor(2, queue)
+
+        first.check()
+        second.check()
+        first.check()
+        assert started == [2]
+        assert first.processes and not second.processes
+
+        # The leader shuts down: another process takes over
+        first.stop()
+        second.check()
+        assert started == [2, 2] and second.processes
@@ -0,0 +1,148 @@
+"""
+Unit tests for the batched persistence layer.
+"""
+
+import os
+import sys
+import asyncio
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import persistence as ps  # noqa: E402
+from persistence import PersistenceBackend, PersistenceStore, SQLiteBackend, SupabaseBackend, Outbox  # noqa: E402
+
+
+class CountingBackend(SQLiteBackend):
+    """SQLite backend recording batches, optionally unreachable."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.batches = []
+        self.down = False
+
+    def update_many(self, items):
+        if self.down:
+            return 0, ConnectionError("backend unreachable")
+        self.batches.append(list(items))
+        return super().update_many(items)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return CountingBackend(str(tmp_path / "records.sqlite3"))
+
+
+@pytest.fixture
+def store(tmp_path, backend, monkeypatch):
+    monkeypatch.setattr(ps, "PERSISTENCE_RETRY_SECONDS", 0)
+    return PersistenceStore(backend, Outbox(str(tmp_path / "outbox.sqlite3")), flush_seconds=0.05)
+
+
+class TestSQLiteBackend:
+    def test_insert_and_merge_updates(self, backend):
+        row = backend.insert("ds_projects", {"project_name": "p"})
+        backend.update("ds_projects", row["id"], {"status": "eda_completed"})
+        stored = backend.get("ds_projects", row["id"])
+        assert stored["project_name"] == "p" and stored["status"] == "eda_completed"
+
+
+class FakeSupabase:
+    """Supabase client recording upsert requests; tables in `down` fail."""
+
+    def __init__(self, down=()):
+        self.requests = []
+        self.down = set(down)
+
+    def table(self, name):
+        client = self
+
+        class Query:
+            def upsert(self, rows, **options):
+                self.request = (name, rows, options)
+                return self
+
+            def execute(self):
+                if name in client.down:
+                    raise ConnectionError("backend unreachable")
+                client.requests.append(self.request)
+
+        return Query()
+
+
+class TestSupabaseBackend:
+    def test_batch_is_one_upsert(self):
+        client = FakeSupabase()
+        items = [("audits", "a1", {"status": "completed"}), ("audits", "a2", {"status": "failed"})]
+        assert SupabaseBackend(client).update_many(items) == (2, None)
+        assert client.requests == [(
+            "audits",
+            [{"status": "completed", "id": "a1"}, {"status": "failed", "id": "a2"}],
+            {"on_conflict": "id", "default_to_null": False},
+        )]
+
+    def test_rows_with_other_columns_are_sent_apart(self):
+        client = FakeSupabase(down={"ds_projects"})
+        items = [
+            ("audits", "a1", {"status": "completed"}),
+            ("audits", "a2", {"status": "completed", "overall_score": 80}),
+            ("ds_projects", "p1", {"status": "active"}),
+        ]
+        done, error = SupabaseBackend(client).update_many(items)
+        assert done == 2 and isinstance(error, ConnectionError)
+        assert [len(rows) for _, rows, _ in client.requests] == [1, 1]
+
+    def test_backends_must_implement_update_and_insert(self):
+        class Incomplete(PersistenceBackend):
+            def update(self, table, row_id, data):
+                pass
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+
+class TestPersistenceStore:
+    def test_updates_are_coalesced_into_one_batch(self, store, backend):
+        async def main():
+            store.start()
+            await store.update("ds_projects", "p1", {"eda_results": {"a": 1}, "status": "eda"})
+            await store.update("ds_projects", "p1", {"status": "eda_completed"})
+            await store.update("ds_projects", "p2", {"status": "active"})
+            await asyncio.sleep(0.2)
+            await store.stop()
+
+        asyncio.run(main())
+        assert len(backend.batches) == 1 and len(backend.batches[0]) == 2
+        assert backend.get("ds_projects", "p1") == {
+            "id": "p1", "eda_results": {"a": 1}, "status": "eda_completed"
+        }
+        stats = store.stats()
+        assert stats["coalesced"] == 1 and stats["delivered"] == 2 and stats["outbox"] == 0
+
+    def test_write_through_without_flusher(self, store, backend):
+        asyncio.run(store.update("audits", "a1", {"status": "completed"}))
+        assert backend.get("audits", "a1")["status"] == "completed"
+
+    def test_outbox_retries_when_backend_is_down(self, store, backend):
+        backend.down = True
+        store.update_sync("audits", "a1", {"status": "completed", "overall_score": 80})
+        store.update_sync("audits", "a1", {"overall_score": 85})
+        assert store.stats()["outbox"] == 1 and backend.get("audits", "a1") is None
+
+        backend.down = False
+        assert store.deliver() == 1
+        assert backend.get("audits", "a1") == {"id": "a1", "status": "completed", "overall_score": 85}
+        assert store.stats()["outbox"] == 0
+
+    def test_outbox_survives_restart(self, tmp_path, backend, monkeypatch):
+        monkeypatch.setattr(ps, "PERSISTENCE_RETRY_SECONDS", 0)
+        outbox_path = str(tmp_path / "outbox.sqlite3")
+        backend.down = True
+        PersistenceStore(backend, Outbox(outbox_path)).update_sync("audits", "a1", {"status": "failed"})
+
+        backend.down = False
+        restarted = PersistenceStore(backend, Outbox(outbox_path))
+        assert restarted.deliver() == 1
+        assert backend.get("audits", "a1")["status"] == "failed"
@@ -0,0 +1,78 @@
+"""
+Unit tests for proxy-variable detection.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from proxy_detection import detect_proxies, pearson_matrix, cramers_v_and_mi  # noqa: E402
+
+
+@pytest.fixture
+def df():
+    rng = np.random.default_rng(0)
+    n = 3_000
+    gender = rng.choice(["F", "M"], n)
+    frame = pd.DataFrame({
+        "gender": gender,
+        "height": rng.normal(165, 7, n) + 12 * (gender == "M"),
+        "noise": rng.normal(size=n),
+        "constant": np.ones(n),
+        "job": np.where(rng.random(n) < 0.85, np.where(gender == "M", "engineer", "nurse"), "teacher"),
+        "city": rng.choice(["Paris", "Lyon", "Lille"], n),
+        "approved": rng.integers(0, 2, n),
+    })
+    frame.loc[::17, "height"] = np.nan
+    return frame
+
+
+class TestPearson:
+    def test_matches_corrcoef_with_median_fill(self, df):
+        attr = (df["gender"] == "M").astype(float).to_numpy()[:, None]
+        corr = pearson_matrix(df[["height", "noise"]], attr)
+        height = df["height"].fillna(df["height"].median())
+        assert corr[0, 0] == pytest.approx(np.corrcoef(attr[:, 0], height)[0, 1])
+        assert corr[1, 0] == pytest.approx(np.corrcoef(attr[:, 0], df["noise"])[0, 1])
+
+    def test_constant_column_is_nan(self, df):
+        attr = (df["gender"] == "M").astype(float).to_numpy()[:, None]
+        assert np.isnan(pearson_matrix(df[["constant"]], attr)[0, 0])
+
+
+class TestCategorical:
+    def test_perfect_and_independent_tables(self):
+        perfect = cramers_v_and_mi(np.array([[50, 0], [0, 50]]))
+        assert perfect["cramers_v"] == pytest.approx(1.0)
+        assert perfect["mutual_information"] == pytest.approx(np.log(2))
+
+        independent = cramers_v_and_mi(np.array([[25, 25], [25, 25]]))
+        assert independent["cramers_v"] == pytest.approx(0.0)
+        assert independent["mutual_information"] == pytest.approx(0.0)
+
+
+class TestDetectProxies:
+    def test_numeric_and_categorical_proxies(self, df):
+        proxies = detect_proxies(df, ["gender"], exclude=["approved"])["gender"]
+        by_feature = {p["feature"]: p for p in proxies}
+        assert by_feature["job"]["method"] == "cramers_v"
+        assert by_feature["job"]["mutual_information"] > 0
+        assert by_feature["height"]["method"] == "pearson"
+        assert not {"noise", "city", "constant", "approved", "gender"} & set(by_feature)
+        assert proxies == sorted(proxies, key=lambda p: p["abs_correlation"], reverse=True)
+
+    def test_blocks_match_single_pass(self, df, monkeypatch):
+        import proxy_detection
+
+        def summary(results):
+            return {a: [(p["feature"], p["correlation"]) for p in ps] for a, ps in results.items()}
+
+        full = detect_proxies(df, ["gender", "city"])
+        monkeypatch.setattr(proxy_detection, "PROXY_BLOCK_COLUMNS", 1)
+        assert summary(detect_proxies(df, ["gender", "city"])) == summary(full)
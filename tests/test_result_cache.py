@@ -0,0 +1,37 @@
+"""
+Unit tests for the content-addressed result cache.
+"""
+
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from result_cache import ResultCache, make_cache_key  # noqa: E402
+
+
+class TestResultCache:
+    def test_key_ignores_param_order(self):
+        a = make_cache_key("ns", ["fp"], {"x": 1, "y": [1, 2]})
+        b = make_cache_key("ns", ["fp"], {"y": [1, 2], "x": 1})
+        assert a == b
+        assert a != make_cache_key("ns", ["other"], {"x": 1, "y": [1, 2]})
+
+    def test_lru_eviction(self):
+        cache = ResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_dataset(self):
+        cache = ResultCache()
+        cache.set("a", 1, dataset_ids=["ds1"])
+        cache.set("b", 2, dataset_ids=["ds2"])
+        cache.link("b", ["ds1"])
+        assert cache.invalidate_dataset("ds1") == 2
+        assert cache.get("a") is None and cache.get("b") is None
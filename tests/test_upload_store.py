@@ -0,0 +1,62 @@
+"""
+Unit tests for the content-addressed upload store.
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+import upload_store  # noqa: E402
+from upload_store import store_upload, aliases, collect_garbage, adopt_uploads, file_digest  # noqa: E402
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(upload_store, "UPLOAD_BLOB_DIR", str(tmp_path / "blobs"))
+    return tmp_path
+
+
+def upload(upload_dir, dataset_id, content):
+    partial = upload_dir / f"{dataset_id}.csv.part"
+    partial.write_text(content)
+    known = store_upload(str(partial), file_digest(str(partial)), str(upload_dir / f"{dataset_id}.csv"))
+    if partial.exists():
+        partial.unlink()
+    return known
+
+
+def blobs(upload_dir):
+    return sorted(os.listdir(upload_dir / "blobs"))
+
+
+class TestUploadStore:
+    def test_identical_uploads_share_one_blob(self, upload_dir):
+        assert not upload(upload_dir, "a", "x,y\n1,2\n")
+        assert upload(upload_dir, "b", "x,y\n1,2\n")
+        assert not upload(upload_dir, "c", "x,y\n3,4\n")
+        assert len(blobs(upload_dir)) == 2
+        assert aliases(str(upload_dir / "a.csv")) == ["a", "b"]
+        assert (upload_dir / "b.csv").read_text() == "x,y\n1,2\n"
+        assert sorted(os.listdir(upload_dir)) == ["a.csv", "b.csv", "blobs", "c.csv"]
+
+    def test_unreferenced_blobs_collected(self, upload_dir):
+        upload(upload_dir, "a", "x\n1\n")
+        upload(upload_dir, "b", "x\n1\n")
+        os.remove(upload_dir / "a.csv")
+        assert collect_garbage() == 0
+        upload(upload_dir, "b", "x\n2\n")  # b replaced by other content
+        assert collect_garbage() == 1
+        assert blobs(upload_dir) == [f"{file_digest(str(upload_dir / 'b.csv'))}.csv"]
+
+    def test_existing_uploads_adopted(self, upload_dir):
+        for name in ("84.csv", "85.csv"):
+            (upload_dir / name).write_text("x\n1\n")
+        (upload_dir / "notes.txt").write_text("x\n1\n")
+        assert adopt_uploads() == 2
+        assert adopt_uploads() == 0
+        assert len(blobs(upload_dir)) == 1 and aliases(str(upload_dir / "84.csv")) == ["84", "85"]